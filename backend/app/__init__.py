@@ -1,17 +1,76 @@
+import gc
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.services.db import get_database, close_database
+from app.services.supabase_db import close_supabase
+from app.services.github_api import close_github_client
+from app.utils.shared_state import close_shared_store
+from app.services.fix_scheduler import get_fix_scheduler
+from app.services.feedback_spool import get_spool
+from app.services.feedback_archive import get_archive_runner
+from app.services.github_warmup import get_warmup_registry
+from app.utils.profiler import ProfilingMiddleware
+from app.utils.capture import CaptureMiddleware, close_capture_writers
+from app.utils.loop_watchdog import get_loop_watchdog, LOOP_WATCHDOG_ENABLED
+
+
+GC_FREEZE_ON_STARTUP = os.getenv('GC_FREEZE_ON_STARTUP', 'true').lower() == 'true'
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create per-process resources after the worker starts and close them on shutdown.
+
+    With several workers each process runs this independently, so no client
+    or connection is ever shared across a fork.
+    """
+    if LOOP_WATCHDOG_ENABLED:
+        get_loop_watchdog().start()
+    # Try to connect on startup, but don't fail if it doesn't work
+    get_database()
+    get_spool().start()
+    get_archive_runner().start()
+    get_fix_scheduler().start()
+    if GC_FREEZE_ON_STARTUP:
+        # Move startup objects out of the collector's reach so full
+        # collections don't stall the event loop scanning them
+        gc.collect()
+        gc.freeze()
+    yield
+    await get_fix_scheduler().stop()
+    await get_loop_watchdog().stop()
+    get_archive_runner().stop()
+    get_spool().stop()
+    await get_warmup_registry().cancel_all()
+    await close_github_client()
+    close_database()
+    close_supabase()
+    close_shared_store()
+    close_capture_writers()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Simple REST API",
     description="A basic REST controller with FastAPI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Opt-in request profiling (PROFILE_SAMPLE_RATE or an X-Profile admin header)
+app.add_middleware(ProfilingMiddleware)
+# Opt-in traffic capture for replay.py (CAPTURE_ENABLED)
+app.add_middleware(CaptureMiddleware)
+
 # Import routers after app is created to avoid circular imports
-from app.controller import main_controller, feedback, githubLogin
+from app.controller import main_controller, feedback, githubLogin, webhooks, jobs, admin
 
 # Include all routers
 app.include_router(main_controller.router)
 app.include_router(feedback.router, prefix="/api", tags=["feedback"])
+app.include_router(jobs.router, prefix="/api")
 app.include_router(githubLogin.router)
-
+app.include_router(webhooks.router)
+app.include_router(admin.router)
@@ -1,6 +1,15 @@
 import os, json, requests
+from app.ai.governor import governed_call, fit_to_budget, GEMINI_MAX_OUTPUT_TOKENS
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-pro"
+
+# The verdict is a tiny JSON object, so keep the output cap small
+VALIDATION_MAX_OUTPUT_TOKENS = min(128, GEMINI_MAX_OUTPUT_TOKENS)
+
+def _usage(response) -> tuple:
+    usage = response.json().get("usageMetadata", {})
+    return usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
 
 def analyze_feedback(text: str) -> dict:
     prompt = f"""
@@ -11,14 +20,28 @@ Return ONLY JSON:
 - category: bug | feature | ux | performance | content | other
 
 Feedback:
-\"\"\"{text}\"\"\"
+\"\"\"{fit_to_budget(text)}\"\"\"
 """
 
-    response = requests.post(
-        "https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent",
-        params={"key": GEMINI_API_KEY},
-        json={"contents": [{"parts": [{"text": prompt}]}]},
-        timeout=5
+    def send(p: str):
+        response = requests.post(
+            f"https://generativelanguage.googleapis.com/v1/models/{GEMINI_MODEL}:generateContent",
+            params={"key": GEMINI_API_KEY},
+            json={
+                "contents": [{"parts": [{"text": p}]}],
+                "generationConfig": {"maxOutputTokens": VALIDATION_MAX_OUTPUT_TOKENS}
+            },
+            timeout=5
+        )
+        response.raise_for_status()
+        return response
+
+    response = governed_call(
+        GEMINI_MODEL,
+        prompt,
+        send,
+        usage=_usage,
+        max_output_tokens=VALIDATION_MAX_OUTPUT_TOKENS
     )
 
     output = response.json()["candidates"][0]["content"]["parts"][0]["text"]
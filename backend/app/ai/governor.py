@@ -0,0 +1,199 @@
+"""
+Quota-aware admission for Gemini calls.
+
+Every model call goes through governed_call(), which:
+- estimates prompt tokens locally (no count_tokens round trip)
+- charges the prompt estimate plus the output cap against per-model
+  requests-per-minute and tokens-per-minute buckets, waiting in line
+  (up to GEMINI_MAX_WAIT_SECONDS) instead of firing into a 429
+- records actual token usage, latency and outcome in metrics
+
+The buckets use the rate limiter's backend, so with RATE_LIMIT_BACKEND=shared
+all workers on the host draw from one quota.
+
+Inputs are kept to a per-call budget with fit_to_budget(), which keeps the
+head and tail of long text.
+"""
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.security.admission import get_bucket_backend
+
+load_dotenv()
+
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', '15'))
+GEMINI_TPM = float(os.getenv('GEMINI_TPM', '1000000'))
+# Per-call budgets
+GEMINI_MAX_INPUT_TOKENS = int(os.getenv('GEMINI_MAX_INPUT_TOKENS', '2000'))
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', '1024'))
+# How long a call may queue for quota before giving up
+GEMINI_MAX_WAIT_SECONDS = float(os.getenv('GEMINI_MAX_WAIT_SECONDS', '30'))
+
+# Rough average for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 60)
+TRUNCATION_MARKER = "\n[... {} characters omitted ...]\n"
+
+
+class GeminiQuotaExceeded(Exception):
+    """Raised when a call could not get quota within GEMINI_MAX_WAIT_SECONDS."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Gemini quota exhausted for {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text without calling the API.
+
+    Args:
+        text: Prompt or input text
+
+    Returns:
+        Estimated tokens (rounded up)
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def fit_to_budget(text: str, max_tokens: int = GEMINI_MAX_INPUT_TOKENS) -> str:
+    """
+    Shorten a text to roughly max_tokens, keeping its start and end.
+
+    Args:
+        text: Untrusted input such as a feedback message
+        max_tokens: Token budget for this input
+
+    Returns:
+        The text, or its head and tail joined by an omission marker
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    omitted = len(text) - max_chars
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    metrics.inc("gemini_inputs_truncated")
+    return text[:head] + TRUNCATION_MARKER.format(omitted) + text[-tail:]
+
+
+class GeminiGovernor:
+    """RPM/TPM token buckets per model with a waiting queue."""
+
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM,
+                 max_wait: float = GEMINI_MAX_WAIT_SECONDS):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        # Waiters poll the buckets one at a time, roughly in arrival order
+        self._queue = threading.Lock()
+
+    def acquire(self, model: str, tokens: int) -> float:
+        """
+        Block until the call fits the model's quotas.
+
+        Args:
+            model: Model name (quotas are per model)
+            tokens: Prompt estimate plus output cap
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            GeminiQuotaExceeded: If quota did not free up within max_wait
+        """
+        cost = min(tokens, self.tpm)  # A single call larger than the bucket still goes through alone
+        limits = [
+            (f"gemini:{model}:rpm", self.rpm, self.rpm / 60, 1),
+            (f"gemini:{model}:tpm", self.tpm, self.tpm / 60, cost),
+        ]
+        started = time.monotonic()
+        deadline = started + self.max_wait
+
+        if not self._queue.acquire(timeout=self.max_wait):
+            raise GeminiQuotaExceeded(model, self.max_wait)
+        try:
+            while True:
+                denied = get_bucket_backend().take(limits)
+                if denied is None:
+                    break
+                _, retry_after = denied
+                if time.monotonic() + retry_after > deadline:
+                    metrics.inc("gemini_calls", model=model, status="quota_exceeded")
+                    logger.warning(f"⚠ Gemini quota exhausted for {model}, retry in {retry_after:.1f}s")
+                    raise GeminiQuotaExceeded(model, retry_after)
+                time.sleep(retry_after)
+        finally:
+            self._queue.release()
+
+        waited = time.monotonic() - started
+        metrics.observe("gemini_queue_wait_seconds", waited, buckets=LATENCY_BUCKETS, model=model)
+        return waited
+
+
+_governor: Optional[GeminiGovernor] = None
+
+
+def get_governor() -> GeminiGovernor:
+    """Get the process-wide governor with lazy initialization."""
+    global _governor
+
+    if _governor is None:
+        _governor = GeminiGovernor()
+
+    return _governor
+
+
+def governed_call(
+    model: str,
+    prompt: str,
+    call: Callable[[str], Any],
+    usage: Optional[Callable[[Any], Tuple[Optional[int], Optional[int]]]] = None,
+    max_output_tokens: int = GEMINI_MAX_OUTPUT_TOKENS
+) -> Any:
+    """
+    Run one model call under the quota governor and record its cost.
+
+    Args:
+        model: Model name
+        prompt: The full prompt (already budgeted)
+        call: Function that sends the prompt and returns the response
+        usage: Extracts (prompt tokens, output tokens) from the response
+        max_output_tokens: Output cap the call was made with
+
+    Returns:
+        Whatever call returns
+
+    Raises:
+        GeminiQuotaExceeded: If no quota became available in time
+    """
+    prompt_estimate = estimate_tokens(prompt)
+    get_governor().acquire(model, prompt_estimate + max_output_tokens)
+
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        response = call(prompt)
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        metrics.observe("gemini_latency_seconds", time.perf_counter() - started, buckets=LATENCY_BUCKETS, model=model)
+        metrics.inc("gemini_calls", model=model, status=status)
+
+    prompt_tokens = output_tokens = None
+    if usage:
+        try:
+            prompt_tokens, output_tokens = usage(response)
+        except (AttributeError, KeyError, IndexError, TypeError):
+            pass
+    metrics.inc("gemini_prompt_tokens", prompt_tokens or prompt_estimate, model=model)
+    metrics.inc("gemini_output_tokens", output_tokens or 0, model=model)
+    return response
@@ -0,0 +1,488 @@
+"""
+Local pre-classifier that settles obvious feedback before Gemini sees it.
+
+A multinomial logistic regression over hashed features predicts one of
+CLASSES: "invalid" or a feedback category. Features are word unigrams and
+bigrams, character trigrams, and coarse shape tokens (length, letter
+ratio, repeated characters, ...), signed-hashed into PRECLASSIFIER_DIM
+buckets. Trigrams are hashed in NumPy rather than per token in Python, so
+scoring one message is a handful of array operations and a gather over
+its buckets: about 0.1 ms, against a Gemini round trip of seconds (the
+train command reports the measured time).
+
+Training data is the Gemini verdicts recorded in the feedback_verdicts
+collection by handle_feedback. Training holds out a validation split and
+picks two confidence thresholds on it, the lowest at which auto-rejecting
+and auto-accepting (with a category) still reach the target precision.
+Everything else goes to Gemini. PRECLASSIFIER_AUDIT_RATE of confident
+messages go to Gemini anyway, so new verdicts keep covering the cases the
+model decides.
+
+    python -m app.ai.preclassifier train [--target-precision 0.98]
+    python -m app.ai.preclassifier check "some feedback text"
+
+Workers pick up a retrained model file without restarting.
+"""
+import argparse
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from pymongo.errors import PyMongoError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path
+
+load_dotenv()
+
+PRECLASSIFIER_ENABLED = os.getenv('PRECLASSIFIER_ENABLED', 'true').lower() == 'true'
+PRECLASSIFIER_PATH = os.getenv('PRECLASSIFIER_PATH')
+PRECLASSIFIER_DIM = int(os.getenv('PRECLASSIFIER_DIM', '65536'))
+PRECLASSIFIER_TARGET_PRECISION = float(os.getenv('PRECLASSIFIER_TARGET_PRECISION', '0.98'))
+PRECLASSIFIER_MIN_SAMPLES = int(os.getenv('PRECLASSIFIER_MIN_SAMPLES', '200'))
+PRECLASSIFIER_AUDIT_RATE = float(os.getenv('PRECLASSIFIER_AUDIT_RATE', '0.05'))
+
+CLASSES = ("invalid", "bug", "feature", "ux", "performance", "content", "other")
+MAX_CHARS = 2000
+# Fewer validation decisions than this at a threshold are not trusted
+MIN_DECISIONS = 10
+# A local decision must at least be the majority class, whatever precision allows
+MIN_CONFIDENCE = 0.5
+# How often workers check the model file for a retrained version
+RELOAD_INTERVAL = 30.0
+WORD_RE = re.compile(r"\w+")
+
+
+def _bucket(value: float, step: float = 1.0) -> int:
+    return int(value / step)
+
+
+def _token_hashes(text: str, codes: np.ndarray) -> np.ndarray:
+    """32-bit hashes of the word, bigram and shape tokens of a lowercased text."""
+    words = WORD_RE.findall(text)
+    tokens = [f"w:{word}" for word in words]
+    tokens.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+
+    # Shape of the message, which is most of what separates junk from feedback
+    length = max(len(codes), 1)
+    boundaries = np.flatnonzero(np.diff(codes)) if len(codes) > 1 else np.zeros(0, dtype=np.int64)
+    longest_run = int(np.diff(boundaries, prepend=-1, append=len(codes) - 1).max()) if len(codes) else 0
+    tokens.extend((
+        f"s:len:{_bucket(math.log2(len(codes) + 1))}",
+        f"s:words:{min(len(words), 20)}",
+        f"s:letters:{_bucket(sum(map(str.isalpha, text)) / length, 0.1)}",
+        f"s:distinct:{_bucket(len(set(text)) / length, 0.1)}",
+        f"s:nonascii:{_bucket(np.count_nonzero(codes > 127) / length, 0.1)}",
+        f"s:run:{min(longest_run, 10)}",
+    ))
+    return np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def _trigram_hashes(codes: np.ndarray) -> np.ndarray:
+    """32-bit hashes of every character trigram of " text " (multiply-xorshift mix)."""
+    padded = np.concatenate(([32], codes, [32])).astype(np.uint64)
+    h = (padded[:-2] * 0x9E3779B1) ^ (padded[1:-1] * 0x85EBCA77) ^ (padded[2:] * 0xC2B2AE3D)
+    h ^= h >> np.uint64(29)
+    h = (h * np.uint64(0xBF58476D1CE4E5B9)) & np.uint64(0xFFFFFFFFFFFFFFFF)
+    return (h >> np.uint64(32)) & np.uint64(0xFFFFFFFF)
+
+
+def featurize(text: str, dim: int = PRECLASSIFIER_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash a message into sparse signed features, scaled by 1/sqrt(token count).
+
+    Args:
+        text: Sanitized feedback message
+        dim: Number of hash buckets
+
+    Returns:
+        (bucket indices, values); an index may repeat
+    """
+    text = ' '.join(text[:MAX_CHARS].lower().split())
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    hashes = np.concatenate((_token_hashes(text, codes), _trigram_hashes(codes)))
+
+    # Repeated buckets are left in place: scoring and training both sum over them
+    signs = np.where(hashes & np.uint64(0x80000000), 1.0, -1.0).astype(np.float32)
+    return (hashes % np.uint64(dim)).astype(np.int64), signs / np.float32(math.sqrt(len(hashes)))
+
+
+def vectorize(texts: Sequence[str], dim: int = PRECLASSIFIER_DIM) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Featurize many messages into CSR arrays (indptr, indices, values)."""
+    parts = [featurize(text, dim) for text in texts]
+    indptr = np.zeros(len(parts) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(indices) for indices, _ in parts])
+    indices = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, dtype=np.int64)
+    values = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, dtype=np.float32)
+    return indptr, indices, values
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class PreClassifier:
+    """Trained weights plus the decision thresholds chosen for them."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray,
+                 reject_threshold: float = math.inf, accept_threshold: float = math.inf):
+        self.weights = weights
+        self.bias = bias
+        self.reject_threshold = reject_threshold
+        self.accept_threshold = accept_threshold
+
+    @property
+    def dim(self) -> int:
+        return self.weights.shape[0]
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Class probabilities for one message, in CLASSES order."""
+        indices, values = featurize(text, self.dim)
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+    def predict_proba_many(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Class probabilities for vectorized messages (one row each)."""
+        return _softmax(self._scores(indptr, indices, values))
+
+    def _scores(self, indptr, indices, values) -> np.ndarray:
+        # Every message has shape tokens, so no row is empty and reduceat is safe
+        contributions = values[:, None] * self.weights[indices]
+        return np.add.reduceat(contributions, indptr[:-1], axis=0) + self.bias
+
+    def decide(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Settle a message locally if the model is confident enough.
+
+        Args:
+            text: Sanitized feedback message
+
+        Returns:
+            {"valid", "category", "confidence"}, or None to ask Gemini
+        """
+        probs = self.predict_proba(text)
+        if probs[0] >= self.reject_threshold:
+            return {"valid": False, "category": None, "confidence": float(probs[0])}
+        best = int(np.argmax(probs[1:])) + 1
+        if probs[best] >= self.accept_threshold:
+            return {"valid": True, "category": CLASSES[best], "confidence": float(probs[best])}
+        return None
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path, weights=self.weights, bias=self.bias, classes=np.array(CLASSES),
+            thresholds=np.array([self.reject_threshold, self.accept_threshold])
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PreClassifier":
+        with np.load(path) as data:
+            if tuple(data["classes"]) != CLASSES:
+                raise ValueError("Model was trained with different classes")
+            reject_threshold, accept_threshold = data["thresholds"]
+            return cls(data["weights"], data["bias"], float(reject_threshold), float(accept_threshold))
+
+
+def fit(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    values: np.ndarray,
+    labels: np.ndarray,
+    dim: int = PRECLASSIFIER_DIM,
+    epochs: int = 15,
+    learning_rate: float = 0.5,
+    l2: float = 1e-5,
+    batch_size: int = 256,
+    seed: int = 0
+) -> PreClassifier:
+    """
+    Train softmax regression with mini-batch AdaGrad on sparse features.
+
+    Only the buckets present in a batch are updated, so an epoch costs
+    O(non-zeros), not O(dim).
+
+    Returns:
+        An untuned PreClassifier (thresholds disabled)
+    """
+    classes = len(CLASSES)
+    model = PreClassifier(np.zeros((dim, classes), dtype=np.float32), np.zeros(classes, dtype=np.float32))
+    grad_sq = np.full((dim, classes), 1e-8, dtype=np.float32)
+    bias_sq = np.full(classes, 1e-8, dtype=np.float32)
+    onehot = np.eye(classes, dtype=np.float32)[labels]
+    rng = np.random.default_rng(seed)
+    count = len(labels)
+
+    for _ in range(epochs):
+        order = rng.permutation(count)
+        for start in range(0, count, batch_size):
+            rows = order[start:start + batch_size]
+            starts, ends = indptr[rows], indptr[rows + 1]
+            lengths = ends - starts
+            positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+            batch_indices, batch_values = indices[positions], values[positions]
+            batch_indptr = np.concatenate(([0], np.cumsum(lengths)))
+
+            error = (model.predict_proba_many(batch_indptr, batch_indices, batch_values) - onehot[rows]) / len(rows)
+
+            # Gradient per touched bucket: sum over non-zeros of value * row error
+            buckets, inverse = np.unique(batch_indices, return_inverse=True)
+            contributions = batch_values[:, None] * np.repeat(error, lengths, axis=0)
+            grad = np.stack([
+                np.bincount(inverse, weights=contributions[:, c], minlength=len(buckets)) for c in range(classes)
+            ], axis=1).astype(np.float32)
+            grad += l2 * model.weights[buckets]
+
+            grad_sq[buckets] += grad ** 2
+            model.weights[buckets] -= learning_rate * grad / np.sqrt(grad_sq[buckets])
+            bias_grad = error.sum(axis=0)
+            bias_sq += bias_grad ** 2
+            model.bias -= learning_rate * bias_grad / np.sqrt(bias_sq)
+
+    return model
+
+
+def _threshold(confidence: np.ndarray, correct: np.ndarray, target: float) -> Tuple[float, float, int]:
+    """
+    Lowest confidence cutoff whose decisions still reach the target precision.
+
+    Returns:
+        (threshold, precision, decisions); threshold is inf if none qualifies
+    """
+    order = np.argsort(-confidence, kind='stable')
+    hits = np.cumsum(correct[order])
+    precision = hits / np.arange(1, len(order) + 1)
+    qualifying = np.nonzero(
+        (precision >= target)
+        & (np.arange(1, len(order) + 1) >= MIN_DECISIONS)
+        & (confidence[order] >= MIN_CONFIDENCE)
+    )[0]
+    if not len(qualifying):
+        return math.inf, 0.0, 0
+    k = qualifying[-1]
+    return float(confidence[order[k]]), float(precision[k]), int(k + 1)
+
+
+def tune(model: PreClassifier, indptr, indices, values, labels: np.ndarray,
+         target: float = PRECLASSIFIER_TARGET_PRECISION) -> Dict[str, Any]:
+    """
+    Pick the model's thresholds on held-out data and report how it does.
+
+    Returns:
+        Precision, recall and coverage of local decisions on the held-out set
+    """
+    probs = model.predict_proba_many(indptr, indices, values)
+    invalid = labels == 0
+    best = np.argmax(probs[:, 1:], axis=1) + 1
+
+    model.reject_threshold, reject_precision, rejected = _threshold(probs[:, 0], invalid, target)
+    model.accept_threshold, accept_precision, accepted = _threshold(
+        probs[np.arange(len(labels)), best], best == labels, target
+    )
+
+    # The thresholds are applied in order (reject first), so count decisions the same way
+    reject = probs[:, 0] >= model.reject_threshold
+    accept = ~reject & (probs[np.arange(len(labels)), best] >= model.accept_threshold)
+    return {
+        "samples": int(len(labels)),
+        "accuracy": round(float(np.mean(np.argmax(probs, axis=1) == labels)), 4),
+        "reject": {
+            "threshold": model.reject_threshold,
+            "precision": round(float(np.mean(invalid[reject])) if reject.any() else 0.0, 4),
+            "recall": round(float(reject[invalid].mean()) if invalid.any() else 0.0, 4),
+        },
+        "accept": {
+            "threshold": model.accept_threshold,
+            "precision": round(float(np.mean((best == labels)[accept])) if accept.any() else 0.0, 4),
+            "recall": round(float(accept[~invalid].mean()) if (~invalid).any() else 0.0, 4),
+        },
+        "coverage": round(float(np.mean(reject | accept)), 4),
+    }
+
+
+def model_path() -> str:
+    return PRECLASSIFIER_PATH or data_path('preclassifier.npz')
+
+
+_model: Optional[PreClassifier] = None
+_model_mtime = 0.0
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_preclassifier() -> Optional[PreClassifier]:
+    """Get the trained model, loading it (or a retrained one) from disk."""
+    global _model, _model_mtime, _checked_at
+
+    now = time.monotonic()
+    if now - _checked_at < RELOAD_INTERVAL:
+        return _model
+
+    with _lock:
+        if now - _checked_at < RELOAD_INTERVAL:
+            return _model
+        _checked_at = now
+        try:
+            mtime = os.stat(model_path()).st_mtime
+        except FileNotFoundError:
+            return _model
+        if mtime != _model_mtime:
+            try:
+                _model = PreClassifier.load(model_path())
+                _model_mtime = mtime
+                logger.info(f"✓ Loaded feedback pre-classifier from {model_path()}")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠ Could not load feedback pre-classifier: {e}")
+
+    return _model
+
+
+def preclassify(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Decide a message locally when a trained model is confident.
+
+    Args:
+        text: Sanitized feedback message
+
+    Returns:
+        {"valid", "category", "confidence"}, or None if Gemini should decide
+    """
+    if not PRECLASSIFIER_ENABLED:
+        return None
+    model = get_preclassifier()
+    if model is None:
+        return None
+
+    verdict = model.decide(text)
+    outcome = "uncertain" if verdict is None else ("accept" if verdict["valid"] else "reject")
+    metrics.inc("preclassifier_decisions", outcome=outcome)
+    return verdict
+
+
+def record_verdict(text: str, verdict: Dict[str, Any]) -> None:
+    """
+    Store a Gemini verdict as a training example (best effort).
+
+    Args:
+        text: Sanitized feedback message
+        verdict: Gemini's {"valid", "category"}
+    """
+    from app.services.db import get_verdict_collection
+
+    collection = get_verdict_collection()
+    if collection is None:
+        return
+    try:
+        collection.insert_one({
+            "text": text[:MAX_CHARS],
+            "valid": bool(verdict.get("valid")),
+            "category": verdict.get("category"),
+            "source": "gemini",
+            "created_at": datetime.now(timezone.utc),
+        })
+    except PyMongoError as e:
+        logger.warning(f"⚠ Could not record feedback verdict: {e}")
+
+
+def label_of(verdict: Dict[str, Any]) -> int:
+    """Class index for a stored verdict (unknown categories count as "other")."""
+    if not verdict.get("valid"):
+        return 0
+    category = verdict.get("category")
+    return CLASSES.index(category) if category in CLASSES[1:] else CLASSES.index("other")
+
+
+def train(
+    limit: Optional[int] = None,
+    target: float = PRECLASSIFIER_TARGET_PRECISION,
+    holdout: float = 0.2,
+    dim: int = PRECLASSIFIER_DIM,
+    save: bool = True
+) -> Dict[str, Any]:
+    """
+    Train on recorded Gemini verdicts, tune thresholds and save the model.
+
+    Args:
+        limit: Use at most this many of the newest verdicts
+        target: Precision required of local decisions
+        holdout: Fraction of verdicts kept for threshold tuning and the report
+        dim: Number of hash buckets
+        save: Write the model file
+
+    Returns:
+        The held-out report from tune(), plus training timings
+    """
+    from app.services.db import get_verdict_collection
+
+    collection = get_verdict_collection()
+    if collection is None:
+        raise RuntimeError("Database connection unavailable")
+
+    cursor = collection.find({"source": "gemini"}, {"text": 1, "valid": 1, "category": 1}).sort("_id", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+    verdicts = [v for v in cursor if v.get("text")]
+    if len(verdicts) < PRECLASSIFIER_MIN_SAMPLES:
+        raise RuntimeError(f"Need at least {PRECLASSIFIER_MIN_SAMPLES} verdicts to train, found {len(verdicts)}")
+
+    labels = np.array([label_of(v) for v in verdicts], dtype=np.int64)
+    order = np.random.default_rng(0).permutation(len(verdicts))
+    split = int(len(order) * (1 - holdout))
+    train_rows, test_rows = order[:split], order[split:]
+
+    started = time.perf_counter()
+    model = fit(*vectorize([verdicts[i]["text"] for i in train_rows], dim), labels[train_rows], dim=dim)
+    train_seconds = time.perf_counter() - started
+    test_texts = [verdicts[i]["text"] for i in test_rows]
+    report = tune(model, *vectorize(test_texts, dim), labels[test_rows], target=target)
+
+    started = time.perf_counter()
+    for text in test_texts:
+        model.decide(text)
+    report["train_samples"] = int(len(train_rows))
+    report["train_seconds"] = round(train_seconds, 2)
+    report["microseconds_per_message"] = round((time.perf_counter() - started) / max(len(test_texts), 1) * 1e6, 1)
+
+    if save:
+        model.save(model_path())
+        logger.info(f"✓ Saved feedback pre-classifier to {model_path()}")
+    return report
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"trained on {report['train_samples']} verdicts in {report['train_seconds']}s, "
+          f"evaluated on {report['samples']} held out")
+    print(f"argmax accuracy {report['accuracy']:.3f}, {report['microseconds_per_message']}µs per message")
+    for name in ("reject", "accept"):
+        stats = report[name]
+        threshold = "disabled" if math.isinf(stats["threshold"]) else f"p >= {stats['threshold']:.3f}"
+        print(f"  auto-{name}: {threshold}  precision {stats['precision']:.3f}  recall {stats['recall']:.3f}")
+    print(f"decided locally: {report['coverage']:.1%} (the rest go to Gemini)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feedback pre-classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="Train from recorded Gemini verdicts")
+    train_parser.add_argument("--limit", type=int)
+    train_parser.add_argument("--target-precision", type=float, default=PRECLASSIFIER_TARGET_PRECISION)
+    train_parser.add_argument("--dry-run", action="store_true", help="Report without saving the model")
+    check_parser = commands.add_parser("check", help="Classify a message with the saved model")
+    check_parser.add_argument("text")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        _print_report(train(limit=args.limit, target=args.target_precision, save=not args.dry_run))
+    else:
+        classifier = PreClassifier.load(model_path())
+        probs = classifier.predict_proba(args.text)
+        print({name: round(float(p), 3) for name, p in zip(CLASSES, probs)})
+        print(classifier.decide(args.text) or "uncertain: ask Gemini")
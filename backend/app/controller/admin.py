@@ -0,0 +1,61 @@
+"""
+Admin Controller.
+
+Operational endpoints guarded by ADMIN_TOKEN: request profiles captured by
+app.utils.profiler and the event-loop blocking report.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.security.admin import require_admin
+from app.utils.profiler import list_profiles, profile_path
+from app.utils.loop_watchdog import get_loop_watchdog
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+def get_profiles():
+    """
+    List captured request profiles, newest first.
+
+    Returns:
+        dict: Profile names, sizes and timestamps
+    """
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """
+    Download one profile in collapsed-stack format (open it in speedscope).
+
+    Args:
+        name: Profile name from GET /admin/profiles
+
+    Returns:
+        The profile file
+    """
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+
+@router.get("/loop-lag")
+def get_loop_lag(reset: bool = False):
+    """
+    Event-loop stalls for this worker, worst offenders first.
+
+    Lag histograms are in GET /metrics as event_loop_lag_seconds.
+
+    Args:
+        reset: Clear the report after reading it
+
+    Returns:
+        dict: Stall totals and top offenders with their captured stacks
+    """
+    watchdog = get_loop_watchdog()
+    report = watchdog.report()
+    if reset:
+        watchdog.reset()
+    return report
@@ -1,39 +1,71 @@
-from fastapi import APIRouter, HTTPException
+import json
+import os
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from datetime import datetime, timezone
 from app.models.feedback import Feedback
-from app.services.db import feedback_collection, get_database
-from app.services.feedback_processor import analyze_and_fix_feedback
+from app.utils.logger import logger
+from app.security.admission import feedback_bulk_load_guard, feedback_load_guard, rate_limit_http
+from app.utils.ndjson import iter_ndjson_lines, UnsupportedEncodingError, BodyDecodeError
+from app.services.db import get_feedback_collection
+from app.services.feedback_spool import insert_feedback
+from app.services.ai_store import load_analysis
+from app.services.feedback_index import get_repo_index, index_feedback
+from app.services.feedback_archive import find_feedback, get_feedback_docs
+from app.utils.fast_json import json_response
+from app.services.fix_scheduler import enqueue_fix_job
 
 router = APIRouter()
 
-@router.post("/feedback")
-def submit_feedback(feedback: Feedback):
-    # Ensure database is connected
-    if feedback_collection is None:
-        # Try to reconnect
-        get_database()
-        if feedback_collection is None:
-            raise HTTPException(
-                status_code=503,
-                detail="Database connection unavailable. Please check your MongoDB configuration."
-            )
+# Documents per insert_many call for bulk ingestion
+FEEDBACK_BULK_CHUNK = int(os.getenv('FEEDBACK_BULK_CHUNK', '500'))
+FEEDBACK_BULK_MAX_LINE = int(os.getenv('FEEDBACK_BULK_MAX_LINE', '65536'))
+# Per-line errors echoed back in the response
+MAX_REPORTED_ERRORS = 20
+
+# Upper bound on search results per query
+MAX_SEARCH_RESULTS = 50
+
+# Fields returned by the feedback listing; analyses are fetched separately
+FEEDBACK_LIST_PROJECTION = {
+    "name": 1, "message": 1, "feedback_type": 1, "repo_url": 1, "user_id": 1,
+    "created_at": 1, "ai_analysis_id": 1, "fix_status": 1, "pr_url": 1
+}
+
+def _index_quietly(docs):
+    """Add stored feedback to the search index; indexing never fails a submission."""
+    try:
+        index_feedback(docs)
+    except Exception as e:
+        logger.warning(f"⚠ Could not index feedback for search: {e}")
+
+
+@router.post("/feedback", dependencies=[Depends(feedback_load_guard)])
+def submit_feedback(feedback: Feedback, request: Request):
+    rate_limit_http(user_id=feedback.user_id, ip=request.client.host if request.client else None)
 
     try:
         # Add timestamp
         feedback_dict = feedback.model_dump()
         feedback_dict["created_at"] = datetime.now(timezone.utc)
 
-        # Insert into MongoDB
-        result = feedback_collection.insert_one(feedback_dict)
+        # Insert into MongoDB, or the local spool if Mongo is down or slow
+        (feedback_id,), spooled = insert_feedback([feedback_dict])
+        _index_quietly([feedback_dict])
 
-        # Process feedback with AI
-        ai_result = analyze_and_fix_feedback(feedback)
+        # Queue AI processing; poll GET /api/jobs/{job_id} for the result
+        job_id = enqueue_fix_job(feedback, feedback_id=feedback_id)
 
         return {
             "status": "success",
-            "message": "Feedback saved and processed",
-            "id": str(result.inserted_id),
-            "ai_result": ai_result
+            "message": "Feedback saved and queued for processing",
+            "id": feedback_id,
+            "job_id": job_id,
+            "spooled": spooled
         }
         # TODO: call handle feedback here 
     except Exception as e:
@@ -42,3 +74,218 @@ def submit_feedback(feedback: Feedback):
             detail=f"Failed to save feedback: {str(e)}"
         )
 
+
+@router.post("/feedback/bulk", dependencies=[Depends(feedback_bulk_load_guard)])
+async def submit_feedback_bulk(request: Request):
+    """
+    Ingest many feedback submissions from an NDJSON body.
+
+    The body may be gzip- or zstd-compressed (Content-Encoding). It is
+    decoded and validated line by line and written in bounded insert_many
+    chunks (spooled locally if Mongo is unavailable), so memory use does not
+    grow with the upload size. Invalid lines
+    are skipped and reported; bulk submissions are stored without AI processing.
+    Every accepted line costs its user one request; once a user's quota
+    runs out the upload stops with 429, keeping what was already stored.
+
+    Returns:
+        dict: Accepted and rejected counts with the first per-line errors
+    """
+    # The upload itself costs one request against the client's IP budget
+    rate_limit_http(ip=request.client.host if request.client else None)
+
+    accepted = 0
+    rejected = 0
+    errors = []
+    batch = []
+    line_number = 0
+
+    async def flush():
+        nonlocal accepted, batch
+        if not batch:
+            return
+        docs, batch = batch, []
+
+        # Charge each user for their lines; users over quota lose this batch
+        by_user = {}
+        for doc in docs:
+            by_user.setdefault(doc["user_id"], []).append(doc)
+        limited = None
+        for user_id, user_docs in by_user.items():
+            try:
+                await run_in_threadpool(rate_limit_http, user_id=user_id, cost=len(user_docs))
+            except HTTPException as e:
+                limited = e
+                docs = [doc for doc in docs if doc["user_id"] != user_id]
+
+        if docs:
+            await run_in_threadpool(insert_feedback, docs)
+            await run_in_threadpool(_index_quietly, docs)
+            accepted += len(docs)
+        if limited:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded after {accepted} accepted. Please retry the remaining lines later.",
+                headers=limited.headers
+            )
+
+    try:
+        async for line in iter_ndjson_lines(
+            request.stream(),
+            request.headers.get("content-encoding"),
+            FEEDBACK_BULK_MAX_LINE
+        ):
+            line_number += 1
+            try:
+                feedback = Feedback(**json.loads(line))
+            except ValidationError as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    fields = ", ".join(".".join(map(str, err["loc"])) for err in e.errors())
+                    errors.append({"line": line_number, "error": f"Invalid fields: {fields}"})
+                continue
+            except (ValueError, TypeError) as e:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": f"Invalid JSON: {e}"})
+                continue
+
+            feedback_dict = feedback.model_dump()
+            feedback_dict["created_at"] = datetime.now(timezone.utc)
+            batch.append(feedback_dict)
+            if len(batch) >= FEEDBACK_BULK_CHUNK:
+                await flush()
+        await flush()
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk body after {accepted} accepted: {e}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"✗ Bulk feedback ingestion failed after {accepted} documents: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save feedback after {accepted} accepted: {str(e)}"
+        )
+
+    logger.info(f"✓ Bulk feedback ingested: {accepted} accepted, {rejected} rejected")
+    return {
+        "status": "success",
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors
+    }
+
+
+@router.get("/feedback")
+def list_feedback(
+    request: Request,
+    repo_url: Optional[str] = None,
+    user_id: Optional[str] = None,
+    before: Optional[str] = Query(None, description="Return feedback older than this id"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    List feedback newest first, without AI analysis bodies.
+
+    Each item carries ai_analysis_id; fetch the text from
+    GET /api/feedback/{id}/analysis when it is actually needed. Pages
+    continue seamlessly into archived feedback once Mongo runs out.
+
+    Returns:
+        dict: Items and the cursor for the next page
+    """
+    feedback_collection = get_feedback_collection()
+    if feedback_collection is None:
+        raise HTTPException(status_code=503, detail="Database connection unavailable")
+
+    cursor = None
+    if before:
+        try:
+            cursor = ObjectId(before)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    items = []
+    for doc in find_feedback(feedback_collection, repo_url, user_id, cursor, limit, FEEDBACK_LIST_PROJECTION):
+        doc["id"] = str(doc.pop("_id"))
+        items.append(doc)
+
+    return json_response(request, {
+        "items": items,
+        "next": items[-1]["id"] if len(items) == limit else None
+    })
+
+
+@router.get("/feedback/{feedback_id}/analysis")
+def get_feedback_analysis(feedback_id: str):
+    """
+    Get the full AI analysis for one feedback submission.
+
+    Args:
+        feedback_id: The feedback document id
+
+    Returns:
+        dict: The analysis id and text
+    """
+    feedback_collection = get_feedback_collection()
+    if feedback_collection is None:
+        raise HTTPException(status_code=503, detail="Database connection unavailable")
+
+    try:
+        object_id = ObjectId(feedback_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid feedback id")
+
+    doc = get_feedback_docs(feedback_collection, [object_id], {"ai_analysis_id": 1}).get(feedback_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Feedback not found")
+    if not doc.get("ai_analysis_id"):
+        raise HTTPException(status_code=404, detail="No AI analysis for this feedback yet")
+
+    text = load_analysis(doc["ai_analysis_id"])
+    if text is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return {"ai_analysis_id": doc["ai_analysis_id"], "ai_analysis": text}
+
+
+@router.get("/feedback/search")
+def search_feedback(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=2000),
+    repo_url: str = Query(...),
+    k: int = Query(10, ge=1, le=MAX_SEARCH_RESULTS)
+):
+    """
+    Find feedback similar to a query within one repo.
+
+    Uses the local vector index, so paraphrases match without Mongo text
+    search. Matches are hydrated from MongoDB when it is reachable, and
+    from the feedback archive once they have aged out of Mongo.
+
+    Args:
+        q: Free-text query
+        repo_url: GitHub repo URL the feedback was submitted for
+        k: Number of results
+
+    Returns:
+        dict: Results best first, each with id, score and the lean feedback fields
+    """
+    index = get_repo_index(repo_url, create=False)
+    if index is None:
+        return json_response(request, {"results": []})
+
+    (matches,) = index.search([q], k)
+    results = [{"id": feedback_id, "score": round(score, 4)} for feedback_id, score in matches]
+
+    if results:
+        docs = get_feedback_docs(
+            get_feedback_collection(),
+            [ObjectId(r["id"]) for r in results],
+            FEEDBACK_LIST_PROJECTION
+        )
+        for result in results:
+            result.update(docs.get(result["id"], {}))
+
+    return json_response(request, {"results": results})
@@ -5,16 +5,40 @@ Handles GitHub OAuth flow including:
 - Login redirect to GitHub
 - Callback handling with token exchange
 - User creation/update in Supabase
+- Signed session tokens for later requests
 """
 import os
 import json
+from dataclasses import asdict
+from typing import Optional
 from urllib.parse import urlencode
 import httpx
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse, JSONResponse
 from dotenv import load_dotenv
 from app.utils.logger import logger
-from app.services.supabase_db import upsert_github_account, get_decrypted_access_token, get_github_account_by_github_id
+from app.services.supabase_db import (
+    upsert_github_account,
+    get_account_summary_async,
+    get_github_credentials_async,
+)
+from app.services.github_api import GitHubAPIError
+from app.services.github_cache import get_cached_repos
+from app.services.github_repos import REPO_FIELDS, refresh_repos
+from app.services.github_warmup import get_warmup_registry
+from app.services.github_graphql import fetch_user_overview
+from app.services.commit_store import sync_commits, sync_due, query_commits, has_history, COMMIT_FIELDS
+from app.utils.fast_json import parse_fields, project, json_response
+from app.security.session import (
+    Session,
+    SESSION_TTL_SECONDS,
+    issue_session,
+    require_session,
+    revoke_session,
+    revoke_all_sessions,
+    session_for_account,
+)
 from app.models.user import AuthResponse
 
 load_dotenv()
@@ -133,7 +157,8 @@ async def github_callback(code: str = Query(..., description="Authorization code
 
         # Step 3: Create or update user in database
         logger.info("Step 3: Creating/updating user in database...")
-        github_account = upsert_github_account(
+        github_account = await run_in_threadpool(
+            upsert_github_account,
             github_id=github_id,
             github_login=github_login,
             access_token=access_token,
@@ -141,6 +166,11 @@ async def github_callback(code: str = Query(..., description="Authorization code
             email=email
         )
 
+        session_token = issue_session(github_id, github_account.get('user_id'), github_login)
+
+        # Fetch repos and recent commits in the background so the first dashboard load is warm
+        get_warmup_registry().schedule(github_id, github_login, access_token)
+
         logger.info(f"✓ User authenticated successfully: {github_login}")
         logger.info("=== GitHub OAuth flow completed successfully ===")
 
@@ -160,7 +190,9 @@ async def github_callback(code: str = Query(..., description="Authorization code
                 "user_id": github_account.get('user_id'),
                 "github_login": github_login,
                 "scope": scope
-            }
+            },
+            "session_token": session_token,
+            "session_expires_in": SESSION_TTL_SECONDS
         }
 
         # If frontend redirect URL is configured, redirect with user info
@@ -175,7 +207,9 @@ async def github_callback(code: str = Query(..., description="Authorization code
                 "name": github_user.get('name') or '',
                 "avatar_url": github_user.get('avatar_url') or ''
             }
-            redirect_url = f"{FRONTEND_REDIRECT_URL}?{urlencode(params)}"
+            # The session token goes in the fragment so it stays out of server logs and Referer headers
+            fragment = urlencode({"session_token": session_token, "session_expires_in": SESSION_TTL_SECONDS})
+            redirect_url = f"{FRONTEND_REDIRECT_URL}?{urlencode(params)}#{fragment}"
             logger.info(f"Redirecting to frontend: {FRONTEND_REDIRECT_URL}")
             return RedirectResponse(url=redirect_url)
 
@@ -293,11 +327,50 @@ async def github_auth_status():
     }
 
 
+@router.get("/session")
+async def get_session_info(session: Session = Depends(require_session)):
+    """
+    Describe the caller's session without touching the database.
+
+    Returns:
+        dict: The verified session claims
+    """
+    return {
+        "github_id": session.github_id,
+        "user_id": session.user_id,
+        "github_login": session.github_login,
+        "expires_at": session.expires_at
+    }
+
+
+@router.post("/logout")
+async def logout(
+    everywhere: bool = Query(False, description="Revoke every session of this account"),
+    session: Session = Depends(require_session)
+):
+    """
+    Revoke the caller's session token, or all of the account's tokens.
+
+    Also stops any GitHub warm-up still running for the account.
+
+    Returns:
+        dict: Confirmation
+    """
+    get_warmup_registry().cancel(session.github_id)
+    if everywhere:
+        await run_in_threadpool(revoke_all_sessions, session.github_id)
+    else:
+        await run_in_threadpool(revoke_session, session)
+    return {"success": True}
+
+
 # =============================================================================
 # Endpoints that use the saved GitHub token
 # =============================================================================
+# A bearer session token, when sent, must belong to the github_id in the path
+# (and is required with SESSION_REQUIRED=true).
 
-@router.get("/user/{github_id}")
+@router.get("/user/{github_id}", dependencies=[Depends(session_for_account)])
 async def get_user_info(github_id: int):
     """
     Get stored GitHub account info for a user.
@@ -310,131 +383,169 @@ async def get_user_info(github_id: int):
     """
     logger.info(f"Fetching stored info for github_id: {github_id}")
 
-    account = get_github_account_by_github_id(github_id)
+    account = await get_account_summary_async(github_id)
 
     if not account:
         logger.warning(f"No account found for github_id: {github_id}")
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Return account info without the encrypted token
-    return {
-        "id": account.get('id'),
-        "user_id": account.get('user_id'),
-        "github_id": account.get('github_id'),
-        "github_login": account.get('github_login'),
-        "scope": account.get('scope'),
-        "created_at": account.get('created_at'),
-        "updated_at": account.get('updated_at')
-    }
+    # The summary projection never selects the encrypted token
+    return asdict(account)
 
 
-@router.get("/user/{github_id}/repos")
-async def get_user_repos(github_id: int):
+@router.get("/user/{github_id}/repos", dependencies=[Depends(session_for_account)])
+async def get_user_repos(
+    request: Request,
+    github_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of repo fields"),
+    refresh: bool = Query(False, description="Bypass the repo cache")
+):
     """
     Fetch repositories for a user using their saved GitHub token.
 
+    Listings are served from the shared repo cache, which GitHub webhooks
+    invalidate when a listed repository or its owner changes.
+
     Args:
         github_id: The GitHub user ID
+        fields: Optional comma-separated list of fields to return
 
     Returns:
         list: User's GitHub repositories
     """
     logger.info(f"Fetching repos for github_id: {github_id}")
+    selected = parse_fields(fields, REPO_FIELDS)
+
+    repos = None if refresh else get_cached_repos(github_id)
+    if repos is not None:
+        logger.debug(f"Serving {len(repos)} cached repositories for github_id: {github_id}")
+    else:
+        repos = await fetch_user_repos(github_id)
+
+    return json_response(request, project(repos, REPO_FIELDS, selected))
 
-    # Get the decrypted token from database
-    token = get_decrypted_access_token(github_id)
 
-    if not token:
+async def fetch_user_repos(github_id: int) -> list:
+    """
+    Fetch a user's repositories from GitHub and refresh the repo cache.
+
+    Args:
+        github_id: The GitHub user ID
+
+    Returns:
+        list: Simplified repos with every REPO_FIELDS field
+    """
+    # Get the login and decrypted token from database
+    credentials = await get_github_credentials_async(github_id)
+
+    if not credentials:
         logger.error(f"No token found for github_id: {github_id}")
         raise HTTPException(status_code=401, detail="User not authenticated or token not found")
 
+    github_login, token = credentials
     logger.debug("Using saved token to fetch repositories...")
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.github.com/user/repos",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json"
-            },
-            params={
-                "sort": "updated",
-                "per_page": 100
-            }
-        )
-
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch repos: {response.status_code}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch repositories")
-
-        repos = response.json()
-        logger.info(f"✓ Fetched {len(repos)} repositories for github_id: {github_id}")
-
-        # Return simplified repo info
-        return [
-            {
-                "id": repo.get('id'),
-                "name": repo.get('name'),
-                "full_name": repo.get('full_name'),
-                "description": repo.get('description'),
-                "html_url": repo.get('html_url'),
-                "clone_url": repo.get('clone_url'),
-                "private": repo.get('private'),
-                "language": repo.get('language'),
-                "stargazers_count": repo.get('stargazers_count'),
-                "updated_at": repo.get('updated_at')
-            }
-            for repo in repos
-        ]
+    try:
+        return await refresh_repos(github_id, github_login, token)
+    except GitHubAPIError as e:
+        logger.error(f"Failed to fetch repos: {e.status_code}")
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch repositories")
 
 
 @router.get("/user/{github_id}/repo/{repo_name}/commits")
-async def get_repo_commits(github_id: int, repo_name: str):
+async def get_repo_commits(
+    request: Request,
+    github_id: int,
+    repo_name: str,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of commit fields"),
+    author: Optional[str] = Query(None, description="Only commits by this author name"),
+    since: Optional[str] = Query(None, description="ISO 8601 lower bound on the commit date"),
+    until: Optional[str] = Query(None, description="ISO 8601 upper bound on the commit date"),
+    q: Optional[str] = Query(None, description="Substring to search for in commit messages"),
+    limit: int = Query(30, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    refresh: bool = Query(False, description="Sync with GitHub even if recently synced"),
+    session: Optional[Session] = Depends(session_for_account)
+):
     """
-    Fetch recent commits for a repository using the saved GitHub token.
+    Fetch commits for a repository from the local commit history store.
+
+    The store is filled from GitHub on first use, then kept current with
+    delta syncs (at most once per COMMIT_SYNC_INTERVAL unless refresh is set).
 
     Args:
         github_id: The GitHub user ID
         repo_name: The repository name (just the repo name, not full path)
+        fields: Optional comma-separated list of fields to return
 
     Returns:
-        list: Recent commits in the repository
+        list: Matching commits, newest first
     """
     logger.info(f"Fetching commits for repo '{repo_name}' (github_id: {github_id})")
+    selected = parse_fields(fields, COMMIT_FIELDS)
+
+    if session is not None and not refresh and not sync_due(github_id, session.github_login, repo_name):
+        # The session names the owner and nothing needs GitHub, so skip the token lookup
+        github_login = session.github_login
+    else:
+        # Get the login and decrypted token in one lookup
+        credentials = await get_github_credentials_async(github_id)
+
+        if not credentials:
+            raise HTTPException(status_code=401, detail="User not authenticated")
+
+        github_login, token = credentials
+
+        try:
+            await sync_commits(github_id, github_login, repo_name, token, force=refresh)
+        except GitHubAPIError as e:
+            if not has_history(github_id, github_login, repo_name):
+                logger.error(f"Failed to fetch commits: {e.status_code}")
+                raise HTTPException(status_code=e.status_code, detail="Failed to fetch commits")
+            logger.warning(f"⚠ Commit sync failed ({e.status_code}), serving stored history for {github_login}/{repo_name}")
+
+    commits = query_commits(
+        github_id, github_login, repo_name,
+        author=author, since=since, until=until, search=q,
+        limit=limit, offset=offset, columns=selected
+    )
+    logger.info(f"✓ Returning {len(commits)} commits for {github_login}/{repo_name}")
+    return json_response(request, commits)
+
+
+@router.get("/user/{github_id}/overview", dependencies=[Depends(session_for_account)])
+async def get_user_overview(
+    request: Request,
+    github_id: int,
+    repos: int = Query(30, ge=1, le=500, description="Maximum number of repositories"),
+    commits: int = Query(5, ge=0, le=50, description="Latest commits per repository")
+):
+    """
+    Fetch a user's repositories with their latest commits in batched GraphQL calls.
 
-    # Get the decrypted token and user info
-    token = get_decrypted_access_token(github_id)
-    account = get_github_account_by_github_id(github_id)
+    Replaces one /repos call plus one /repo/{name}/commits call per repository.
 
-    if not token or not account:
+    Args:
+        github_id: The GitHub user ID
+        repos: Maximum number of repositories, most recently updated first
+        commits: Number of latest default-branch commits per repository
+
+    Returns:
+        list: Repos shaped like /repos entries, each with a "commits" list
+    """
+    logger.info(f"Fetching overview for github_id: {github_id} ({repos} repos, {commits} commits each)")
+
+    credentials = await get_github_credentials_async(github_id)
+
+    if not credentials:
         raise HTTPException(status_code=401, detail="User not authenticated")
 
-    github_login = account.get('github_login')
+    _, token = credentials
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.github.com/repos/{github_login}/{repo_name}/commits",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json"
-            },
-            params={"per_page": 30}
-        )
+    try:
+        overview = await fetch_user_overview(token, max_repos=repos, commits_per_repo=commits)
+    except GitHubAPIError as e:
+        logger.error(f"Failed to fetch overview: {e.status_code}")
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch overview")
 
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch commits: {response.status_code}")
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch commits")
-
-        commits = response.json()
-        logger.info(f"✓ Fetched {len(commits)} commits for {github_login}/{repo_name}")
-
-        return [
-            {
-                "sha": commit.get('sha'),
-                "message": commit.get('commit', {}).get('message'),
-                "author": commit.get('commit', {}).get('author', {}).get('name'),
-                "date": commit.get('commit', {}).get('author', {}).get('date'),
-                "url": commit.get('html_url')
-            }
-            for commit in commits
-        ]
+    return json_response(request, overview)
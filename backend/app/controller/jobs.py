@@ -0,0 +1,53 @@
+"""
+AI Fix Job Controller.
+
+Status, cancellation and queue metrics for the background fix scheduler.
+"""
+from fastapi import APIRouter, HTTPException
+from app.services.fix_scheduler import get_fix_scheduler
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/stats")
+def get_job_stats():
+    """
+    Queue depth, running jobs and wait times per tenant.
+
+    Returns:
+        dict: Per-tenant queue statistics
+    """
+    return {"tenants": get_fix_scheduler().stats()}
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """
+    Get a fix job's status and result.
+
+    Args:
+        job_id: The id returned by POST /api/feedback
+
+    Returns:
+        dict: Job status, timestamps and result or error
+    """
+    job = get_fix_scheduler().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancel a queued or running fix job.
+
+    Args:
+        job_id: The job id
+
+    Returns:
+        dict: Cancellation result
+    """
+    if not get_fix_scheduler().cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    return {"status": "cancelled", "job_id": job_id}
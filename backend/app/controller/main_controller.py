@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from app.utils.metrics import metrics
 
 router = APIRouter()
 
@@ -7,3 +8,8 @@ def root():
     """Root endpoint"""
     return {"message": "Simple FastAPI REST Controller"}
 
+
+@router.get("/metrics")
+def get_metrics():
+    """In-process metrics for the worker that serves the request"""
+    return metrics.snapshot()
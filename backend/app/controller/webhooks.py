@@ -0,0 +1,88 @@
+"""
+GitHub Webhook Controller.
+
+Receives GitHub webhook deliveries, verifies their HMAC signature and
+hands them to app.services.github_webhooks after responding.
+"""
+import hashlib
+import hmac
+import json
+import os
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Request
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.shared_state import get_shared_store
+from app.services.github_webhooks import process_github_event, EVENT_HANDLERS
+
+load_dotenv()
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET')
+
+# How long delivery ids are remembered to drop redeliveries
+DELIVERY_DEDUP_TTL = 24 * 3600
+
+
+def verify_signature(body: bytes, signature: str) -> bool:
+    """
+    Check an X-Hub-Signature-256 header against the configured secret.
+
+    Args:
+        body: The raw request body
+        signature: Header value of the form "sha256=<hex digest>"
+
+    Returns:
+        True if the signature matches
+    """
+    if not signature or not signature.startswith('sha256='):
+        return False
+    expected = hmac.new(GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len('sha256='):])
+
+
+@router.post("/github", status_code=202)
+async def github_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    x_github_event: str = Header(...),
+    x_github_delivery: str = Header(None),
+    x_hub_signature_256: str = Header(None)
+):
+    """
+    Receive a GitHub webhook delivery.
+
+    Responds as soon as the signature is verified; cache invalidation runs
+    as a background task.
+
+    Returns:
+        dict: Acknowledgement
+    """
+    if not GITHUB_WEBHOOK_SECRET:
+        logger.error("✗ GITHUB_WEBHOOK_SECRET is not configured")
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+
+    body = await request.body()
+    if not verify_signature(body, x_hub_signature_256):
+        logger.warning(f"⚠ Rejected GitHub webhook with invalid signature (event: {x_github_event})")
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    if x_github_event == 'ping':
+        return {"status": "pong"}
+
+    if x_github_event not in EVENT_HANDLERS:
+        return {"status": "ignored", "event": x_github_event}
+
+    # Parse before claiming the delivery id, so a rejected body doesn't burn it
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    # GitHub redelivers on timeouts; only one worker should apply a delivery
+    if x_github_delivery and not get_shared_store().add(f"webhook:{x_github_delivery}", ttl=DELIVERY_DEDUP_TTL):
+        return {"status": "duplicate", "delivery": x_github_delivery}
+
+    background_tasks.add_task(process_github_event, x_github_event, payload)
+    logger.info(f"Accepted GitHub {x_github_event} webhook (delivery: {x_github_delivery})")
+    return {"status": "accepted", "event": x_github_event}
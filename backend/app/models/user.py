@@ -71,4 +71,6 @@ class AuthResponse(BaseModel):
     message: str
     user: Optional[dict] = None
     github_account: Optional[dict] = None
+    session_token: Optional[str] = None
+    session_expires_in: Optional[int] = None
 
@@ -0,0 +1,40 @@
+"""
+Admin authentication for operational endpoints (profiles, diagnostics).
+
+Admin routes require `Authorization: Bearer <ADMIN_TOKEN>`. With no
+ADMIN_TOKEN configured they are disabled entirely.
+"""
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """
+    Check a presented token against ADMIN_TOKEN in constant time.
+
+    Args:
+        token: The token to check
+
+    Returns:
+        True if admin access is configured and the token matches
+    """
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """FastAPI dependency that rejects requests without the admin bearer token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not is_admin_token(token):
+        raise HTTPException(status_code=401, detail="Admin token required")
@@ -0,0 +1,269 @@
+"""
+Admission control for the feedback endpoints.
+
+Two layers:
+- token-bucket rate limits keyed by site, user and client IP, kept in
+  process memory or in the shared state store (so all workers share one
+  budget)
+- load shedding: when too many requests are in flight or recent latency
+  is above a threshold, new requests are turned away with 429
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from app.utils.logger import logger
+from app.utils.shared_state import get_shared_store
+
+load_dotenv()
+
+# Quotas are "<requests>/<seconds>", e.g. "30/60" = 30 per minute with bursts of 30
+RATE_LIMIT_SITE = os.getenv('RATE_LIMIT_SITE', '120/60')
+RATE_LIMIT_USER = os.getenv('RATE_LIMIT_USER', '60/60')
+RATE_LIMIT_IP = os.getenv('RATE_LIMIT_IP', '30/60')
+# "memory" (per process) or "shared" (all workers on this host)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'shared')
+
+# Load shedding thresholds, per worker process
+LOAD_SHED_MAX_INFLIGHT = int(os.getenv('LOAD_SHED_MAX_INFLIGHT', '64'))
+LOAD_SHED_MAX_LATENCY_MS = float(os.getenv('LOAD_SHED_MAX_LATENCY_MS', '5000'))
+LOAD_SHED_RETRY_AFTER = int(os.getenv('LOAD_SHED_RETRY_AFTER', '2'))
+
+
+class RateLimited(Exception):
+    """Raised when a request exceeds one of its quotas."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def parse_quota(quota: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse "<requests>/<seconds>" into (capacity, refill per second).
+
+    Returns:
+        None if the quota is empty, "off" or allows 0 requests (unlimited)
+
+    Raises:
+        ValueError: If the period is not positive
+    """
+    if not quota or quota.strip() in ('0', 'off'):
+        return None
+    count, _, period = quota.partition('/')
+    capacity = float(count)
+    if capacity <= 0:
+        return None
+    seconds = float(period or 1)
+    if seconds <= 0:
+        raise ValueError(f"Invalid quota {quota!r}: period must be positive")
+    return capacity, capacity / seconds
+
+
+# (key, capacity, refill per second[, cost]); cost defaults to one request
+Limit = Tuple[Union[str, float], ...]
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, rate: float) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBucketBackend:
+    """Token buckets in process memory."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, limits: List[Limit]) -> Optional[Tuple[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            levels = {}
+            for key, capacity, rate, *cost in limits:
+                cost = cost[0] if cost else 1
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                levels[key] = _refill(tokens, updated, now, capacity, rate)
+                if levels[key] < cost:
+                    return key, (cost - levels[key]) / rate
+            # Only consume once every bucket has allowed the request
+            for key, _, _, *cost in limits:
+                self._buckets[key] = (levels[key] - (cost[0] if cost else 1), now)
+        return None
+
+
+class SharedBucketBackend:
+    """Token buckets in the shared state store, consistent across workers."""
+
+    def take(self, limits: List[Limit]) -> Optional[Tuple[str, float]]:
+        store = get_shared_store()
+        now = time.time()
+        with store.transaction() as conn:
+            levels = {}
+            for key, capacity, rate, *cost in limits:
+                cost = cost[0] if cost else 1
+                row = conn.execute("SELECT value FROM kv WHERE key = ?", (f"bucket:{key}",)).fetchone()
+                if row:
+                    tokens, updated = (float(part) for part in row['value'].split(':'))
+                else:
+                    tokens, updated = capacity, now
+                levels[key] = _refill(tokens, updated, now, capacity, rate)
+                if levels[key] < cost:
+                    return key, (cost - levels[key]) / rate
+            for key, capacity, rate, *cost in limits:
+                # A bucket idle for capacity/rate seconds is full again, so it can expire
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (f"bucket:{key}", f"{levels[key] - (cost[0] if cost else 1)}:{now}", now + capacity / rate)
+                )
+        return None
+
+
+_backend = None
+
+
+def get_bucket_backend():
+    """Get the configured bucket backend with lazy initialization."""
+    global _backend
+
+    if _backend is None:
+        _backend = SharedBucketBackend() if RATE_LIMIT_BACKEND == 'shared' else MemoryBucketBackend()
+        logger.debug(f"Rate limit backend: {RATE_LIMIT_BACKEND}")
+
+    return _backend
+
+
+def check_rate_limits(
+    site_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    ip: Optional[str] = None,
+    cost: int = 1
+) -> None:
+    """
+    Consume `cost` requests from every applicable bucket, or none if any is short.
+
+    Raises:
+        RateLimited: If any bucket is exhausted
+    """
+    limits = []
+    for prefix, value, quota in (
+        ('site', site_id, RATE_LIMIT_SITE),
+        ('user', user_id, RATE_LIMIT_USER),
+        ('ip', ip, RATE_LIMIT_IP),
+    ):
+        parsed = parse_quota(quota)
+        if value and parsed:
+            limits.append((f"{prefix}:{value}", *parsed, cost))
+
+    if not limits:
+        return
+
+    denied = get_bucket_backend().take(limits)
+    if denied:
+        key, retry_after = denied
+        logger.warning(f"⚠ Rate limit exceeded for {key}")
+        raise RateLimited(key, retry_after)
+
+
+def rate_limit_http(
+    site_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    ip: Optional[str] = None,
+    cost: int = 1
+) -> None:
+    """check_rate_limits, raising a 429 HTTPException with Retry-After instead."""
+    try:
+        check_rate_limits(site_id=site_id, user_id=user_id, ip=ip, cost=cost)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many feedback submissions. Please retry later.",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.999)))}
+        )
+
+
+class LoadShedder:
+    """Tracks in-flight requests and latency, and decides when to shed load."""
+
+    def __init__(self, max_inflight: int, max_latency_ms: float, alpha: float = 0.2):
+        self.max_inflight = max_inflight
+        self.max_latency_ms = max_latency_ms
+        self.alpha = alpha
+        self.inflight = 0
+        self.latency_ms = 0.0  # Exponentially weighted moving average
+        self._lock = threading.Lock()
+
+    def overloaded(self) -> bool:
+        return self.inflight >= self.max_inflight or self.latency_ms > self.max_latency_ms
+
+    def enter(self) -> None:
+        with self._lock:
+            self.inflight += 1
+
+    def exit(self, elapsed_ms: Optional[float]) -> None:
+        """Leave a request; None counts it as in flight only, not towards latency."""
+        with self._lock:
+            self.inflight -= 1
+            if elapsed_ms is not None:
+                self.latency_ms += self.alpha * (elapsed_ms - self.latency_ms)
+
+    def shed(self) -> None:
+        """Record a rejected request so latency recovers while we are shedding."""
+        with self._lock:
+            self.latency_ms *= (1 - self.alpha)
+
+
+feedback_shedder = LoadShedder(LOAD_SHED_MAX_INFLIGHT, LOAD_SHED_MAX_LATENCY_MS)
+
+
+def _shed_if_overloaded() -> None:
+    if feedback_shedder.overloaded():
+        feedback_shedder.shed()
+        logger.warning(
+            f"⚠ Shedding feedback request (in flight: {feedback_shedder.inflight}, "
+            f"latency: {feedback_shedder.latency_ms:.0f}ms)"
+        )
+        raise HTTPException(
+            status_code=429,
+            detail="Server is busy. Please retry later.",
+            headers={"Retry-After": str(LOAD_SHED_RETRY_AFTER)}
+        )
+
+
+def feedback_load_guard():
+    """
+    FastAPI dependency that sheds load on the feedback endpoints.
+
+    Raises:
+        HTTPException: 429 with Retry-After while the worker is overloaded
+    """
+    _shed_if_overloaded()
+
+    start = time.perf_counter()
+    feedback_shedder.enter()
+    try:
+        yield
+    finally:
+        feedback_shedder.exit((time.perf_counter() - start) * 1000)
+
+
+def feedback_bulk_load_guard():
+    """
+    feedback_load_guard for bulk uploads.
+
+    A bulk upload takes as long as its body, so it counts towards the
+    in-flight limit but not the latency average that single submissions
+    are judged by.
+
+    Raises:
+        HTTPException: 429 with Retry-After while the worker is overloaded
+    """
+    _shed_if_overloaded()
+
+    feedback_shedder.enter()
+    try:
+        yield
+    finally:
+        feedback_shedder.exit(None)
@@ -1,20 +1,216 @@
+"""
+Input sanitization for feedback text.
+
+All rules are compiled into one regex, so each message is scanned once no
+matter how many rules are configured:
+
+- literal rules are merged into a trie, so shared prefixes are matched once
+- a leading lookahead on the possible first characters lets the regex
+  engine skip ahead instead of trying every rule at every position
+- each rule ends in an empty named group, so a match reports its rule id
+"""
+import json
+import os
 import re
+from typing import Iterable, List, NamedTuple, Optional
+from dotenv import load_dotenv
+from app.utils.logger import logger
+
+load_dotenv()
+
+MAX_INPUT_LENGTH = int(os.getenv('SANITIZE_MAX_LENGTH', '2000'))
+
+# Optional JSON file: [{"id": "...", "pattern": "...", "literal": false}, ...]
+SANITIZE_RULES_PATH = os.getenv('SANITIZE_RULES_PATH')
+
+
+class Rule(NamedTuple):
+    id: str
+    pattern: str
+    literal: bool = False
+
+
+class RuleMatch(NamedTuple):
+    rule_id: str
+    start: int
+    end: int
+
+
+class SanitizeResult(NamedTuple):
+    text: Optional[str]  # Cleaned text, or None if rejected
+    error: Optional[str]  # Rejection reason
+    rule_id: Optional[str] = None
+
+
+class MaliciousInputError(ValueError):
+    """Raised when text matches a blacklist rule."""
+
+    def __init__(self, rule_id: str):
+        super().__init__("Malicious input")
+        self.rule_id = rule_id
+
+
+DEFAULT_RULES = [
+    Rule("script_open", r"<script.*?>"),
+    Rule("script_close", "</script>", literal=True),
+    Rule("sql_drop_table", "DROP TABLE", literal=True),
+    Rule("sql_comment", "--", literal=True),
+]
+
+
+def load_rules(path: Optional[str] = None) -> List[Rule]:
+    """
+    Load rules from a JSON file, falling back to DEFAULT_RULES.
+
+    Args:
+        path: JSON rules file (defaults to SANITIZE_RULES_PATH)
+
+    Returns:
+        list: Configured rules
+    """
+    path = path or SANITIZE_RULES_PATH
+    if not path:
+        return list(DEFAULT_RULES)
+
+    with open(path) as f:
+        rules = [Rule(r["id"], r["pattern"], r.get("literal", False)) for r in json.load(f)]
+    logger.info(f"✓ Loaded {len(rules)} sanitize rule(s) from {path}")
+    return rules
+
+
+_REGEX_SPECIAL = set(".^$*+?{}[]|()\\")
+
+
+def _first_chars(rule: Rule) -> Optional[set]:
+    """
+    Characters a match of rule can start with, or None if not cheaply known.
+
+    Only literal rules and regex rules without any metacharacters qualify;
+    anything else (alternations, classes, quantifiers, escapes) can start
+    with characters a look at the pattern text won't reveal.
+    """
+    pattern = rule.pattern
+    if not pattern:
+        return None
+    if not rule.literal and any(ch in _REGEX_SPECIAL for ch in pattern):
+        return None
+    first = pattern[0]
+    return {first.lower(), first.upper()}
 
-def sanitize_text(text: str) -> str:
-    text = text.strip()
 
-    if len(text) > 2000:
-        raise ValueError("Input too long")
+def _trie_regex(literals: List[tuple]) -> str:
+    """
+    Build a regex matching any of the (group, literal) pairs, sharing common prefixes.
 
-    blacklist = [
-        r"<script.*?>",
-        r"</script>",
-        r"DROP TABLE",
-        r"--"
-    ]
+    Longer literals are tried before a shorter one ending at the same node.
+    """
+    trie: dict = {}
+    for group, literal in literals:
+        node = trie
+        for ch in literal.lower():
+            node = node.setdefault(ch, {})
+        node.setdefault('', group)
+
+    def emit(node: dict) -> str:
+        alternatives = [re.escape(ch) + emit(child) for ch, child in node.items() if ch != '']
+        if '' in node:
+            alternatives.append(f"(?P<{node['']}>)")
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    return emit(trie)
+
+
+class SanitizeEngine:
+    """Matches text against every rule in a single regex pass."""
+
+    def __init__(self, rules: Iterable[Rule], max_length: int = MAX_INPUT_LENGTH):
+        self.rules = list(rules)
+        self.max_length = max_length
+        self._group_to_rule = {}
+
+        literals = []
+        alternatives = []
+        first_chars: Optional[set] = set()
+        for index, rule in enumerate(self.rules):
+            group = f"r{index}"
+            self._group_to_rule[group] = rule.id
+            if rule.literal:
+                literals.append((group, rule.pattern))
+            else:
+                alternatives.append(f"(?:{rule.pattern})(?P<{group}>)")
+
+            chars = _first_chars(rule)
+            first_chars = first_chars | chars if first_chars is not None and chars else None
+
+        if literals:
+            alternatives.insert(0, _trie_regex(literals))
+
+        if not alternatives:
+            # A pattern that never matches keeps an empty rule set valid
+            combined = r"(?!)"
+        elif first_chars:
+            charset = "".join(re.escape(ch) for ch in sorted(first_chars))
+            combined = f"(?=[{charset}])(?:{'|'.join(alternatives)})"
+        else:
+            combined = "|".join(alternatives)
+
+        self._regex = re.compile(combined, re.IGNORECASE)
+
+    def first_match(self, text: str) -> Optional[str]:
+        """Return the id of the earliest matching rule, or None."""
+        match = self._regex.search(text)
+        return self._group_to_rule[match.lastgroup] if match else None
+
+    def scan(self, text: str) -> List[RuleMatch]:
+        """Return every non-overlapping rule match in text."""
+        return [
+            RuleMatch(self._group_to_rule[m.lastgroup], m.start(), m.end())
+            for m in self._regex.finditer(text)
+        ]
+
+    def sanitize(self, text: str) -> str:
+        text = text.strip()
+
+        if len(text) > self.max_length:
+            raise ValueError("Input too long")
+
+        rule_id = self.first_match(text)
+        if rule_id:
+            raise MaliciousInputError(rule_id)
+
+        return text
+
+    def sanitize_batch(self, texts: Iterable[str]) -> List[SanitizeResult]:
+        """Sanitize many texts, reporting rejections instead of raising."""
+        results = []
+        for text in texts:
+            try:
+                results.append(SanitizeResult(self.sanitize(text), None))
+            except MaliciousInputError as e:
+                results.append(SanitizeResult(None, str(e), e.rule_id))
+            except ValueError as e:
+                results.append(SanitizeResult(None, str(e)))
+        return results
+
+
+_engine: Optional[SanitizeEngine] = None
+
+
+def get_engine() -> SanitizeEngine:
+    """Get the shared engine, compiling the configured rules on first use."""
+    global _engine
+
+    if _engine is None:
+        _engine = SanitizeEngine(load_rules())
+
+    return _engine
+
+
+def sanitize_text(text: str) -> str:
+    return get_engine().sanitize(text)
 
-    for pattern in blacklist:
-        if re.search(pattern, text, re.IGNORECASE):
-            raise ValueError("Malicious input")
 
-    return text
+def sanitize_batch(texts: Iterable[str]) -> List[SanitizeResult]:
+    return get_engine().sanitize_batch(texts)
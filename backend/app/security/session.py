@@ -0,0 +1,216 @@
+"""
+Signed, expiring session tokens issued after GitHub login.
+
+A token is `<base64url claims>.<base64url HMAC-SHA256>` with claims
+gid (GitHub id), uid (user id), login, iat, exp and jti. Verifying one is
+a local HMAC check, so authenticated requests don't need a Supabase
+lookup to know who is calling. The encrypted GitHub token is still only
+fetched when a request actually calls GitHub.
+
+Revocation goes through a denylist in the shared state store: one row per
+revoked jti that expires with the token, plus a per-account cutoff that
+revokes every token issued before logout-everywhere.
+
+The signing key is SESSION_SECRET, or derived from the token encryption
+keys when that is unset: tokens are signed with the key derived from the
+newest one and verified against all of them, so prepending a new key to
+TOKEN_ENCRYPTION_KEYS doesn't log everyone out.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from fastapi import Header, HTTPException, Path
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.shared_state import get_shared_store
+from app.utils.encryption import derive_keys
+
+load_dotenv()
+
+SESSION_SECRET = os.getenv('SESSION_SECRET')
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(7 * 24 * 3600)))
+# Require a session token on /auth/github/user/{github_id}/... routes
+SESSION_REQUIRED = os.getenv('SESSION_REQUIRED', 'false').lower() == 'true'
+
+_signing_keys: Optional[List[bytes]] = None
+
+
+@dataclass(frozen=True)
+class Session:
+    """Verified claims of a session token."""
+    github_id: int
+    user_id: str
+    github_login: str
+    issued_at: int
+    expires_at: int
+    jti: str
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def get_signing_keys() -> List[bytes]:
+    """Get the HMAC keys, newest (the one used to sign) first, with lazy initialization."""
+    global _signing_keys
+
+    if _signing_keys is None:
+        if SESSION_SECRET:
+            _signing_keys = [SESSION_SECRET.encode()]
+        else:
+            _signing_keys = derive_keys("session-token-signing")
+            logger.debug("Session signing keys derived from the token encryption keys")
+
+    return _signing_keys
+
+
+def _sign(payload: str, key: bytes) -> str:
+    return _b64encode(hmac.new(key, payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def _signature_valid(payload: str, signature: str) -> bool:
+    # Check every key so tokens signed before a key rotation stay valid
+    return any(hmac.compare_digest(signature, _sign(payload, key)) for key in get_signing_keys())
+
+
+def issue_session(github_id: int, user_id: str, github_login: str, ttl: int = SESSION_TTL_SECONDS) -> str:
+    """
+    Issue a session token for an authenticated GitHub account.
+
+    Args:
+        github_id: The GitHub user ID
+        user_id: The internal user ID
+        github_login: The GitHub login
+        ttl: Lifetime in seconds
+
+    Returns:
+        The signed token
+    """
+    now = int(time.time())
+    claims = {
+        "gid": github_id,
+        "uid": user_id,
+        "login": github_login,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": _b64encode(secrets.token_bytes(12)),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    metrics.inc("sessions_issued")
+    return f"{payload}.{_sign(payload, get_signing_keys()[0])}"
+
+
+def verify_session(token: str) -> Optional[Session]:
+    """
+    Verify a session token's signature, expiry and revocation status.
+
+    Args:
+        token: The token from the Authorization header
+
+    Returns:
+        The session, or None if the token is invalid, expired or revoked
+    """
+    payload, _, signature = token.partition('.')
+    if not payload or not signature or not _signature_valid(payload, signature):
+        metrics.inc("session_rejected", reason="signature")
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+        session = Session(
+            github_id=int(claims["gid"]),
+            user_id=str(claims["uid"]),
+            github_login=str(claims["login"]),
+            issued_at=int(claims["iat"]),
+            expires_at=int(claims["exp"]),
+            jti=str(claims["jti"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        metrics.inc("session_rejected", reason="malformed")
+        return None
+
+    if session.expires_at <= time.time():
+        metrics.inc("session_rejected", reason="expired")
+        return None
+    if is_revoked(session):
+        metrics.inc("session_rejected", reason="revoked")
+        return None
+    return session
+
+
+def is_revoked(session: Session) -> bool:
+    """Check the denylist for the token and for a logout-everywhere cutoff."""
+    store = get_shared_store()
+    if store.get(f"session:revoked:{session.jti}") is not None:
+        return True
+    cutoff = store.get(f"session:revoked-before:{session.github_id}")
+    return cutoff is not None and session.issued_at < float(cutoff)
+
+
+def revoke_session(session: Session) -> None:
+    """Deny one token until it would have expired anyway."""
+    ttl = max(session.expires_at - time.time(), 1)
+    get_shared_store().set(f"session:revoked:{session.jti}", '1', ttl=ttl)
+    logger.info(f"✓ Revoked session for github_id: {session.github_id}")
+
+
+def revoke_all_sessions(github_id: int) -> None:
+    """Deny every token issued to an account up to now."""
+    # Tokens issued in the current second are covered too, since iat has whole-second precision
+    get_shared_store().set(f"session:revoked-before:{github_id}", str(int(time.time()) + 1), ttl=SESSION_TTL_SECONDS)
+    logger.info(f"✓ Revoked all sessions for github_id: {github_id}")
+
+
+def get_session(authorization: Optional[str] = Header(None)) -> Optional[Session]:
+    """
+    FastAPI dependency returning the caller's session, if they sent one.
+
+    Raises:
+        HTTPException: 401 if a bearer token was sent but is not valid
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    session = verify_session(token.strip())
+    if session is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session", headers={"WWW-Authenticate": "Bearer"})
+    return session
+
+
+def require_session(authorization: Optional[str] = Header(None)) -> Session:
+    """FastAPI dependency that rejects requests without a valid session."""
+    session = get_session(authorization)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Session token required", headers={"WWW-Authenticate": "Bearer"})
+    return session
+
+
+def session_for_account(
+    github_id: int = Path(...),
+    authorization: Optional[str] = Header(None)
+) -> Optional[Session]:
+    """
+    FastAPI dependency for /user/{github_id}/... routes.
+
+    A session, when present, must belong to github_id. Without one the
+    request is allowed unless SESSION_REQUIRED is set.
+
+    Raises:
+        HTTPException: 401 if a session is required or invalid, 403 if it is someone else's
+    """
+    session = require_session(authorization) if SESSION_REQUIRED else get_session(authorization)
+    if session is not None and session.github_id != github_id:
+        raise HTTPException(status_code=403, detail="Session does not match this account")
+    return session
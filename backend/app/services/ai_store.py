@@ -0,0 +1,208 @@
+"""
+Content-addressed, compressed storage for AI analysis text.
+
+Gemini analyses are several KB each. Rather than inlining them in feedback
+documents (and every query that reads those), they are stored once in the
+ai_analyses collection:
+
+    {_id: sha256 hex of the text, codec: "zstd", data: <compressed bytes>,
+     size: <uncompressed bytes>, refs: <feedback documents using it>}
+
+Feedback documents only carry ai_analysis_id; identical analyses share a row.
+refs moves only when a feedback document's link changes, so job retries
+don't inflate it. A fix job can finish while its feedback is still in the
+local spool; the link is then parked in the shared store and applied by
+the spool drainer once the document reaches Mongo.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+import zstandard
+from bson import Binary, ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from pymongo.errors import PyMongoError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.shared_state import get_shared_store
+from app.services.db import get_ai_analysis_collection, get_feedback_collection
+
+load_dotenv()
+
+AI_ANALYSIS_ZSTD_LEVEL = int(os.getenv('AI_ANALYSIS_ZSTD_LEVEL', '10'))
+
+CODEC = "zstd"
+
+# How long a link for a spooled feedback document waits for the drainer
+PENDING_LINK_TTL = 7 * 24 * 3600
+
+
+def analysis_id(text: str) -> str:
+    """Content address of an analysis: sha256 of its UTF-8 text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def store_analysis(text: str) -> str:
+    """
+    Store an analysis, sharing the row with any identical earlier analysis.
+
+    New rows start with refs 0; linking a feedback document counts it.
+
+    Args:
+        text: The analysis text
+
+    Returns:
+        The analysis id
+    """
+    collection = get_ai_analysis_collection()
+    if collection is None:
+        raise RuntimeError("Database connection unavailable")
+
+    raw = text.encode('utf-8')
+    digest = analysis_id(text)
+    data = zstandard.ZstdCompressor(level=AI_ANALYSIS_ZSTD_LEVEL).compress(raw)
+
+    result = collection.update_one(
+        {"_id": digest},
+        {
+            "$setOnInsert": {
+                "codec": CODEC,
+                "data": Binary(data),
+                "size": len(raw),
+                "refs": 0,
+                "created_at": datetime.now(timezone.utc)
+            }
+        },
+        upsert=True
+    )
+
+    if result.upserted_id is None:
+        metrics.inc("ai_analysis_dedup_hits")
+    else:
+        metrics.inc("ai_analysis_bytes_raw", len(raw))
+        metrics.inc("ai_analysis_bytes_stored", len(data))
+    return digest
+
+
+def load_analysis(digest: str) -> Optional[str]:
+    """
+    Fetch and decompress an analysis.
+
+    Args:
+        digest: The id returned by store_analysis
+
+    Returns:
+        The analysis text, or None if it does not exist
+    """
+    collection = get_ai_analysis_collection()
+    if collection is None:
+        raise RuntimeError("Database connection unavailable")
+
+    row = collection.find_one({"_id": digest}, {"codec": 1, "data": 1})
+    if row is None:
+        return None
+    if row.get("codec") != CODEC:
+        raise ValueError(f"Unknown analysis codec: {row.get('codec')}")
+    return zstandard.ZstdDecompressor().decompress(bytes(row["data"])).decode('utf-8')
+
+
+def _link_feedback(feedback_id: ObjectId, link: Dict[str, Any]) -> bool:
+    """
+    Set a feedback document's analysis link and move refs if the analysis changed.
+
+    Returns:
+        False if the document is not in MongoDB
+    """
+    previous = get_feedback_collection().find_one_and_update(
+        {"_id": feedback_id}, {"$set": link}, projection={"ai_analysis_id": 1}
+    )
+    if previous is None:
+        return False
+
+    old_digest = previous.get("ai_analysis_id")
+    if old_digest != link["ai_analysis_id"]:
+        analyses = get_ai_analysis_collection()
+        analyses.update_one({"_id": link["ai_analysis_id"]}, {"$inc": {"refs": 1}})
+        if old_digest:
+            analyses.update_one({"_id": old_digest}, {"$inc": {"refs": -1}})
+    return True
+
+
+def _pending_link_key(feedback_id: str) -> str:
+    return f"feedback-link:{feedback_id}"
+
+
+def apply_pending_links(feedback_ids: Iterable[str]) -> int:
+    """
+    Apply links parked for feedback documents that were still spooled.
+
+    Called by the spool drainer after inserting documents.
+
+    Args:
+        feedback_ids: Ids of the documents just inserted
+
+    Returns:
+        Number of links applied
+    """
+    store = get_shared_store()
+    applied = 0
+    for feedback_id in feedback_ids:
+        key = _pending_link_key(feedback_id)
+        value = store.get(key)
+        if value is None:
+            continue
+        if _link_feedback(ObjectId(feedback_id), json.loads(value)):
+            store.delete(key)
+            applied += 1
+    if applied:
+        logger.info(f"✓ Linked {applied} AI analysis result(s) to drained feedback")
+    return applied
+
+
+def attach_fix_result(feedback_id: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Move a fix job's analysis text into the store and link it from the feedback.
+
+    Falls back to returning the result unchanged if Mongo is unavailable, so
+    the analysis is never lost. If the feedback is still spooled, the link is
+    parked until the drainer inserts it.
+
+    Args:
+        feedback_id: Id of the feedback document the job ran for
+        result: analyze_and_fix_feedback's result
+
+    Returns:
+        The result with ai_analysis replaced by ai_analysis_id
+    """
+    text = result.get("ai_analysis")
+    if not text:
+        return result
+
+    try:
+        digest = store_analysis(text)
+    except (PyMongoError, RuntimeError) as e:
+        logger.warning(f"⚠ Could not store AI analysis, keeping it inline in the job result: {e}")
+        return result
+
+    lean = {k: v for k, v in result.items() if k != "ai_analysis"}
+    lean["ai_analysis_id"] = digest
+
+    if feedback_id:
+        link = {"ai_analysis_id": digest, "fix_status": result.get("status"), "pr_url": result.get("pr_url")}
+        try:
+            object_id = ObjectId(feedback_id)
+            if not _link_feedback(object_id, link):
+                # Still in the local spool: park the link for the drainer, then
+                # retry once in case the drain inserted the document meanwhile
+                key = _pending_link_key(feedback_id)
+                get_shared_store().set(key, json.dumps(link), ttl=PENDING_LINK_TTL)
+                if _link_feedback(object_id, link):
+                    get_shared_store().delete(key)
+                else:
+                    logger.info(f"Feedback {feedback_id} is still spooled, analysis link deferred to the drain")
+        except (PyMongoError, InvalidId, AttributeError) as e:
+            logger.warning(f"⚠ Could not link analysis to feedback {feedback_id}: {e}")
+
+    return lean
@@ -0,0 +1,339 @@
+"""
+Local commit history store, synced incrementally from GitHub.
+
+Commits are kept per (github_id, owner, repo) in a SQLite database. The
+first sync pages through history once; later syncs ask GitHub only for
+commits since the sync cursor and de-duplicate by SHA.
+
+commit_sync records per repo whether the initial fill completed, the
+cursor (newest commit date fetched by a completed sync) and head_sha (the
+newest commit the stored history is known to be contiguous with). Only
+syncs against GitHub move the cursor; push webhooks append commits only
+on top of head_sha, so a dropped or truncated delivery can never make a
+delta sync skip over missing commits.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.local_storage import data_path, open_sqlite
+from app.services.github_api import github_get
+
+load_dotenv()
+
+COMMIT_STORE_PATH = os.getenv('COMMIT_STORE_PATH')
+# Minimum seconds between delta syncs of the same repo
+COMMIT_SYNC_INTERVAL = float(os.getenv('COMMIT_SYNC_INTERVAL', '60'))
+# Pages of 100 commits fetched on the initial fill
+COMMIT_SYNC_MAX_PAGES = int(os.getenv('COMMIT_SYNC_MAX_PAGES', '10'))
+
+PAGE_SIZE = 100
+
+# Columns returned by query_commits, in response order
+COMMIT_FIELDS = ("sha", "message", "author", "date", "url")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    github_id INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    message TEXT,
+    author TEXT,
+    date TEXT,
+    url TEXT,
+    PRIMARY KEY (github_id, owner, repo, sha)
+);
+CREATE INDEX IF NOT EXISTS idx_commits_repo_date ON commits(github_id, owner, repo, date);
+CREATE TABLE IF NOT EXISTS commit_sync (
+    github_id INTEGER NOT NULL,
+    owner TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    filled INTEGER NOT NULL DEFAULT 0,
+    cursor TEXT,
+    head_sha TEXT,
+    PRIMARY KEY (github_id, owner, repo)
+);
+"""
+
+# Columns added to commit_sync after its first release
+_SYNC_COLUMNS = {
+    "filled": "INTEGER NOT NULL DEFAULT 0",
+    "cursor": "TEXT",
+    "head_sha": "TEXT",
+}
+
+_local = threading.local()
+
+
+def _conn():
+    """Get this thread's connection to the commit store."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'pid', None) != os.getpid():
+        conn = open_sqlite(COMMIT_STORE_PATH or data_path('commits.db'))
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _migrate(conn) -> None:
+    """Add missing commit_sync columns; existing rows refill once, since their fill state is unknown."""
+    existing = {row['name'] for row in conn.execute("PRAGMA table_info(commit_sync)")}
+    for column, definition in _SYNC_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE commit_sync ADD COLUMN {column} {definition}")
+
+
+def _row_from_api(commit: Dict[str, Any]) -> tuple:
+    """Flatten a GitHub commit object into (sha, message, author, date, url)."""
+    details = commit.get('commit') or {}
+    author = details.get('author') or {}
+    return (
+        commit.get('sha'),
+        details.get('message'),
+        author.get('name'),
+        author.get('date'),
+        commit.get('html_url')
+    )
+
+
+def store_commits(github_id: int, owner: str, repo: str, rows: List[tuple]) -> int:
+    """
+    Insert commit rows, ignoring SHAs that are already stored.
+
+    Args:
+        github_id: The GitHub user ID the history belongs to
+        owner: Repository owner login
+        repo: Repository name
+        rows: (sha, message, author, date, url) tuples
+
+    Returns:
+        Number of newly stored commits
+    """
+    if not rows:
+        return 0
+    conn = _conn()
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO commits (github_id, owner, repo, sha, message, author, date, url) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(github_id, owner, repo, *row) for row in rows]
+    )
+    return conn.total_changes - before
+
+
+def _sync_state(github_id: int, owner: str, repo: str) -> Optional[Dict[str, Any]]:
+    row = _conn().execute(
+        "SELECT synced_at, filled, cursor, head_sha FROM commit_sync WHERE github_id = ? AND owner = ? AND repo = ?",
+        (github_id, owner, repo)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def _synced_at(github_id: int, owner: str, repo: str) -> float:
+    state = _sync_state(github_id, owner, repo)
+    return state['synced_at'] if state else 0.0
+
+
+def _mark_synced(github_id: int, owner: str, repo: str, cursor: Optional[str], head_sha: Optional[str]) -> None:
+    """Record a completed sync; the cursor never moves backwards."""
+    _conn().execute(
+        "INSERT INTO commit_sync (github_id, owner, repo, synced_at, filled, cursor, head_sha) "
+        "VALUES (?, ?, ?, ?, 1, ?, ?) "
+        "ON CONFLICT (github_id, owner, repo) DO UPDATE SET "
+        "synced_at = excluded.synced_at, filled = 1, "
+        "cursor = CASE WHEN commit_sync.cursor IS NULL OR excluded.cursor > commit_sync.cursor "
+        "THEN excluded.cursor ELSE commit_sync.cursor END, "
+        "head_sha = COALESCE(excluded.head_sha, commit_sync.head_sha)",
+        (github_id, owner, repo, time.time(), cursor, head_sha)
+    )
+
+
+def sync_due(github_id: int, owner: str, repo: str) -> bool:
+    """Return True if the repo was not synced within COMMIT_SYNC_INTERVAL."""
+    return time.time() - _synced_at(github_id, owner, repo) >= COMMIT_SYNC_INTERVAL
+
+
+def has_history(github_id: int, owner: str, repo: str) -> bool:
+    """Return True if any commits are stored for the repo."""
+    row = _conn().execute(
+        "SELECT 1 FROM commits WHERE github_id = ? AND owner = ? AND repo = ? LIMIT 1",
+        (github_id, owner, repo)
+    ).fetchone()
+    return row is not None
+
+
+async def sync_commits(github_id: int, owner: str, repo: str, token: str, force: bool = False) -> int:
+    """
+    Bring the stored history for a repo up to date.
+
+    Until an initial fill has completed, every sync is a full fill (up to
+    COMMIT_SYNC_MAX_PAGES pages); a fill that fails partway is started
+    again rather than treated as history to build deltas on.
+
+    Args:
+        github_id: The GitHub user ID the history belongs to
+        owner: Repository owner login
+        repo: Repository name
+        token: The user's GitHub access token
+        force: Sync even if the repo was synced within COMMIT_SYNC_INTERVAL
+
+    Returns:
+        Number of newly stored commits
+
+    Raises:
+        GitHubAPIError: If GitHub rejects the request
+    """
+    if not force and not sync_due(github_id, owner, repo):
+        return 0
+
+    state = _sync_state(github_id, owner, repo)
+    cursor = state['cursor'] if state and state['filled'] else None
+    params: Dict[str, Any] = {"per_page": PAGE_SIZE}
+    if cursor:
+        # GitHub's since is inclusive, so the newest stored commit comes back and is de-duplicated
+        params["since"] = cursor
+        max_pages = None
+        logger.debug(f"Delta sync for {owner}/{repo} since {cursor}")
+    else:
+        max_pages = COMMIT_SYNC_MAX_PAGES
+        logger.info(f"Initial commit history fill for {owner}/{repo}")
+
+    added = 0
+    newest_date = None
+    head_sha = None
+    page = 1
+    while max_pages is None or page <= max_pages:
+        commits = await github_get(f"/repos/{owner}/{repo}/commits", token, params={**params, "page": page})
+        rows = [_row_from_api(c) for c in commits]
+        if page == 1 and rows:
+            head_sha = rows[0][0]
+        dates = [row[3] for row in rows if row[3]]
+        if dates:
+            newest_date = max([newest_date, *dates]) if newest_date else max(dates)
+        added += store_commits(github_id, owner, repo, rows)
+        if len(commits) < PAGE_SIZE:
+            break
+        page += 1
+
+    _mark_synced(github_id, owner, repo, newest_date or cursor, head_sha)
+    logger.info(f"✓ Synced {owner}/{repo}: {added} new commit(s)")
+    return added
+
+
+def query_commits(
+    github_id: int,
+    owner: str,
+    repo: str,
+    author: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = 30,
+    offset: int = 0,
+    columns: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Query stored commits, newest first.
+
+    Args:
+        github_id: The GitHub user ID the history belongs to
+        owner: Repository owner login
+        repo: Repository name
+        author: Exact author name to match
+        since: ISO 8601 lower bound on the commit date (inclusive)
+        until: ISO 8601 upper bound on the commit date (inclusive)
+        search: Case-insensitive substring to find in the message
+        limit: Maximum number of commits returned
+        offset: Number of matching commits to skip
+        columns: Subset of COMMIT_FIELDS to select (all when None)
+
+    Returns:
+        list: Commits shaped like the GitHub proxy response
+    """
+    clauses = ["github_id = ?", "owner = ?", "repo = ?"]
+    args: List[Any] = [github_id, owner, repo]
+
+    if author:
+        clauses.append("author = ?")
+        args.append(author)
+    if since:
+        clauses.append("date >= ?")
+        args.append(since)
+    if until:
+        clauses.append("date <= ?")
+        args.append(until)
+    if search:
+        clauses.append("message LIKE ? ESCAPE '\\'")
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        args.append(f"%{escaped}%")
+
+    # Only whitelisted names reach the SELECT list
+    selected = [c for c in COMMIT_FIELDS if columns is None or c in columns]
+    rows = _conn().execute(
+        f"SELECT {', '.join(selected)} FROM commits WHERE {' AND '.join(clauses)} "
+        "ORDER BY date DESC LIMIT ? OFFSET ?",
+        (*args, limit, offset)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def store_pushed_commits(owner: str, repo: str, before: Optional[str], after: Optional[str], rows: List[tuple]) -> int:
+    """
+    Add commits from a push event to every user's stored history of a repo.
+
+    A user's history only takes the commits if the push starts at its
+    head_sha; otherwise a delivery was missed and the repo is marked stale
+    for that user so the next request runs a delta sync.
+
+    Args:
+        owner: Repository owner login
+        repo: Repository name
+        before: SHA the branch pointed to before the push
+        after: SHA the branch points to after the push
+        rows: (sha, message, author, date, url) tuples
+
+    Returns:
+        Number of newly stored commits across all users
+    """
+    added = 0
+    conn = _conn()
+    # Reuse the stored owner/repo spelling so later queries still match
+    synced = conn.execute(
+        "SELECT github_id, owner, repo, head_sha FROM commit_sync "
+        "WHERE owner = ? COLLATE NOCASE AND repo = ? COLLATE NOCASE",
+        (owner, repo)
+    ).fetchall()
+    for row in synced:
+        if not before or row['head_sha'] != before:
+            conn.execute(
+                "UPDATE commit_sync SET synced_at = 0 WHERE github_id = ? AND owner = ? AND repo = ?",
+                (row['github_id'], row['owner'], row['repo'])
+            )
+            continue
+        added += store_commits(row['github_id'], row['owner'], row['repo'], rows)
+        conn.execute(
+            "UPDATE commit_sync SET head_sha = ? WHERE github_id = ? AND owner = ? AND repo = ?",
+            (after, row['github_id'], row['owner'], row['repo'])
+        )
+    return added
+
+
+def mark_stale(owner: str, repo: str) -> None:
+    """Force the next request for a repo to run a delta sync, for every user."""
+    _conn().execute(
+        "UPDATE commit_sync SET synced_at = 0 WHERE owner = ? COLLATE NOCASE AND repo = ? COLLATE NOCASE",
+        (owner, repo)
+    )
+
+
+def delete_repo(owner: str, repo: str) -> None:
+    """Drop all stored history for a repo."""
+    conn = _conn()
+    conn.execute("DELETE FROM commits WHERE owner = ? COLLATE NOCASE AND repo = ? COLLATE NOCASE", (owner, repo))
+    conn.execute("DELETE FROM commit_sync WHERE owner = ? COLLATE NOCASE AND repo = ? COLLATE NOCASE", (owner, repo))
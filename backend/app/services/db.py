@@ -2,6 +2,7 @@ from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 from pymongo.errors import ConfigurationError, ConnectionFailure, OperationFailure
 import os
+import time
 from dotenv import load_dotenv
 from app.utils.logger import logger
 
@@ -10,6 +11,8 @@ load_dotenv()
 # MongoDB configuration
 MONGODB_URI = os.getenv('MONGODB_URI')
 MONGO_DB = os.getenv('MONGO_DB', 'feedbackDB')  # Default database name
+# Minimum seconds between reconnect attempts after a failed connection
+MONGO_RECONNECT_INTERVAL = float(os.getenv('MONGO_RECONNECT_INTERVAL', '30'))
 
 # Validate MongoDB URI is set
 if not MONGODB_URI:
@@ -20,16 +23,24 @@ if not MONGODB_URI:
 client = None
 db = None
 feedback_collection = None
+ai_analysis_collection = None
+verdict_collection = None
+_last_attempt = 0.0
 
 def get_database():
     """Get database instance with lazy initialization and error handling"""
-    global client, db, feedback_collection
+    global client, db, feedback_collection, ai_analysis_collection, verdict_collection, _last_attempt
 
     if client is None:
         if not MONGODB_URI:
             logger.error("✗ Cannot connect to MongoDB: MONGODB_URI not configured")
             return None
 
+        # Don't make every request wait out the connect timeout while Mongo is down
+        if time.monotonic() - _last_attempt < MONGO_RECONNECT_INTERVAL:
+            return None
+        _last_attempt = time.monotonic()
+
         try:
             logger.info("Attempting to connect to MongoDB...")
             # Mask sensitive parts of URI for logging
@@ -37,16 +48,23 @@ def get_database():
             logger.debug(f"MongoDB URI: {masked_uri}")
 
             # serverSelectionTimeoutMS prevents hanging on connection issues
-            client = MongoClient(
+            new_client = MongoClient(
                 MONGODB_URI,
                 server_api=ServerApi('1'),
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=5000
             )
-            # Test the connection
-            client.admin.command('ping')
+            # Test the connection; only keep the client once it answers
+            try:
+                new_client.admin.command('ping')
+            except Exception:
+                new_client.close()
+                raise
+            client = new_client
             db = client[MONGO_DB]
             feedback_collection = db.feedbacks
+            ai_analysis_collection = db.ai_analyses
+            verdict_collection = db.feedback_verdicts
 
             logger.info("✓ MongoDB connected successfully")
             logger.info(f"✓ Using database: {MONGO_DB}")
@@ -79,6 +97,44 @@ def get_database():
 
     return db
 
-# Try to connect on import, but don't fail if it doesn't work
-get_database()
+
+def get_feedback_collection():
+    """
+    Get the feedbacks collection, connecting on first use.
+
+    Callers must go through this instead of importing feedback_collection
+    directly, since the connection is created after the worker starts.
+    """
+    if feedback_collection is None:
+        get_database()
+    return feedback_collection
+
+
+def get_ai_analysis_collection():
+    """Get the ai_analyses collection, connecting on first use."""
+    if ai_analysis_collection is None:
+        get_database()
+    return ai_analysis_collection
+
+
+def get_verdict_collection():
+    """Get the feedback_verdicts collection, connecting on first use."""
+    if verdict_collection is None:
+        get_database()
+    return verdict_collection
+
+
+def close_database():
+    """Close this process's MongoDB client."""
+    global client, db, feedback_collection, ai_analysis_collection, verdict_collection
+
+    if client is not None:
+        client.close()
+        logger.info("✓ MongoDB connection closed")
+
+    client = None
+    db = None
+    feedback_collection = None
+    ai_analysis_collection = None
+    verdict_collection = None
 
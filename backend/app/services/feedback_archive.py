@@ -0,0 +1,554 @@
+"""
+Tiered retention for feedback: old documents move from MongoDB into
+compressed local archive segments.
+
+Feedback whose _id is older than FEEDBACK_RETENTION_DAYS is copied, in _id
+order, into segment files and then deleted from Mongo in small batches.
+A segment is `<first id>-<last id>.zst` plus a `.json` index:
+
+- the data file is a series of independent zstd frames ("blocks") of
+  FEEDBACK_ARCHIVE_BLOCK_DOCS extended-JSON lines each, so a point lookup
+  decompresses one block rather than the whole segment
+- the index holds the id range and byte range of every block and the
+  repo_urls and user_ids in the segment, so queries skip segments and
+  blocks without reading them
+
+Archival is two-phase. The index is written with state "pending" before
+anything is deleted and marked "complete" afterwards; a run that crashed
+in between finishes the deletion on the next run, and readers drop the
+duplicates meanwhile. One archiver runs at a time across workers (file
+lock on the archive directory).
+
+find_feedback() and get_feedback_docs() are the unified read path: hot
+documents come from Mongo, cold ones from the segments, merged by _id.
+
+    python -m app.services.feedback_archive run [--days N]
+    python -m app.services.feedback_archive stats
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import zstandard
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path
+from app.services.db import get_feedback_collection
+
+load_dotenv()
+
+# Feedback older than this moves to the archive; 0 keeps everything in Mongo
+FEEDBACK_RETENTION_DAYS = float(os.getenv('FEEDBACK_RETENTION_DAYS', '0'))
+FEEDBACK_ARCHIVE_DIR = os.getenv('FEEDBACK_ARCHIVE_DIR')
+FEEDBACK_ARCHIVE_SEGMENT_DOCS = int(os.getenv('FEEDBACK_ARCHIVE_SEGMENT_DOCS', '20000'))
+FEEDBACK_ARCHIVE_BLOCK_DOCS = int(os.getenv('FEEDBACK_ARCHIVE_BLOCK_DOCS', '500'))
+FEEDBACK_ARCHIVE_ZSTD_LEVEL = int(os.getenv('FEEDBACK_ARCHIVE_ZSTD_LEVEL', '10'))
+# Mongo deletes per batch, and the pause between batches to spare the primary
+FEEDBACK_ARCHIVE_DELETE_BATCH = int(os.getenv('FEEDBACK_ARCHIVE_DELETE_BATCH', '1000'))
+FEEDBACK_ARCHIVE_DELETE_PAUSE_MS = float(os.getenv('FEEDBACK_ARCHIVE_DELETE_PAUSE_MS', '50'))
+# Seconds between background archive runs in each worker; 0 leaves it to the CLI
+FEEDBACK_ARCHIVE_INTERVAL = float(os.getenv('FEEDBACK_ARCHIVE_INTERVAL', '3600'))
+FEEDBACK_ARCHIVE_BLOCK_CACHE = int(os.getenv('FEEDBACK_ARCHIVE_BLOCK_CACHE', '64'))
+
+INDEX_VERSION = 1
+
+
+@lru_cache(maxsize=FEEDBACK_ARCHIVE_BLOCK_CACHE)
+def _read_block(path: str, offset: int, length: int) -> Tuple[Dict[str, Any], ...]:
+    """Decode one block; segment data files are immutable, so blocks cache safely."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        raw = zstandard.ZstdDecompressor().decompress(f.read(length))
+    return tuple(json_util.loads(line) for line in raw.splitlines() if line)
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Copy a document, keeping _id and the projected fields like a Mongo find would."""
+    if projection is None:
+        return dict(doc)
+    projected = {"_id": doc["_id"]}
+    for field in projection:
+        if field in doc:
+            projected[field] = doc[field]
+    return projected
+
+
+def _matches(doc: Dict[str, Any], repo_url: Optional[str], user_id: Optional[str]) -> bool:
+    return (repo_url is None or doc.get("repo_url") == repo_url) and \
+        (user_id is None or doc.get("user_id") == user_id)
+
+
+class FeedbackArchive:
+    """Immutable zstd segment files with per-segment JSON indexes."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # index file name -> (mtime_ns, index)
+        self._indexes: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Indexes of every committed segment, newest ids first."""
+        with self._lock:
+            seen = {}
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.json'):
+                    continue
+                mtime = entry.stat().st_mtime_ns
+                cached = self._indexes.get(entry.name)
+                if cached is None or cached[0] != mtime:
+                    try:
+                        with open(entry.path) as f:
+                            cached = (mtime, json.load(f))
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"⚠ Skipping unreadable archive index {entry.name}: {e}")
+                        continue
+                seen[entry.name] = cached
+            self._indexes = seen
+            indexes = [index for _, index in seen.values()]
+        indexes.sort(key=lambda index: index["max_id"], reverse=True)
+        return indexes
+
+    def _data_path(self, index: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, index["data"])
+
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, index["name"] + '.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(index, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def write_segment(self, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Write documents (sorted by _id) as a new segment in state "pending".
+
+        The data file is fsynced and in place before its index appears, so
+        readers never see an index without its data.
+
+        Args:
+            docs: Feedback documents in ascending _id order
+
+        Returns:
+            The segment index
+        """
+        name = f"{docs[0]['_id']}-{docs[-1]['_id']}"
+        data_name = name + '.zst'
+        compressor = zstandard.ZstdCompressor(level=FEEDBACK_ARCHIVE_ZSTD_LEVEL)
+
+        blocks = []
+        repo_urls: Dict[str, int] = {}
+        user_ids = set()
+        raw_bytes = 0
+        offset = 0
+        tmp = os.path.join(self.directory, f"{data_name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            for start in range(0, len(docs), FEEDBACK_ARCHIVE_BLOCK_DOCS):
+                chunk = docs[start:start + FEEDBACK_ARCHIVE_BLOCK_DOCS]
+                raw = ''.join(json_util.dumps(doc) + '\n' for doc in chunk).encode('utf-8')
+                frame = compressor.compress(raw)
+                f.write(frame)
+                blocks.append({
+                    "offset": offset,
+                    "length": len(frame),
+                    "count": len(chunk),
+                    "min_id": str(chunk[0]["_id"]),
+                    "max_id": str(chunk[-1]["_id"]),
+                })
+                offset += len(frame)
+                raw_bytes += len(raw)
+                for doc in chunk:
+                    if doc.get("repo_url") is not None:
+                        repo_urls[doc["repo_url"]] = repo_urls.get(doc["repo_url"], 0) + 1
+                    if doc.get("user_id") is not None:
+                        user_ids.add(doc["user_id"])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.directory, data_name))
+
+        index = {
+            "version": INDEX_VERSION,
+            "name": name,
+            "data": data_name,
+            "state": "pending",
+            "count": len(docs),
+            "min_id": str(docs[0]["_id"]),
+            "max_id": str(docs[-1]["_id"]),
+            "created_from": docs[0]["_id"].generation_time.isoformat(),
+            "created_to": docs[-1]["_id"].generation_time.isoformat(),
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "raw_bytes": raw_bytes,
+            "bytes": offset,
+            "repo_urls": repo_urls,
+            "user_ids": sorted(user_ids),
+            "blocks": blocks,
+        }
+        self._write_index(index)
+        return index
+
+    def iter_segment(self, index: Dict[str, Any], reverse: bool = False) -> Iterable[Dict[str, Any]]:
+        """Yield a segment's documents in _id order (shared, do not mutate)."""
+        path = self._data_path(index)
+        blocks = reversed(index["blocks"]) if reverse else index["blocks"]
+        for block in blocks:
+            docs = _read_block(path, block["offset"], block["length"])
+            yield from (reversed(docs) if reverse else docs)
+
+    # ------------------------------------------------------------------
+    # Archiving
+    # ------------------------------------------------------------------
+
+    def _try_lock(self):
+        lock_file = open(os.path.join(self.directory, '.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _delete_from_mongo(self, collection, ids: List[ObjectId], stop: Optional[threading.Event]) -> int:
+        deleted = 0
+        for start in range(0, len(ids), FEEDBACK_ARCHIVE_DELETE_BATCH):
+            if stop is not None and stop.is_set():
+                break
+            result = collection.delete_many({"_id": {"$in": ids[start:start + FEEDBACK_ARCHIVE_DELETE_BATCH]}})
+            deleted += result.deleted_count
+            if FEEDBACK_ARCHIVE_DELETE_PAUSE_MS > 0:
+                time.sleep(FEEDBACK_ARCHIVE_DELETE_PAUSE_MS / 1000)
+        return deleted
+
+    def _complete(self, collection, index: Dict[str, Any], stop: Optional[threading.Event]) -> bool:
+        ids = [doc["_id"] for doc in self.iter_segment(index)]
+        self._delete_from_mongo(collection, ids, stop)
+        if stop is not None and stop.is_set():
+            return False
+        index = dict(index, state="complete")
+        self._write_index(index)
+        return True
+
+    def _recover(self, collection, stop: Optional[threading.Event]) -> None:
+        """Finish interrupted runs: delete for pending segments, drop orphaned data files."""
+        indexed = set()
+        for index in self.segments():
+            indexed.add(index["data"])
+            if index["state"] == "pending":
+                logger.info(f"Finishing interrupted archive segment {index['name']}")
+                self._complete(collection, index, stop)
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp') or (entry.name.endswith('.zst') and entry.name not in indexed):
+                os.remove(entry.path)
+
+    def archive_once(self, retention_days: float = FEEDBACK_RETENTION_DAYS,
+                     stop: Optional[threading.Event] = None) -> int:
+        """
+        Move feedback older than retention_days from Mongo into new segments.
+
+        Args:
+            retention_days: Age in days past which feedback is archived
+            stop: Set to end the run early; finished segments stay consistent
+
+        Returns:
+            Number of documents archived, 0 if another process is archiving
+        """
+        collection = get_feedback_collection()
+        if collection is None or retention_days <= 0:
+            return 0
+
+        lock_file = self._try_lock()
+        if lock_file is None:
+            logger.debug("Feedback archive run skipped: another process holds the lock")
+            return 0
+
+        archived = 0
+        started = time.perf_counter()
+        try:
+            self._recover(collection, stop)
+            cutoff = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(days=retention_days))
+            while stop is None or not stop.is_set():
+                docs = list(
+                    collection.find({"_id": {"$lt": cutoff}})
+                    .sort("_id", 1)
+                    .limit(FEEDBACK_ARCHIVE_SEGMENT_DOCS)
+                )
+                if not docs:
+                    break
+                index = self.write_segment(docs)
+                if not self._complete(collection, index, stop):
+                    break
+                archived += len(docs)
+                metrics.inc("feedback_archived", len(docs))
+                logger.info(f"✓ Archived {len(docs)} feedback documents to {index['data']} "
+                            f"({index['raw_bytes']} → {index['bytes']} bytes)")
+                if len(docs) < FEEDBACK_ARCHIVE_SEGMENT_DOCS:
+                    break
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+        if archived:
+            logger.info(f"✓ Feedback archive run moved {archived} documents in {time.perf_counter() - started:.1f}s")
+        return archived
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def query(self, repo_url: Optional[str] = None, user_id: Optional[str] = None,
+              before: Optional[ObjectId] = None, after: Optional[ObjectId] = None,
+              limit: int = 50, projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Archived feedback newest first, filtered like the listing endpoint.
+
+        Segments may overlap in id range (late spool drains), so results are
+        merged across segments; reading stops once no remaining segment can
+        hold a newer document than the current limit-th result.
+
+        Args:
+            repo_url: Only feedback for this repo
+            user_id: Only feedback from this user
+            before: Only ids lower than this
+            after: Only ids higher than this
+            limit: Maximum number of documents
+            projection: Fields to return besides _id (all when None)
+
+        Returns:
+            Matching documents, descending by _id
+        """
+        before_s = str(before) if before is not None else None
+        floor = str(after) if after is not None else None
+        found: Dict[ObjectId, Dict[str, Any]] = {}
+
+        for index in self.segments():
+            if floor is not None and index["max_id"] <= floor:
+                break
+            if before_s is not None and index["min_id"] >= before_s:
+                continue
+            if repo_url is not None and repo_url not in index["repo_urls"]:
+                continue
+            if user_id is not None and user_id not in index["user_ids"]:
+                continue
+
+            path = self._data_path(index)
+            for block in reversed(index["blocks"]):
+                if floor is not None and block["max_id"] <= floor:
+                    break
+                if before_s is not None and block["min_id"] >= before_s:
+                    continue
+                for doc in reversed(_read_block(path, block["offset"], block["length"])):
+                    if after is not None and doc["_id"] <= after:
+                        break
+                    if (before is None or doc["_id"] < before) and _matches(doc, repo_url, user_id):
+                        found[doc["_id"]] = doc
+
+            if len(found) >= limit:
+                # Keep the newest `limit`; later segments only matter if they hold newer ids
+                kept = sorted(found, reverse=True)[:limit]
+                found = {doc_id: found[doc_id] for doc_id in kept}
+                after, floor = kept[-1], str(kept[-1])
+
+        ordered = sorted(found, reverse=True)[:limit]
+        return [_project(found[doc_id], projection) for doc_id in ordered]
+
+    def get(self, ids: Iterable[ObjectId], projection: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Look archived feedback up by id, decompressing only the blocks that can hold them.
+
+        Returns:
+            Documents keyed by id string; missing ids are absent
+        """
+        wanted = {str(doc_id) for doc_id in ids}
+        found: Dict[str, Dict[str, Any]] = {}
+        if not wanted:
+            return found
+
+        for index in self.segments():
+            if not any(index["min_id"] <= doc_id <= index["max_id"] for doc_id in wanted):
+                continue
+            path = self._data_path(index)
+            for block in index["blocks"]:
+                hits = [doc_id for doc_id in wanted if block["min_id"] <= doc_id <= block["max_id"]]
+                if not hits:
+                    continue
+                for doc in _read_block(path, block["offset"], block["length"]):
+                    doc_id = str(doc["_id"])
+                    if doc_id in wanted:
+                        found[doc_id] = _project(doc, projection)
+                wanted.difference_update(found)
+                if not wanted:
+                    return found
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals across segments for the CLI and logs."""
+        indexes = self.segments()
+        return {
+            "segments": len(indexes),
+            "pending": sum(1 for index in indexes if index["state"] == "pending"),
+            "documents": sum(index["count"] for index in indexes),
+            "raw_bytes": sum(index["raw_bytes"] for index in indexes),
+            "bytes": sum(index["bytes"] for index in indexes),
+            "oldest": min((index["created_from"] for index in indexes), default=None),
+            "newest": max((index["created_to"] for index in indexes), default=None),
+        }
+
+
+class ArchiveRunner:
+    """Background thread that runs archive_once every FEEDBACK_ARCHIVE_INTERVAL seconds."""
+
+    def __init__(self, archive: FeedbackArchive):
+        self.archive = archive
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(FEEDBACK_ARCHIVE_INTERVAL):
+            try:
+                self.archive.archive_once(stop=self._stop)
+            except Exception as e:
+                logger.error(f"✗ Feedback archive run failed: {e}")
+
+    def start(self) -> None:
+        """Start the runner if retention and an interval are configured."""
+        if FEEDBACK_RETENTION_DAYS <= 0 or FEEDBACK_ARCHIVE_INTERVAL <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feedback-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the runner; an in-progress run stops between delete batches."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=30)
+            self._thread = None
+
+
+_archive: Optional[FeedbackArchive] = None
+_runner: Optional[ArchiveRunner] = None
+
+
+def get_archive() -> FeedbackArchive:
+    """Get the process-wide archive with lazy initialization."""
+    global _archive
+
+    if _archive is None:
+        _archive = FeedbackArchive(FEEDBACK_ARCHIVE_DIR or data_path('feedback_archive'))
+
+    return _archive
+
+
+def get_archive_runner() -> ArchiveRunner:
+    """Get the process-wide background archiver with lazy initialization."""
+    global _runner
+
+    if _runner is None:
+        _runner = ArchiveRunner(get_archive())
+
+    return _runner
+
+
+def find_feedback(collection, repo_url: Optional[str] = None, user_id: Optional[str] = None,
+                  before: Optional[ObjectId] = None, limit: int = 50,
+                  projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    List feedback newest first across Mongo and the archive.
+
+    Mongo answers first. The archive is only read for ids above the last
+    hot result when Mongo filled the page, which the segment indexes
+    usually rule out without touching a file.
+
+    Args:
+        collection: The feedbacks collection
+        repo_url: Only feedback for this repo
+        user_id: Only feedback from this user
+        before: Only ids lower than this (pagination cursor)
+        limit: Page size
+        projection: Mongo-style inclusion projection
+
+    Returns:
+        Documents descending by _id
+    """
+    query: Dict[str, Any] = {}
+    if repo_url:
+        query["repo_url"] = repo_url
+    if user_id:
+        query["user_id"] = user_id
+    if before is not None:
+        query["_id"] = {"$lt": before}
+
+    hot = list(collection.find(query, projection).sort("_id", -1).limit(limit))
+    archive = get_archive()
+    if not archive.segments():
+        return hot
+
+    cold = archive.query(
+        repo_url=repo_url or None, user_id=user_id or None, before=before,
+        after=hot[-1]["_id"] if len(hot) == limit else None,
+        limit=limit, projection=projection
+    )
+    if not cold:
+        return hot
+    metrics.inc("feedback_archive_reads")
+
+    # Segments still being deleted from Mongo hold copies of hot documents
+    merged = {doc["_id"]: doc for doc in cold}
+    merged.update((doc["_id"], doc) for doc in hot)
+    return [merged[doc_id] for doc_id in sorted(merged, reverse=True)[:limit]]
+
+
+def get_feedback_docs(collection, ids: List[ObjectId],
+                      projection: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch feedback by id from Mongo, falling back to the archive for the rest.
+
+    Args:
+        collection: The feedbacks collection, or None when Mongo is unavailable
+        ids: Feedback ids
+        projection: Mongo-style inclusion projection
+
+    Returns:
+        Documents keyed by id string (with _id removed); missing ids are absent
+    """
+    docs: Dict[str, Dict[str, Any]] = {}
+    if collection is not None:
+        for doc in collection.find({"_id": {"$in": ids}}, projection):
+            docs[str(doc.pop("_id"))] = doc
+
+    missing = [doc_id for doc_id in ids if str(doc_id) not in docs]
+    if missing:
+        for doc_id, doc in get_archive().get(missing, projection).items():
+            doc.pop("_id")
+            docs[doc_id] = doc
+    return docs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archive old feedback out of MongoDB")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Archive feedback older than the retention age")
+    run_parser.add_argument("--days", type=float, default=FEEDBACK_RETENTION_DAYS,
+                            help="Retention age in days (default FEEDBACK_RETENTION_DAYS)")
+    commands.add_parser("stats", help="Show archive totals")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.days <= 0:
+            raise SystemExit("Set FEEDBACK_RETENTION_DAYS or pass --days")
+        print(f"Archived {get_archive().archive_once(retention_days=args.days)} documents")
+    print(json.dumps(get_archive().stats(), indent=2))
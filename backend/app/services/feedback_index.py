@@ -0,0 +1,387 @@
+"""
+Offline semantic search over feedback with a per-repo NumPy vector index.
+
+Each feedback message is embedded with feature hashing (word unigrams and
+bigrams, signed, sublinear term frequency) into FEEDBACK_INDEX_DIM buckets
+and L2-normalized. Queries are weighted by the repo's IDF, which is kept
+incrementally from per-bucket document frequencies, so documents never need
+re-embedding as the corpus grows.
+
+On disk, under DATA_DIR/feedback_index/<repo key>/:
+
+    vectors.f32  float32 (capacity, dim) matrix, memory-mapped
+    ids.bin      12-byte ObjectIds, one per row
+    df.npy       per-bucket document frequency
+    meta.json    {"count", "capacity", "dim", "repo_url"}
+
+Writers append rows under an exclusive file lock and publish them by
+replacing meta.json, so readers in any worker only see complete rows.
+
+Backfill from MongoDB and the feedback archive:
+
+    python -m app.services.feedback_index rebuild [--repo-url URL]
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from bson import ObjectId
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.local_storage import data_path
+
+load_dotenv()
+
+FEEDBACK_INDEX_DIR = os.getenv('FEEDBACK_INDEX_DIR')
+FEEDBACK_INDEX_DIM = int(os.getenv('FEEDBACK_INDEX_DIM', '256'))
+# Rows scored per matrix product, bounds the temporary score buffer
+SEARCH_CHUNK_ROWS = int(os.getenv('FEEDBACK_INDEX_CHUNK_ROWS', '262144'))
+
+INITIAL_CAPACITY = 1024
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str) -> Iterable[str]:
+    tokens = TOKEN_RE.findall(text.lower())
+    yield from tokens
+    for first, second in zip(tokens, tokens[1:]):
+        yield f"{first} {second}"
+
+
+def embed(text: str, dim: int = FEEDBACK_INDEX_DIM) -> np.ndarray:
+    """
+    Hash a text into a signed, sublinear-TF vector (not normalized).
+
+    Args:
+        text: Feedback message or query
+        dim: Number of hash buckets
+
+    Returns:
+        float32 vector of length dim
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, tf in Counter(_features(text)).items():
+        h = zlib.crc32(feature.encode('utf-8'))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vector[h % dim] += sign * (1.0 + math.log(tf))
+    return vector
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def repo_key(repo_url: str) -> str:
+    """Directory name for a repo's index."""
+    normalized = repo_url.strip().rstrip('/').lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class RepoIndex:
+    """Append-only vector index for one repo."""
+
+    def __init__(self, directory: str, repo_url: str, dim: int = FEEDBACK_INDEX_DIM):
+        self.directory = directory
+        self.repo_url = repo_url
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, 'meta.json')
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._ids_path = os.path.join(directory, 'ids.bin')
+        self._df_path = os.path.join(directory, 'df.npy')
+        self._lock = threading.Lock()
+        self._mapped: Optional[Tuple[int, np.memmap, np.memmap]] = None
+
+        if not os.path.exists(self._meta_path):
+            with self._write_lock():
+                if not os.path.exists(self._meta_path):
+                    self._allocate(INITIAL_CAPACITY, dim)
+                    np.save(self._df_path, np.zeros(dim, dtype=np.float64))
+                    self._write_meta({"count": 0, "capacity": INITIAL_CAPACITY, "dim": dim, "repo_url": repo_url})
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _write_lock(self):
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def meta(self) -> Dict[str, Any]:
+        with open(self._meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def _allocate(self, capacity: int, dim: int) -> None:
+        for path, row_bytes in ((self._vectors_path, dim * 4), (self._ids_path, 12)):
+            with open(path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+
+    def _maps(self, meta: Dict[str, Any], writable: bool = False) -> Tuple[np.memmap, np.memmap]:
+        """Memory-map the files at the published capacity, reusing the mapping if unchanged."""
+        capacity, dim = meta["capacity"], meta["dim"]
+        with self._lock:
+            if writable or self._mapped is None or self._mapped[0] != capacity:
+                mode = 'r+' if writable else 'r'
+                vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+                ids = np.memmap(self._ids_path, dtype=np.uint8, mode=mode, shape=(capacity, 12))
+                if writable:
+                    return vectors, ids
+                self._mapped = (capacity, vectors, ids)
+            return self._mapped[1], self._mapped[2]
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def add_vectors(self, ids: Sequence[bytes], vectors: np.ndarray, doc_freq: np.ndarray) -> None:
+        """
+        Append pre-embedded rows.
+
+        Args:
+            ids: 12-byte ObjectIds
+            vectors: (n, dim) raw embeddings; normalized here
+            doc_freq: (dim,) number of new rows that touch each bucket
+        """
+        if not len(ids):
+            return
+
+        with self._write_lock():
+            meta = self.meta()
+            count, capacity, dim = meta["count"], meta["capacity"], meta["dim"]
+            needed = count + len(ids)
+            if needed > capacity:
+                while capacity < needed:
+                    capacity *= 2
+                self._allocate(capacity, dim)
+                meta["capacity"] = capacity
+
+            vector_map, id_map = self._maps(meta, writable=True)
+            vector_map[count:needed] = _normalize(vectors.astype(np.float32, copy=False))
+            id_map[count:needed] = np.frombuffer(b"".join(ids), dtype=np.uint8).reshape(-1, 12)
+            vector_map.flush()
+            id_map.flush()
+            del vector_map, id_map
+
+            df = np.load(self._df_path) + doc_freq
+            tmp = f"{self._df_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp, df)
+            os.replace(tmp, self._df_path)
+
+            meta["count"] = needed
+            self._write_meta(meta)
+
+    def add(self, docs: Sequence[Tuple[str, str]]) -> None:
+        """
+        Embed and append documents.
+
+        Args:
+            docs: (feedback id, message) pairs
+        """
+        dim = self.meta()["dim"]
+        vectors = np.stack([embed(text, dim) for _, text in docs])
+        self.add_vectors(
+            [ObjectId(feedback_id).binary for feedback_id, _ in docs],
+            vectors,
+            (vectors != 0).sum(axis=0)
+        )
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def query_vectors(self, queries: Sequence[str]) -> np.ndarray:
+        """Embed queries with the repo's current IDF weights."""
+        meta = self.meta()
+        df = np.load(self._df_path)
+        idf = np.log((1.0 + meta["count"]) / (1.0 + df)) + 1.0
+        raw = np.stack([embed(q, meta["dim"]) for q in queries])
+        return _normalize(raw * idf.astype(np.float32))
+
+    def search_vectors(self, queries: np.ndarray, k: int) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k cosine search for a batch of normalized query vectors.
+
+        Args:
+            queries: (m, dim) float32 matrix
+            k: Results per query
+
+        Returns:
+            Per query, (feedback id, score) pairs best first
+        """
+        meta = self.meta()
+        count = meta["count"]
+        m = queries.shape[0]
+        if count == 0:
+            return [[] for _ in range(m)]
+
+        vectors, ids = self._maps(meta)
+        queries_t = np.ascontiguousarray(queries.T, dtype=np.float32)
+        k = min(k, count)
+
+        best_scores = np.full((m, 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((m, 0), dtype=np.int64)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            stop = min(start + SEARCH_CHUNK_ROWS, count)
+            scores = (vectors[start:stop] @ queries_t).T  # (m, rows)
+            take = min(k, stop - start)
+            part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        return [
+            [(ids[row].tobytes().hex(), float(score)) for row, score in zip(rows, scores)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    def search(self, queries: Sequence[str], k: int = 10) -> List[List[Tuple[str, float]]]:
+        """Top-k feedback ids for each query text."""
+        return self.search_vectors(self.query_vectors(queries), k)
+
+
+def _index_root() -> str:
+    return FEEDBACK_INDEX_DIR or data_path('feedback_index')
+
+
+_indexes: Dict[str, RepoIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_repo_index(repo_url: str, create: bool = True) -> Optional[RepoIndex]:
+    """
+    Get a repo's index, cached per process.
+
+    Args:
+        repo_url: GitHub repo URL as stored on feedback
+        create: Create an empty index if none exists
+
+    Returns:
+        The index, or None if it does not exist and create is False
+    """
+    key = repo_key(repo_url)
+    with _indexes_lock:
+        if key not in _indexes:
+            directory = os.path.join(_index_root(), key)
+            if not create and not os.path.exists(os.path.join(directory, 'meta.json')):
+                return None
+            _indexes[key] = RepoIndex(directory, repo_url)
+        return _indexes[key]
+
+
+def index_feedback(docs: Iterable[Dict[str, Any]]) -> None:
+    """
+    Add stored feedback documents to their repos' indexes.
+
+    Args:
+        docs: Feedback documents with _id, repo_url and message
+    """
+    by_repo = defaultdict(list)
+    for doc in docs:
+        if doc.get("repo_url") and doc.get("message"):
+            by_repo[doc["repo_url"]].append((str(doc["_id"]), doc["message"]))
+
+    for repo_url, items in by_repo.items():
+        get_repo_index(repo_url).add(items)
+
+
+def rebuild(repo_url: Optional[str] = None, batch_size: int = 2000) -> int:
+    """
+    Re-index feedback from MongoDB and the feedback archive, replacing existing indexes.
+
+    Archived feedback is read from its segments, so documents that retention
+    moved out of Mongo stay searchable.
+
+    Args:
+        repo_url: Limit to one repo
+        batch_size: Documents embedded per append
+
+    Returns:
+        Number of documents indexed
+    """
+    import shutil
+    from app.services.db import get_feedback_collection
+    from app.services.feedback_archive import get_archive
+
+    collection = get_feedback_collection()
+    if collection is None:
+        raise RuntimeError("Database connection unavailable")
+
+    archive = get_archive()
+    segments = [
+        index for index in reversed(archive.segments())
+        if repo_url is None or repo_url in index["repo_urls"]
+    ]
+
+    query = {"repo_url": repo_url} if repo_url else {"repo_url": {"$exists": True}}
+    repos = {repo_url} if repo_url else set(collection.distinct("repo_url"))
+    if not repo_url:
+        for index in segments:
+            repos.update(index["repo_urls"])
+    for url in repos:
+        _indexes.pop(repo_key(url), None)
+        shutil.rmtree(os.path.join(_index_root(), repo_key(url)), ignore_errors=True)
+
+    total = 0
+    batch = []
+
+    def add(doc):
+        nonlocal total, batch
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            index_feedback(batch)
+            total += len(batch)
+            batch = []
+
+    # Segments still being deleted from Mongo hold copies of live documents
+    in_both = set()
+    for index in segments:
+        for doc in archive.iter_segment(index):
+            if repo_url is None or doc.get("repo_url") == repo_url:
+                add(doc)
+                if index["state"] == "pending":
+                    in_both.add(doc["_id"])
+
+    for doc in collection.find(query, {"repo_url": 1, "message": 1}).sort("_id", 1):
+        if doc["_id"] not in in_both:
+            add(doc)
+    index_feedback(batch)
+    total += len(batch)
+
+    logger.info(f"✓ Indexed {total} feedback document(s) across {len(repos)} repo(s)")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feedback vector index maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--repo-url")
+    args = parser.parse_args()
+    rebuild(repo_url=args.repo_url)
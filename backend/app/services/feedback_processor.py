@@ -1,19 +1,54 @@
 from github import Github
 import google.genai as genai
 import os
+import uuid
+from typing import Optional
+from app.utils.logger import logger
+from app.services.github_pr import create_fix_pull_request_sync
+from app.services.github_cache import get_cached_tree, cache_tree
+from app.ai.governor import governed_call, fit_to_budget, GEMINI_MAX_OUTPUT_TOKENS
 
-def analyze_and_fix_feedback(feedback):
+FIX_MODEL = 'gemini-2.0-flash-exp'
+
+
+def get_root_tree(repo):
+    """
+    Get the root tree entries of a repository, using the shared cache.
+
+    Webhook push events invalidate the entry when the default branch moves.
+    """
+    entries = get_cached_tree(repo.full_name)
+    if entries is None:
+        entries = [
+            {"path": item.path, "type": item.type, "sha": item.sha}
+            for item in repo.get_contents('')
+        ]
+        cache_tree(repo.full_name, entries)
+    return entries
+
+def fix_branch_name(feedback_id: Optional[str] = None) -> str:
+    """
+    Name a new fix branch.
+
+    The random suffix keeps concurrent jobs and retries of the same job
+    from colliding (POST /git/refs answers 422 for an existing ref).
+    """
+    suffix = uuid.uuid4().hex[:8]
+    return f"feedback-fix/{feedback_id}-{suffix}" if feedback_id else f"feedback-fix/{suffix}"
+
+
+def analyze_and_fix_feedback(feedback, feedback_id: Optional[str] = None):
     client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
 
     # Assuming we have GitHub token
     g = Github(os.getenv('GITHUB_TOKEN'))
     repo = g.get_repo(feedback.repo_url.split('github.com/')[1])
 
-    # Get main branch
-    main_branch = repo.get_branch('main')
+    # Default branch comes with the repo object, no extra call needed
+    base_branch = repo.default_branch
 
     # Analyze code - this is simplified
-    contents = repo.get_contents('')
+    contents = get_root_tree(repo)
     # Use AI to analyze feedback and find relevant files
 
     # For now, just print
@@ -23,7 +58,7 @@ def analyze_and_fix_feedback(feedback):
     prompt = f"""
     Analyze this user feedback for a software project and suggest a code fix:
 
-    Feedback: {feedback.message}
+    Feedback: {fit_to_budget(feedback.message)}
     Feedback Type: {feedback.feedback_type}
 
     Please provide:
@@ -32,10 +67,17 @@ def analyze_and_fix_feedback(feedback):
     3. Files that might need modification
     """
 
+    ai_analysis = None
     try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=prompt
+        response = governed_call(
+            FIX_MODEL,
+            prompt,
+            lambda p: client.models.generate_content(
+                model=FIX_MODEL,
+                contents=p,
+                config={"max_output_tokens": GEMINI_MAX_OUTPUT_TOKENS}
+            ),
+            usage=lambda r: (r.usage_metadata.prompt_token_count, r.usage_metadata.candidates_token_count)
         )
         ai_analysis = response.text
         print(f"AI Analysis: {ai_analysis}")
@@ -47,8 +89,22 @@ def analyze_and_fix_feedback(feedback):
         print(f"Error with Gemini API: {e}")
         fix_code = "# Fixed based on feedback"
 
-    # Create branch and PR - placeholder
-    # repo.create_git_ref(ref='refs/heads/fix-branch', sha=main_branch.commit.sha)
-    # etc.
+    # Create branch, commit and PR with a fixed number of Git Data API calls
+    owner, name = repo.full_name.split('/')
+    branch = fix_branch_name(feedback_id)
+    try:
+        pull = create_fix_pull_request_sync(
+            owner,
+            name,
+            os.getenv('GITHUB_TOKEN'),
+            files={f"feedback-fixes/{branch.split('/')[1]}.md": fix_code},
+            branch=branch,
+            title=f"Fix from {feedback.feedback_type} feedback",
+            body=f"Automated fix suggestion for feedback:\n\n> {feedback.message}",
+            base=base_branch
+        )
+    except Exception as e:
+        logger.error(f"✗ Error creating pull request on {repo.full_name}: {e}")
+        return {"status": "PR failed", "pr_url": None, "ai_analysis": ai_analysis}
 
-    return {"status": "PR created", "pr_url": "https://github.com/...", "ai_analysis": ai_analysis}
\ No newline at end of file
+    return {"status": "PR created", "pr_url": pull.get('html_url'), "ai_analysis": ai_analysis}
\ No newline at end of file
@@ -1,6 +1,10 @@
+import random
+from datetime import datetime, timezone
 from app.security.sanitize import sanitize_text
+from app.security.admission import check_rate_limits, RateLimited
 from app.ai.gemini import analyze_feedback
-from app.services.db import feedback_collection
+from app.ai.preclassifier import preclassify, record_verdict, PRECLASSIFIER_AUDIT_RATE
+from app.services.feedback_spool import insert_feedback
 
 def handle_feedback(input: dict):
     """
@@ -16,14 +20,32 @@ def handle_feedback(input: dict):
     site_id = input["site_id"]
     raw_text = input["payload"]["message"]
 
+    # Keep one noisy site from flooding Mongo and Gemini
+    try:
+        check_rate_limits(site_id=site_id)
+    except RateLimited as e:
+        return {
+            "accepted": False,
+            "reason": "Rate limited",
+            "retry_after": e.retry_after
+        }
+
     # STEP 5A — sanitize (non-AI)
     clean_text = sanitize_text(raw_text)
 
-    # STEP 5B — Gemini legitimacy check
-    try:
-        ai_result = analyze_feedback(clean_text)
-    except Exception:
-        ai_result = {"valid": True, "category": "other"}  # fail open
+    # STEP 5B — local pre-classifier settles confident cases; a small audit
+    # sample still goes to Gemini so its verdicts keep covering them
+    local_result = preclassify(clean_text)
+    if local_result is not None and random.random() >= PRECLASSIFIER_AUDIT_RATE:
+        ai_result, source = local_result, "preclassifier"
+    else:
+        # STEP 5C — Gemini legitimacy check, recorded as training data
+        try:
+            ai_result, source = analyze_feedback(clean_text), "gemini"
+            record_verdict(clean_text, ai_result)
+        except Exception:
+            # fail open, unless the pre-classifier had an opinion
+            ai_result, source = local_result or {"valid": True, "category": "other"}, "fallback"
 
     if not ai_result["valid"]:
         return {
@@ -35,10 +57,12 @@ def handle_feedback(input: dict):
     doc = {
         "site_id": site_id,
         "text": clean_text,
-        "category": ai_result["category"]
+        "category": ai_result["category"],
+        "category_source": source,
+        "created_at": datetime.now(timezone.utc)
     }
 
-    feedback_collection.insert_one(doc)
+    insert_feedback([doc])
 
     return {
         "accepted": True,
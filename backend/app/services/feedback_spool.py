@@ -0,0 +1,297 @@
+"""
+Durable local write-ahead spool for feedback documents.
+
+When MongoDB is unreachable or slower than FEEDBACK_WRITE_BUDGET_MS,
+feedback is appended to local segment files instead of being dropped. A
+background drainer later bulk-inserts the segments into Mongo.
+
+- every document gets its _id before the first write attempt, so a write
+  that timed out but actually landed is skipped as a duplicate on drain
+- appends use group commit: one fsync covers every line written before it
+- each worker process writes its own active segment; finished segments
+  are renamed *.ready, and a drainer claims one by renaming it
+"""
+import glob
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+import pymongo
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path
+from app.services.db import get_feedback_collection
+from app.services.ai_store import apply_pending_links
+
+load_dotenv()
+
+SPOOL_DIR = os.getenv('SPOOL_DIR')
+# Mongo write latency budget before falling back to the spool
+FEEDBACK_WRITE_BUDGET_MS = float(os.getenv('FEEDBACK_WRITE_BUDGET_MS', '500'))
+SPOOL_SEGMENT_BYTES = int(os.getenv('SPOOL_SEGMENT_BYTES', str(8 * 1024 * 1024)))
+SPOOL_SEGMENT_SECONDS = float(os.getenv('SPOOL_SEGMENT_SECONDS', '10'))
+SPOOL_DRAIN_INTERVAL = float(os.getenv('SPOOL_DRAIN_INTERVAL', '5'))
+SPOOL_DRAIN_BATCH = int(os.getenv('SPOOL_DRAIN_BATCH', '500'))
+
+DUPLICATE_KEY = 11000
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class FeedbackSpool:
+    """Append-only segment files with group-commit fsync, plus a drainer."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fsync_lock = threading.Lock()
+        self._file = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._written = 0  # Lines written to the active segment
+        self._synced = 0  # Lines known to be on disk
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def _open_segment(self) -> None:
+        name = f"seg-{os.getpid()}-{time.time_ns()}.ndjson"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'ab')
+        self._opened_at = time.time()
+        self._written = 0
+        self._synced = 0
+
+    def _seal_segment(self) -> None:
+        """Close the active segment and mark it ready for draining (lock held)."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self._written:
+            os.rename(self._path, self._path[:-len('.ndjson')] + '.ready')
+        else:
+            os.remove(self._path)
+        self._file = None
+        self._path = None
+
+    def append(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Durably append documents; returns once they are fsynced.
+
+        Args:
+            docs: Documents that already carry an _id
+        """
+        data = b"".join(json_util.dumps(doc).encode() + b"\n" for doc in docs)
+
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(data)
+            self._file.flush()
+            self._written += len(docs)
+            mine = self._written
+            file, path = self._file, self._path
+
+        # Group commit: whoever holds the fsync lock syncs every line written so
+        # far, so writers that queued behind it usually find their work done.
+        # Sealing also takes the fsync lock, so the file stays open in here.
+        with self._fsync_lock:
+            with self._lock:
+                pending = self._path == path and self._synced < mine
+                target = self._written
+            if pending:
+                os.fsync(file.fileno())
+                with self._lock:
+                    self._synced = max(self._synced, target)
+
+            with self._lock:
+                if self._file is not None and (
+                    self._file.tell() >= SPOOL_SEGMENT_BYTES
+                    or time.time() - self._opened_at >= SPOOL_SEGMENT_SECONDS
+                ):
+                    self._seal_segment()
+
+        metrics.inc("feedback_spooled", len(docs))
+
+    def rotate(self) -> None:
+        """Seal the active segment so the drainer can pick it up."""
+        with self._fsync_lock, self._lock:
+            self._seal_segment()
+
+    # ------------------------------------------------------------------
+    # Draining
+    # ------------------------------------------------------------------
+
+    def recover(self) -> None:
+        """Hand segments left behind by dead processes back to the drainer."""
+        for path in glob.glob(os.path.join(self.directory, 'seg-*.ndjson')):
+            pid = int(os.path.basename(path).split('-')[1])
+            if pid != os.getpid() and not _pid_alive(pid):
+                os.rename(path, path[:-len('.ndjson')] + '.ready')
+        for path in glob.glob(os.path.join(self.directory, 'seg-*.draining-*')):
+            pid = int(path.rsplit('-', 1)[1])
+            if not _pid_alive(pid):
+                os.rename(path, path.rsplit('.draining-', 1)[0] + '.ready')
+
+    def pending_segments(self) -> int:
+        return len(glob.glob(os.path.join(self.directory, 'seg-*.ready')))
+
+    def drain_once(self) -> int:
+        """
+        Insert every ready segment into Mongo.
+
+        Returns:
+            Number of documents drained
+        """
+        collection = get_feedback_collection()
+        if collection is None:
+            return 0
+
+        with self._lock:
+            idle_segment = self._file is not None and self._written and \
+                time.time() - self._opened_at >= SPOOL_SEGMENT_SECONDS
+        if idle_segment:
+            self.rotate()
+
+        drained = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, 'seg-*.ready'))):
+            claimed = f"{path[:-len('.ready')]}.draining-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # Another worker claimed it
+
+            try:
+                drained += self._drain_file(collection, claimed)
+                os.remove(claimed)
+            except PyMongoError as e:
+                os.rename(claimed, path)
+                logger.warning(f"⚠ Spool drain paused, MongoDB write failed: {e}")
+                break
+
+        if drained:
+            metrics.inc("feedback_spool_drained", drained)
+            logger.info(f"✓ Drained {drained} spooled feedback document(s) into MongoDB")
+        return drained
+
+    def _drain_file(self, collection, path: str) -> int:
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json_util.loads(line))
+                except ValueError:
+                    # Torn final line from a crash mid-write; it was never acknowledged
+                    logger.warning(f"⚠ Skipping unreadable spool line in {os.path.basename(path)}")
+                    continue
+                if len(batch) >= SPOOL_DRAIN_BATCH:
+                    count += self._insert_batch(collection, batch)
+                    batch = []
+        if batch:
+            count += self._insert_batch(collection, batch)
+        return count
+
+    def _insert_batch(self, collection, batch: List[Dict[str, Any]]) -> int:
+        count = _insert_idempotent(collection, batch)
+        # Fix jobs that finished while these were spooled left their links behind
+        apply_pending_links(str(doc['_id']) for doc in batch)
+        return count
+
+    def _run(self) -> None:
+        self.recover()
+        while not self._stop.wait(SPOOL_DRAIN_INTERVAL):
+            try:
+                self.drain_once()
+            except Exception as e:
+                logger.error(f"✗ Spool drainer error: {e}")
+
+    def start(self) -> None:
+        """Start the background drainer thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="feedback-spool-drainer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the drainer and seal the active segment for the next run."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=SPOOL_DRAIN_INTERVAL + 5)
+            self._thread = None
+        self.rotate()
+
+
+def _insert_idempotent(collection, docs: List[Dict[str, Any]]) -> int:
+    """insert_many that treats already-present _ids as success."""
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(err.get('code') != DUPLICATE_KEY for err in errors):
+            raise
+    return len(docs)
+
+
+_spool: Optional[FeedbackSpool] = None
+
+
+def get_spool() -> FeedbackSpool:
+    """Get the process-wide spool with lazy initialization."""
+    global _spool
+
+    if _spool is None:
+        _spool = FeedbackSpool(SPOOL_DIR or data_path('spool'))
+
+    return _spool
+
+
+def insert_feedback(docs: List[Dict[str, Any]]) -> Tuple[List[str], bool]:
+    """
+    Store feedback documents in MongoDB, falling back to the local spool.
+
+    Documents without an _id get one first, so retries never duplicate.
+
+    Args:
+        docs: Feedback documents (mutated to carry their _id)
+
+    Returns:
+        (ids as strings, True if the documents were spooled)
+    """
+    for doc in docs:
+        doc.setdefault('_id', ObjectId())
+    ids = [str(doc['_id']) for doc in docs]
+
+    collection = get_feedback_collection()
+    if collection is not None:
+        try:
+            with pymongo.timeout(FEEDBACK_WRITE_BUDGET_MS / 1000):
+                if len(docs) == 1:
+                    collection.insert_one(docs[0])
+                else:
+                    _insert_idempotent(collection, docs)
+            return ids, False
+        except PyMongoError as e:
+            logger.warning(f"⚠ MongoDB write failed or exceeded {FEEDBACK_WRITE_BUDGET_MS:.0f}ms, spooling: {e}")
+
+    get_spool().append(docs)
+    return ids, True
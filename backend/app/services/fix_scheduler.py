@@ -0,0 +1,377 @@
+"""
+Fair, priority-aware scheduler for background AI fix jobs.
+
+Jobs are stored in a local SQLite queue shared by all workers on the host,
+so queued and in-flight jobs survive a restart. Scheduling rules:
+
+- lower priority number first (bugs before "other")
+- within a priority level, tenants (user_id + repo_url) take turns, so a
+  repo with a thousand reports cannot starve the others
+- a global and a per-tenant concurrency limit, counted across workers
+- running jobs hold a lease; if a worker dies, the lease expires and the
+  job is queued again
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path, ThreadLocalSQLite
+
+load_dotenv()
+
+FIX_JOBS_PATH = os.getenv('FIX_JOBS_PATH')
+FIX_JOBS_MAX_CONCURRENCY = int(os.getenv('FIX_JOBS_MAX_CONCURRENCY', '4'))
+FIX_JOBS_TENANT_CONCURRENCY = int(os.getenv('FIX_JOBS_TENANT_CONCURRENCY', '1'))
+FIX_JOBS_LEASE_SECONDS = float(os.getenv('FIX_JOBS_LEASE_SECONDS', '300'))
+FIX_JOBS_POLL_INTERVAL = float(os.getenv('FIX_JOBS_POLL_INTERVAL', '1'))
+
+# Priority by feedback_type; lower runs first
+PRIORITIES = {
+    "bug": 0,
+    "performance": 1,
+    "ux": 2,
+    "improvement": 2,
+    "feature": 3,
+    "content": 3,
+    "other": 4,
+}
+DEFAULT_PRIORITY = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fix_jobs (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_fix_jobs_queue ON fix_jobs(status, priority, tenant, enqueued_at);
+CREATE TABLE IF NOT EXISTS fix_tenants (
+    tenant TEXT PRIMARY KEY,
+    last_served REAL NOT NULL
+);
+"""
+
+WAIT_BUCKETS = (1, 5, 15, 60, 300, 900, 3600)
+
+
+def job_priority(feedback_type: Optional[str]) -> int:
+    """Priority for a job from its feedback type."""
+    return PRIORITIES.get((feedback_type or "").lower(), DEFAULT_PRIORITY)
+
+
+def tenant_for(user_id: str, repo_url: str) -> str:
+    return f"{user_id}|{repo_url}"
+
+
+class FixScheduler:
+    """Durable fair queue plus the asyncio loop that runs its jobs."""
+
+    def __init__(self, path: str, runner: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.path = path
+        self.runner = runner
+        self._sqlite = ThreadLocalSQLite(path, _SCHEMA)
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _db(self):
+        return self._sqlite.conn()
+
+    def _call_on_loop(self, callback: Callable[[], Any]) -> None:
+        """Run callback on the scheduler's event loop, from any thread."""
+        loop = self._event_loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            callback()
+        else:
+            # asyncio objects are not thread-safe; sync endpoints run in the threadpool
+            loop.call_soon_threadsafe(callback)
+
+    # ------------------------------------------------------------------
+    # Queue operations (safe to call from any worker)
+    # ------------------------------------------------------------------
+
+    def enqueue(self, tenant: str, priority: int, payload: Dict[str, Any]) -> str:
+        """
+        Add a job to the queue.
+
+        Returns:
+            The job id
+        """
+        job_id = uuid.uuid4().hex
+        self._db().execute(
+            "INSERT INTO fix_jobs (id, tenant, priority, status, payload, enqueued_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, tenant, priority, json.dumps(payload, default=str), time.time())
+        )
+        metrics.inc("fix_jobs_enqueued", tenant=tenant)
+        if self._wakeup is not None:
+            self._call_on_loop(self._wakeup.set)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status and result, without its payload."""
+        row = self._db().execute(
+            "SELECT id, tenant, priority, status, result, error, enqueued_at, started_at, finished_at "
+            "FROM fix_jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        A running job's thread cannot be interrupted; its result is discarded.
+
+        Returns:
+            True if the job was queued or running
+        """
+        cursor = self._db().execute(
+            "UPDATE fix_jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id)
+        )
+        task = self._running.get(job_id)
+        if task is not None:
+            self._call_on_loop(task.cancel)
+        return cursor.rowcount == 1
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Queue depth, running count and wait times per tenant."""
+        now = time.time()
+        rows = self._db().execute(
+            """
+            SELECT tenant,
+                   SUM(status = 'queued') AS queued,
+                   SUM(status = 'running') AS running,
+                   MIN(CASE WHEN status = 'queued' THEN enqueued_at END) AS oldest_queued,
+                   AVG(CASE WHEN started_at IS NOT NULL AND started_at > ? THEN started_at - enqueued_at END) AS avg_wait
+            FROM fix_jobs
+            GROUP BY tenant
+            HAVING queued > 0 OR running > 0 OR avg_wait IS NOT NULL
+            """,
+            (now - 3600,)
+        ).fetchall()
+        return [
+            {
+                "tenant": row["tenant"],
+                "queued": row["queued"],
+                "running": row["running"],
+                "oldest_wait_seconds": now - row["oldest_queued"] if row["oldest_queued"] else 0,
+                "avg_wait_seconds_1h": row["avg_wait"] or 0
+            }
+            for row in rows
+        ]
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically pick the next job under the fairness and concurrency rules."""
+        now = time.time()
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Requeue jobs whose worker stopped renewing the lease
+            conn.execute(
+                "UPDATE fix_jobs SET status = 'queued', started_at = NULL, lease_until = NULL "
+                "WHERE status = 'running' AND lease_until < ?",
+                (now,)
+            )
+
+            running = dict(conn.execute(
+                "SELECT tenant, COUNT(*) FROM fix_jobs WHERE status = 'running' GROUP BY tenant"
+            ).fetchall())
+            if sum(running.values()) >= FIX_JOBS_MAX_CONCURRENCY:
+                conn.execute("COMMIT")
+                return None
+
+            # Best queued priority per tenant, least recently served tenant first
+            candidates = conn.execute(
+                """
+                SELECT q.tenant, MIN(q.priority) AS priority, COALESCE(t.last_served, 0) AS last_served
+                FROM fix_jobs q LEFT JOIN fix_tenants t ON t.tenant = q.tenant
+                WHERE q.status = 'queued'
+                GROUP BY q.tenant
+                ORDER BY priority, last_served
+                """
+            ).fetchall()
+
+            for candidate in candidates:
+                tenant = candidate["tenant"]
+                if running.get(tenant, 0) >= FIX_JOBS_TENANT_CONCURRENCY:
+                    continue
+                job = conn.execute(
+                    "SELECT id, tenant, payload, enqueued_at FROM fix_jobs "
+                    "WHERE status = 'queued' AND tenant = ? AND priority = ? ORDER BY enqueued_at LIMIT 1",
+                    (tenant, candidate["priority"])
+                ).fetchone()
+                conn.execute(
+                    "UPDATE fix_jobs SET status = 'running', started_at = ?, lease_until = ? WHERE id = ?",
+                    (now, now + FIX_JOBS_LEASE_SECONDS, job["id"])
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO fix_tenants (tenant, last_served) VALUES (?, ?)",
+                    (tenant, now)
+                )
+                conn.execute("COMMIT")
+                metrics.observe("fix_job_wait_seconds", now - job["enqueued_at"], buckets=WAIT_BUCKETS, tenant=tenant)
+                return dict(job)
+
+            conn.execute("COMMIT")
+            return None
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        # A cancelled job keeps its status; its late result is dropped
+        self._db().execute(
+            "UPDATE fix_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id)
+        )
+
+    def _renew_leases(self, ids: List[str]) -> None:
+        if ids:
+            self._db().execute(
+                f"UPDATE fix_jobs SET lease_until = ? WHERE status = 'running' AND id IN ({','.join('?' * len(ids))})",
+                (time.time() + FIX_JOBS_LEASE_SECONDS, *ids)
+            )
+
+    # ------------------------------------------------------------------
+    # Execution loop (one per worker process)
+    # ------------------------------------------------------------------
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        tenant = job["tenant"]
+        try:
+            result = await run_in_threadpool(self.runner, json.loads(job["payload"]))
+            await run_in_threadpool(self._finish, job["id"], "done", result=result)
+            metrics.inc("fix_jobs_completed", tenant=tenant)
+            logger.info(f"✓ Fix job {job['id']} finished for {tenant}")
+        except asyncio.CancelledError:
+            logger.info(f"Fix job {job['id']} cancelled")
+        except Exception as e:
+            await run_in_threadpool(self._finish, job["id"], "failed", error=str(e))
+            metrics.inc("fix_jobs_failed", tenant=tenant)
+            logger.error(f"✗ Fix job {job['id']} failed: {e}")
+        finally:
+            metrics.observe("fix_job_run_seconds", time.perf_counter() - start, tenant=tenant)
+            self._running.pop(job["id"], None)
+            self._wakeup.set()
+
+    async def _loop(self) -> None:
+        last_renewal = 0.0
+        while True:
+            try:
+                while True:
+                    job = await run_in_threadpool(self._claim)
+                    if job is None:
+                        break
+                    self._running[job["id"]] = asyncio.create_task(self._run_job(job))
+
+                if time.time() - last_renewal > FIX_JOBS_LEASE_SECONDS / 3:
+                    await run_in_threadpool(self._renew_leases, list(self._running))
+                    last_renewal = time.time()
+            except Exception as e:
+                logger.error(f"✗ Fix scheduler loop error: {e}")
+
+            metrics.set_gauge("fix_jobs_running_local", len(self._running))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=FIX_JOBS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the execution loop on the running event loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._event_loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                f"✓ Fix scheduler started (global concurrency {FIX_JOBS_MAX_CONCURRENCY}, "
+                f"per tenant {FIX_JOBS_TENANT_CONCURRENCY})"
+            )
+
+    async def stop(self) -> None:
+        """
+        Stop the loop. Jobs still running keep status 'running' and are picked
+        up again by any worker once their lease expires.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            for task in list(self._running.values()):
+                task.cancel()
+            await asyncio.gather(self._task, *self._running.values(), return_exceptions=True)
+            self._task = None
+            self._event_loop = None
+            self._running.clear()
+        self._sqlite.close()
+
+
+def _run_fix_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild the Feedback from a job payload and run the AI fix pipeline.
+
+    The analysis text goes to the ai_analyses store; the job result and the
+    feedback document only keep its id.
+    """
+    from app.models.feedback import Feedback
+    from app.services.feedback_processor import analyze_and_fix_feedback
+    from app.services.ai_store import attach_fix_result
+
+    result = analyze_and_fix_feedback(Feedback(**payload["feedback"]), feedback_id=payload.get("feedback_id"))
+    return attach_fix_result(payload.get("feedback_id"), result)
+
+
+_scheduler: Optional[FixScheduler] = None
+
+
+def get_fix_scheduler() -> FixScheduler:
+    """Get the process-wide scheduler with lazy initialization."""
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = FixScheduler(FIX_JOBS_PATH or data_path('fix_jobs.db'), _run_fix_job)
+
+    return _scheduler
+
+
+def enqueue_fix_job(feedback, feedback_id: Optional[str] = None) -> str:
+    """
+    Queue the AI fix pipeline for a feedback submission.
+
+    Args:
+        feedback: The Feedback model
+        feedback_id: Id of the stored feedback document
+
+    Returns:
+        The job id
+    """
+    return get_fix_scheduler().enqueue(
+        tenant_for(feedback.user_id, feedback.repo_url),
+        job_priority(feedback.feedback_type),
+        {"feedback": feedback.model_dump(), "feedback_id": feedback_id}
+    )
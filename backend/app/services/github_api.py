@@ -0,0 +1,148 @@
+"""
+Shared GitHub REST client.
+
+One httpx.AsyncClient per worker process keeps connections to the GitHub
+API alive across requests. It is created on first use and closed from the
+app lifespan.
+"""
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.single_flight import single_flight
+
+load_dotenv()
+
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+
+_client: Optional[httpx.AsyncClient] = None
+# credential_owner(token) -> (remaining REST requests, reset epoch) from GitHub's last answer
+_rate_limits: Dict[str, Tuple[int, float]] = {}
+
+
+class GitHubAPIError(Exception):
+    """Raised when GitHub answers with a non-success status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def github_headers(token: str) -> Dict[str, str]:
+    """Build the standard request headers for an authenticated GitHub call."""
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json"
+    }
+
+
+def credential_owner(token: str) -> str:
+    """Stable, non-reversible id for a token, used in coalescing keys."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def get_github_client() -> httpx.AsyncClient:
+    """Get the process-wide GitHub HTTP client with lazy initialization."""
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=GITHUB_API_URL, timeout=15.0)
+        logger.debug(f"GitHub API client initialized for: {GITHUB_API_URL}")
+
+    return _client
+
+
+async def close_github_client() -> None:
+    """Close the GitHub HTTP client for this process."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def github_request(
+    method: str,
+    path: str,
+    token: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Optional[Any] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> Any:
+    """
+    Call a GitHub API path and return the decoded JSON body.
+
+    Args:
+        method: HTTP method
+        path: API path such as "/user/repos"
+        token: The user's GitHub access token
+        params: Optional query parameters
+        json: Optional JSON request body
+        client: Client to use instead of the shared one (e.g. from another event loop)
+
+    Returns:
+        The parsed JSON response
+
+    Raises:
+        GitHubAPIError: If GitHub returns a non-2xx status
+    """
+    client = client or get_github_client()
+    response = await client.request(method, path, headers=github_headers(token), params=params, json=json)
+    _record_rate_limit(token, response)
+
+    if not 200 <= response.status_code < 300:
+        logger.error(f"✗ GitHub {method} {path} failed with status {response.status_code}")
+        logger.debug(f"  Response body: {response.text}")
+        raise GitHubAPIError(response.status_code, f"GitHub {method} {path} failed")
+
+    return response.json() if response.content else None
+
+
+def _record_rate_limit(token: str, response: httpx.Response) -> None:
+    # GraphQL and search have budgets of their own; only the REST core budget is tracked
+    if response.headers.get('x-ratelimit-resource', 'core') != 'core':
+        return
+    remaining = response.headers.get('x-ratelimit-remaining')
+    reset = response.headers.get('x-ratelimit-reset')
+    if remaining is not None and reset is not None:
+        try:
+            _rate_limits[credential_owner(token)] = (int(remaining), float(reset))
+        except ValueError:
+            pass
+
+
+def rate_limit_remaining(token: str) -> Optional[int]:
+    """
+    Requests left in the token's current GitHub rate-limit window.
+
+    Returns:
+        The count from GitHub's last response, or None if unknown or the window has reset
+    """
+    known = _rate_limits.get(credential_owner(token))
+    if known is None or known[1] <= time.time():
+        return None
+    return known[0]
+
+
+async def github_get(path: str, token: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    GET a GitHub API path and return the decoded JSON body.
+
+    Args:
+        path: API path such as "/user/repos"
+        token: The user's GitHub access token
+        params: Optional query parameters
+
+    Concurrent identical GETs made with the same token share one request.
+
+    Returns:
+        The parsed JSON response
+
+    Raises:
+        GitHubAPIError: If GitHub returns a non-2xx status
+    """
+    key = ("github", "GET", path, tuple(sorted((params or {}).items())), credential_owner(token))
+    return await single_flight.do(key, lambda: github_request("GET", path, token, params=params))
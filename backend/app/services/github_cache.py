@@ -0,0 +1,81 @@
+"""
+Cross-worker cache for GitHub repository data.
+
+Entries live in the shared state store and are tagged by repository
+(repo:<owner>/<name>) and by owning account (account:<login>), so the
+GitHub webhook handler can drop exactly the entries an event affects.
+"""
+import os
+from typing import Any, Dict, List, Optional
+import orjson
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.shared_state import get_shared_store
+
+load_dotenv()
+
+# Webhooks keep entries fresh; TTLs only bound staleness if a delivery is missed
+REPO_CACHE_TTL = float(os.getenv('REPO_CACHE_TTL', '3600'))
+TREE_CACHE_TTL = float(os.getenv('TREE_CACHE_TTL', '3600'))
+
+
+def repo_tag(full_name: str) -> str:
+    return f"repo:{full_name.lower()}"
+
+
+def account_tag(login: str) -> str:
+    return f"account:{login.lower()}"
+
+
+def get_cached_repos(github_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached repository listing for a user, if present."""
+    value = get_shared_store().get(f"repos:{github_id}")
+    return orjson.loads(value) if value is not None else None
+
+
+def cache_repos(github_id: int, github_login: str, repos: List[Dict[str, Any]]) -> None:
+    """
+    Cache a user's simplified repository listing.
+
+    Args:
+        github_id: The GitHub user ID
+        github_login: The user's login, tagged so new repos invalidate the listing
+        repos: Simplified repos as returned by get_user_repos
+    """
+    tags = {account_tag(github_login)}
+    for repo in repos:
+        full_name = repo.get('full_name')
+        if full_name:
+            tags.add(repo_tag(full_name))
+            tags.add(account_tag(full_name.split('/')[0]))
+    get_shared_store().set(f"repos:{github_id}", orjson.dumps(repos).decode(), ttl=REPO_CACHE_TTL, tags=tags)
+
+
+def get_cached_tree(full_name: str) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached root tree entries of a repository, if present."""
+    value = get_shared_store().get(f"tree:{full_name.lower()}")
+    return orjson.loads(value) if value is not None else None
+
+
+def cache_tree(full_name: str, entries: List[Dict[str, Any]]) -> None:
+    """Cache the root tree entries (path, type, sha) of a repository."""
+    get_shared_store().set(
+        f"tree:{full_name.lower()}",
+        orjson.dumps(entries).decode(),
+        ttl=TREE_CACHE_TTL,
+        tags=[repo_tag(full_name)]
+    )
+
+
+def invalidate_repo(full_name: str) -> int:
+    """Drop every cache entry that mentions a repository."""
+    removed = get_shared_store().invalidate_tag(repo_tag(full_name))
+    logger.debug(f"Invalidated {removed} cache entr(ies) for repo {full_name}")
+    return removed
+
+
+def invalidate_account(login: str) -> int:
+    """Drop every cache entry that lists repositories owned by an account."""
+    removed = get_shared_store().invalidate_tag(account_tag(login))
+    logger.debug(f"Invalidated {removed} cache entr(ies) for account {login}")
+    return removed
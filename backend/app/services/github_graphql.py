@@ -0,0 +1,130 @@
+"""
+GitHub GraphQL queries that batch what would otherwise be many REST calls.
+"""
+from typing import Any, Dict, List, Optional
+from app.utils.logger import logger
+from app.services.github_api import GitHubAPIError, github_request
+
+# Repositories per GraphQL page; keeps each page's node count well under GitHub's limits
+OVERVIEW_PAGE_SIZE = 50
+
+OVERVIEW_QUERY = """
+query($first: Int!, $after: String, $commits: Int!) {
+  viewer {
+    repositories(
+      first: $first
+      after: $after
+      orderBy: {field: UPDATED_AT, direction: DESC}
+      ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        databaseId
+        name
+        nameWithOwner
+        description
+        url
+        isPrivate
+        stargazerCount
+        updatedAt
+        primaryLanguage { name }
+        defaultBranchRef {
+          target {
+            ... on Commit {
+              history(first: $commits) {
+                nodes { oid message url author { name date } }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+  rateLimit { cost remaining }
+}
+"""
+
+
+async def github_graphql(query: str, variables: Dict[str, Any], token: str) -> Dict[str, Any]:
+    """
+    Run a GraphQL query and return its data.
+
+    Raises:
+        GitHubAPIError: On HTTP errors, or 502 if the response carries GraphQL errors
+    """
+    result = await github_request("POST", "/graphql", token, json={"query": query, "variables": variables})
+
+    if result.get("errors"):
+        logger.error(f"✗ GitHub GraphQL errors: {result['errors']}")
+        raise GitHubAPIError(502, f"GitHub GraphQL error: {result['errors'][0].get('message')}")
+
+    return result["data"]
+
+
+def _shape_repo(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a GraphQL repository node like the REST /repos response, plus commits."""
+    target = ((node.get("defaultBranchRef") or {}).get("target") or {})
+    history = ((target.get("history") or {}).get("nodes")) or []
+    return {
+        "id": node.get("databaseId"),
+        "name": node.get("name"),
+        "full_name": node.get("nameWithOwner"),
+        "description": node.get("description"),
+        "html_url": node.get("url"),
+        "clone_url": f"{node['url']}.git" if node.get("url") else None,
+        "private": node.get("isPrivate"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "stargazers_count": node.get("stargazerCount"),
+        "updated_at": node.get("updatedAt"),
+        "commits": [
+            {
+                "sha": commit.get("oid"),
+                "message": commit.get("message"),
+                "author": (commit.get("author") or {}).get("name"),
+                "date": (commit.get("author") or {}).get("date"),
+                "url": commit.get("url")
+            }
+            for commit in history
+        ]
+    }
+
+
+async def fetch_user_overview(token: str, max_repos: int, commits_per_repo: int) -> List[Dict[str, Any]]:
+    """
+    Fetch the user's most recently updated repos with their latest commits.
+
+    One GraphQL request per OVERVIEW_PAGE_SIZE repositories, instead of one
+    REST call for the listing plus one per repository.
+
+    Args:
+        token: The user's GitHub access token
+        max_repos: Maximum number of repositories returned
+        commits_per_repo: Latest commits on the default branch per repository
+
+    Returns:
+        list: Repos shaped like /repos entries, each with a "commits" list
+    """
+    repos: List[Dict[str, Any]] = []
+    cursor: Optional[str] = None
+    pages = 0
+
+    while len(repos) < max_repos:
+        data = await github_graphql(
+            OVERVIEW_QUERY,
+            {"first": min(OVERVIEW_PAGE_SIZE, max_repos - len(repos)), "after": cursor, "commits": commits_per_repo},
+            token
+        )
+        pages += 1
+        connection = data["viewer"]["repositories"]
+        repos.extend(_shape_repo(node) for node in connection["nodes"] if node)
+
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        cursor = connection["pageInfo"]["endCursor"]
+
+    rate = data.get("rateLimit") or {}
+    logger.info(
+        f"✓ Fetched overview of {len(repos)} repos in {pages} GraphQL request(s) "
+        f"(last cost: {rate.get('cost')}, remaining: {rate.get('remaining')})"
+    )
+    return repos
@@ -0,0 +1,145 @@
+"""
+Create a branch, commit and pull request through the GitHub Git Data API.
+
+However many files change, the sequential part is a fixed set of calls:
+
+    [repo]      GET  /repos/{owner}/{repo}              (only if base is not given)
+    ref         GET  /repos/{owner}/{repo}/git/ref/heads/{base}
+    commit      GET  /repos/{owner}/{repo}/git/commits/{sha}
+    tree        POST /repos/{owner}/{repo}/git/trees
+    commit      POST /repos/{owner}/{repo}/git/commits
+    ref         POST /repos/{owner}/{repo}/git/refs
+    pull        POST /repos/{owner}/{repo}/pulls
+
+Small UTF-8 files are sent inline in the tree request, so they cost no
+extra calls. Binary or large files are uploaded as blobs concurrently,
+before the tree is created.
+"""
+import asyncio
+import base64
+import os
+from typing import Any, Dict, List, Optional, Union
+import httpx
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.services.github_api import GITHUB_API_URL, github_request
+
+load_dotenv()
+
+# Text files up to this many bytes are inlined in the tree request
+PR_INLINE_MAX_BYTES = int(os.getenv('PR_INLINE_MAX_BYTES', '65536'))
+# Blob uploads in flight at once
+PR_BLOB_CONCURRENCY = int(os.getenv('PR_BLOB_CONCURRENCY', '8'))
+
+FileContent = Union[str, bytes, None]  # None deletes the path
+
+
+def _inline_text(content: Union[str, bytes]) -> Optional[str]:
+    """Return content as text if it can go inline in the tree request."""
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+    return content if len(content.encode('utf-8')) <= PR_INLINE_MAX_BYTES else None
+
+
+async def create_fix_pull_request(
+    owner: str,
+    repo: str,
+    token: str,
+    files: Dict[str, FileContent],
+    branch: str,
+    title: str,
+    body: str = "",
+    base: Optional[str] = None,
+    commit_message: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
+    """
+    Commit a set of file changes to a new branch and open a pull request.
+
+    Args:
+        owner: Repository owner login
+        repo: Repository name
+        token: GitHub token with repo scope
+        files: Map of path to new content (str or bytes), or None to delete
+        branch: Name of the branch to create
+        title: Pull request title
+        body: Pull request description
+        base: Branch to build on and merge into (defaults to the repo's default branch)
+        commit_message: Commit message (defaults to the title)
+        client: Optional httpx client (defaults to the shared GitHub client)
+
+    Returns:
+        dict: The created pull request (number, html_url, ...) plus commit_sha
+
+    Raises:
+        GitHubAPIError: If any GitHub call fails
+    """
+    prefix = f"/repos/{owner}/{repo}"
+
+    async def call(method: str, path: str, json: Any = None) -> Any:
+        return await github_request(method, prefix + path, token, json=json, client=client)
+
+    if base is None:
+        base = (await github_request("GET", prefix, token, client=client))["default_branch"]
+
+    base_sha = (await call("GET", f"/git/ref/heads/{base}"))["object"]["sha"]
+    base_tree = (await call("GET", f"/git/commits/{base_sha}"))["tree"]["sha"]
+
+    entries: List[Dict[str, Any]] = []
+    uploads = []
+    for path, content in files.items():
+        entry = {"path": path, "mode": "100644", "type": "blob"}
+        if content is None:
+            entry["sha"] = None
+        else:
+            text = _inline_text(content)
+            if text is not None:
+                entry["content"] = text
+            else:
+                uploads.append((entry, content))
+        entries.append(entry)
+
+    if uploads:
+        semaphore = asyncio.Semaphore(PR_BLOB_CONCURRENCY)
+
+        async def upload(entry: Dict[str, Any], content: Union[str, bytes]) -> None:
+            raw = content.encode('utf-8') if isinstance(content, str) else content
+            async with semaphore:
+                blob = await call("POST", "/git/blobs", {
+                    "content": base64.b64encode(raw).decode('ascii'),
+                    "encoding": "base64"
+                })
+            entry["sha"] = blob["sha"]
+
+        await asyncio.gather(*(upload(entry, content) for entry, content in uploads))
+
+    tree = await call("POST", "/git/trees", {"base_tree": base_tree, "tree": entries})
+    commit = await call("POST", "/git/commits", {
+        "message": commit_message or title,
+        "tree": tree["sha"],
+        "parents": [base_sha]
+    })
+    await call("POST", "/git/refs", {"ref": f"refs/heads/{branch}", "sha": commit["sha"]})
+    pull = await call("POST", "/pulls", {"title": title, "head": branch, "base": base, "body": body})
+
+    logger.info(
+        f"✓ Opened PR #{pull.get('number')} on {owner}/{repo} "
+        f"({len(files)} file(s), {len(uploads)} blob upload(s))"
+    )
+    return {**pull, "commit_sha": commit["sha"]}
+
+
+def create_fix_pull_request_sync(*args, **kwargs) -> Dict[str, Any]:
+    """
+    Run create_fix_pull_request from synchronous code (e.g. a job thread).
+
+    Uses a dedicated client, since the shared one belongs to the server's event loop.
+    """
+    async def run():
+        async with httpx.AsyncClient(base_url=GITHUB_API_URL, timeout=30.0) as client:
+            return await create_fix_pull_request(*args, client=client, **kwargs)
+
+    return asyncio.run(run())
@@ -0,0 +1,51 @@
+"""
+Repository listings in the simplified shape the API serves.
+
+Shared by the /repos route and the post-login warm-up, so both fill the
+repo cache the same way.
+"""
+from typing import Any, Dict, List
+from app.utils.logger import logger
+from app.utils.fast_json import compile_extractor
+from app.services.github_api import github_get
+from app.services.github_cache import cache_repos
+
+# Simplified repo fields -> key path in GitHub's repo objects
+REPO_FIELDS = {
+    "id": ("id",),
+    "name": ("name",),
+    "full_name": ("full_name",),
+    "description": ("description",),
+    "html_url": ("html_url",),
+    "clone_url": ("clone_url",),
+    "private": ("private",),
+    "language": ("language",),
+    "stargazers_count": ("stargazers_count",),
+    "updated_at": ("updated_at",),
+}
+
+_extract = compile_extractor(REPO_FIELDS)
+
+
+async def refresh_repos(github_id: int, github_login: str, token: str) -> List[Dict[str, Any]]:
+    """
+    Fetch a user's repositories from GitHub and refresh the repo cache.
+
+    Args:
+        github_id: The GitHub user ID
+        github_login: The user's login
+        token: The user's GitHub access token
+
+    Returns:
+        list: Simplified repos with every REPO_FIELDS field, most recently updated first
+
+    Raises:
+        GitHubAPIError: If GitHub rejects the request
+    """
+    raw_repos = await github_get("/user/repos", token, params={"sort": "updated", "per_page": 100})
+    logger.info(f"✓ Fetched {len(raw_repos)} repositories for github_id: {github_id}")
+
+    # Keep simplified repo info only
+    repos = [_extract(repo) for repo in raw_repos]
+    cache_repos(github_id, github_login, repos)
+    return repos
@@ -0,0 +1,169 @@
+"""
+Post-login warm-up of a user's GitHub data.
+
+Right after the OAuth callback, a background task fetches the repository
+listing into the repo cache and syncs commit history for the
+GITHUB_WARMUP_REPOS most recently updated repositories, so the dashboard's
+first requests are served locally. The frontend's own /repos request
+usually arrives while the warm-up's listing call is in flight and joins it
+through single_flight instead of making a second call.
+
+Warm-ups are best effort and never compete with the user for GitHub quota:
+they stop when the token has fewer than GITHUB_WARMUP_MIN_REMAINING REST
+requests left or GitHub rate-limits them, and are bounded by
+GITHUB_WARMUP_TIMEOUT. Each account has at most one warm-up; logging out or
+logging in again cancels it, and shutdown cancels them all.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.services.github_api import GitHubAPIError, rate_limit_remaining
+from app.services.github_repos import refresh_repos
+from app.services.commit_store import sync_commits
+
+load_dotenv()
+
+GITHUB_WARMUP_ENABLED = os.getenv('GITHUB_WARMUP_ENABLED', 'true').lower() == 'true'
+GITHUB_WARMUP_REPOS = int(os.getenv('GITHUB_WARMUP_REPOS', '5'))
+GITHUB_WARMUP_MIN_REMAINING = int(os.getenv('GITHUB_WARMUP_MIN_REMAINING', '1000'))
+GITHUB_WARMUP_TIMEOUT = float(os.getenv('GITHUB_WARMUP_TIMEOUT', '60'))
+
+
+class WarmupBudgetExhausted(Exception):
+    """Raised inside a warm-up when the token's GitHub budget is too low to continue."""
+
+
+def _check_budget(token: str) -> None:
+    remaining = rate_limit_remaining(token)
+    if remaining is not None and remaining < GITHUB_WARMUP_MIN_REMAINING:
+        raise WarmupBudgetExhausted(f"{remaining} GitHub requests left")
+
+
+async def warm_account(github_id: int, github_login: str, token: str, max_repos: int = GITHUB_WARMUP_REPOS) -> int:
+    """
+    Fill the repo cache and commit store for an account's most active repos.
+
+    Args:
+        github_id: The GitHub user ID
+        github_login: The user's login
+        token: The user's GitHub access token
+        max_repos: Number of most recently updated repos to sync commits for
+
+    Returns:
+        Number of repos whose commit history was synced
+
+    Raises:
+        WarmupBudgetExhausted: If the GitHub budget ran low
+        GitHubAPIError: If GitHub rejected the listing call
+    """
+    _check_budget(token)
+    repos = await refresh_repos(github_id, github_login, token)
+
+    synced = 0
+    for repo in repos[:max_repos]:
+        _check_budget(token)
+        try:
+            await sync_commits(github_id, github_login, repo["name"], token)
+        except GitHubAPIError as e:
+            if e.status_code in (403, 429):
+                raise WarmupBudgetExhausted(f"GitHub answered {e.status_code}")
+            # Empty or inaccessible repos (409, 404) shouldn't stop the rest
+            logger.debug(f"Warm-up skipped {github_login}/{repo['name']}: {e.status_code}")
+            continue
+        synced += 1
+    return synced
+
+
+class WarmupRegistry:
+    """Tracks one running warm-up task per account so they can be cancelled."""
+
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, github_id: int, github_login: str, token: str) -> bool:
+        """
+        Start a warm-up for an account, replacing any that is still running.
+
+        Must be called from the event loop.
+
+        Returns:
+            True if a warm-up was started
+        """
+        if not GITHUB_WARMUP_ENABLED:
+            return False
+        self.cancel(github_id)
+        task = asyncio.get_running_loop().create_task(
+            self._run(github_id, github_login, token), name=f"github-warmup-{github_id}"
+        )
+        self._tasks[github_id] = task
+        task.add_done_callback(lambda done: self._forget(github_id, done))
+        return True
+
+    def _forget(self, github_id: int, task: asyncio.Task) -> None:
+        if self._tasks.get(github_id) is task:
+            del self._tasks[github_id]
+
+    async def _run(self, github_id: int, github_login: str, token: str) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        status = "ok"
+        try:
+            synced = await asyncio.wait_for(warm_account(github_id, github_login, token), GITHUB_WARMUP_TIMEOUT)
+            logger.info(f"✓ Warmed GitHub data for {github_login}: repos + {synced} commit histories "
+                        f"in {loop.time() - started:.1f}s")
+        except asyncio.CancelledError:
+            status = "cancelled"
+            logger.debug(f"GitHub warm-up cancelled for {github_login}")
+            raise
+        except WarmupBudgetExhausted as e:
+            status = "budget"
+            logger.info(f"GitHub warm-up for {github_login} stopped early: {e}")
+        except asyncio.TimeoutError:
+            status = "timeout"
+            logger.warning(f"⚠ GitHub warm-up for {github_login} timed out after {GITHUB_WARMUP_TIMEOUT:.0f}s")
+        except Exception as e:
+            status = "error"
+            logger.warning(f"⚠ GitHub warm-up for {github_login} failed: {e}")
+        finally:
+            metrics.inc("github_warmups", status=status)
+
+    def cancel(self, github_id: int) -> bool:
+        """
+        Cancel an account's running warm-up.
+
+        Returns:
+            True if one was running
+        """
+        task = self._tasks.pop(github_id, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def active(self) -> List[int]:
+        """GitHub IDs with a warm-up in progress."""
+        return [github_id for github_id, task in self._tasks.items() if not task.done()]
+
+    async def cancel_all(self) -> None:
+        """Cancel every running warm-up and wait for them to finish."""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_registry: Optional[WarmupRegistry] = None
+
+
+def get_warmup_registry() -> WarmupRegistry:
+    """Get the process-wide warm-up registry with lazy initialization."""
+    global _registry
+
+    if _registry is None:
+        _registry = WarmupRegistry()
+
+    return _registry
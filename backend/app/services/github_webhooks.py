@@ -0,0 +1,131 @@
+"""
+Apply GitHub webhook events to the local repository caches.
+
+Each handler touches only the cache entries and commit history of the
+repositories and accounts named in the event. Pushed commits are only
+appended to a stored history that ends at the push's `before` commit;
+anything else (a missed delivery, a truncated payload) marks the repo
+stale so the next request runs a delta sync instead.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from app.utils.logger import logger
+from app.services import commit_store
+from app.services.github_cache import invalidate_repo, invalidate_account
+
+# GitHub truncates push payloads to this many commits
+PUSH_PAYLOAD_COMMIT_LIMIT = 20
+
+
+def _utc_iso(timestamp: str) -> str:
+    """Normalize a webhook timestamp to the Z-suffixed UTC form the REST API returns."""
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _split_full_name(repository: Dict[str, Any]) -> tuple:
+    owner, _, name = (repository.get('full_name') or '').partition('/')
+    return owner, name
+
+
+def handle_push(payload: Dict[str, Any]) -> None:
+    repository = payload.get('repository') or {}
+    owner, name = _split_full_name(repository)
+    default_ref = f"refs/heads/{repository.get('default_branch', 'main')}"
+
+    if payload.get('ref') != default_ref:
+        logger.debug(f"Ignoring push to non-default ref {payload.get('ref')} on {owner}/{name}")
+        return
+
+    invalidate_repo(repository['full_name'])
+
+    commits: List[Dict[str, Any]] = payload.get('commits') or []
+    if payload.get('forced'):
+        # History was rewritten, so stored commits may no longer exist
+        commit_store.delete_repo(owner, name)
+        logger.info(f"✓ Dropped rewritten commit history for {owner}/{name}")
+    elif len(commits) >= PUSH_PAYLOAD_COMMIT_LIMIT:
+        # Payload may be truncated; let the next request fetch the delta
+        commit_store.mark_stale(owner, name)
+    else:
+        rows = [
+            (c.get('id'), c.get('message'), (c.get('author') or {}).get('name'), _utc_iso(c['timestamp']), c.get('url'))
+            for c in commits
+            if c.get('timestamp')
+        ]
+        added = commit_store.store_pushed_commits(owner, name, payload.get('before'), payload.get('after'), rows)
+        logger.info(f"✓ Stored {added} pushed commit(s) for {owner}/{name}")
+
+
+def handle_repository(payload: Dict[str, Any]) -> None:
+    repository = payload.get('repository') or {}
+    action = payload.get('action')
+    owner, name = _split_full_name(repository)
+
+    invalidate_repo(repository.get('full_name', ''))
+    invalidate_account(owner)
+
+    if action == 'deleted':
+        commit_store.delete_repo(owner, name)
+    elif action == 'transferred':
+        # The payload names the new owner; history and caches live under the old one
+        previous = ((payload.get('changes') or {}).get('owner') or {}).get('from') or {}
+        old_owner = (previous.get('user') or previous.get('organization') or {}).get('login')
+        if old_owner:
+            invalidate_repo(f"{old_owner}/{name}")
+            invalidate_account(old_owner)
+            commit_store.delete_repo(old_owner, name)
+        commit_store.delete_repo(owner, name)
+    elif action == 'renamed':
+        old_name = ((payload.get('changes') or {}).get('repository') or {}).get('name', {}).get('from')
+        if old_name:
+            invalidate_repo(f"{owner}/{old_name}")
+            commit_store.delete_repo(owner, old_name)
+
+    logger.info(f"✓ Applied repository.{action} for {owner}/{name}")
+
+
+def handle_installation(payload: Dict[str, Any]) -> None:
+    installation = payload.get('installation') or {}
+    login = (installation.get('account') or {}).get('login')
+
+    if login:
+        invalidate_account(login)
+
+    repositories = (
+        (payload.get('repositories') or [])
+        + (payload.get('repositories_added') or [])
+        + (payload.get('repositories_removed') or [])
+    )
+    for repository in repositories:
+        if repository.get('full_name'):
+            invalidate_repo(repository['full_name'])
+
+    logger.info(f"✓ Applied installation event ({payload.get('action')}) for {login}: {len(repositories)} repo(s)")
+
+
+EVENT_HANDLERS = {
+    'push': handle_push,
+    'repository': handle_repository,
+    'installation': handle_installation,
+    'installation_repositories': handle_installation,
+}
+
+
+def process_github_event(event: str, payload: Dict[str, Any]) -> None:
+    """
+    Dispatch a webhook event to its handler.
+
+    Runs after the HTTP response has been sent, so errors are logged rather
+    than raised.
+    """
+    handler = EVENT_HANDLERS.get(event)
+    if handler is None:
+        logger.debug(f"Ignoring unhandled GitHub event: {event}")
+        return
+
+    try:
+        handler(payload)
+    except Exception as e:
+        logger.error(f"✗ Failed to process GitHub {event} event: {e}")
+        logger.exception("Full exception details:")
@@ -0,0 +1,87 @@
+"""
+Re-encrypt stored GitHub access tokens with the newest encryption key.
+
+After prepending a new key to TOKEN_ENCRYPTION_KEYS, run:
+
+    python -m app.services.key_rotation [--batch-size 200]
+
+Rows are read in id-ordered batches and each one is written back with a
+conditional update that only applies if the stored token is still the one
+that was read, so a login refreshing the token mid-run is never
+overwritten. The job can be interrupted and re-run safely.
+"""
+import argparse
+from typing import Dict
+from app.utils.logger import logger
+from app.utils.encryption import is_current_key, rotate_token
+from app.services.supabase_db import get_supabase
+
+ROTATION_COLUMNS = 'id, github_id, access_token'
+
+DEFAULT_BATCH_SIZE = 200
+
+
+def reencrypt_access_tokens(batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Migrate all github_accounts.access_token values to the newest key.
+
+    Args:
+        batch_size: Number of rows read per round trip
+
+    Returns:
+        dict: Counts of scanned, rotated, skipped (changed concurrently) and failed rows
+    """
+    client = get_supabase()
+    stats = {"scanned": 0, "rotated": 0, "skipped": 0, "failed": 0}
+    last_id = None
+
+    logger.info(f"=== Re-encrypting GitHub access tokens (batch size {batch_size}) ===")
+
+    while True:
+        query = client.table('github_accounts').select(ROTATION_COLUMNS).order('id').limit(batch_size)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.execute().data or []
+
+        if not rows:
+            break
+
+        last_id = rows[-1]['id']
+        stats["scanned"] += len(rows)
+
+        rotated = 0
+        for row in rows:
+            old_token = row['access_token']
+            if is_current_key(old_token):
+                continue
+            try:
+                new_token = rotate_token(old_token)
+            except Exception:
+                logger.error(f"✗ Could not rotate token for github_id: {row['github_id']}")
+                stats["failed"] += 1
+                continue
+
+            # Compare-and-set: a login may have stored a fresh token since the read
+            result = client.table('github_accounts').update({'access_token': new_token}) \
+                .eq('id', row['id']).eq('access_token', old_token).execute()
+            if result.data:
+                rotated += 1
+            else:
+                stats["skipped"] += 1
+
+        if rotated:
+            stats["rotated"] += rotated
+            logger.info(f"✓ Rotated {rotated} token(s) in batch ending at id {last_id}")
+
+        if len(rows) < batch_size:
+            break
+
+    logger.info(f"=== Token re-encryption finished: {stats} ===")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encrypt GitHub access tokens with the newest key")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    reencrypt_access_tokens(batch_size=args.batch_size)
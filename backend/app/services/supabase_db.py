@@ -2,11 +2,14 @@
 Supabase database service for user and GitHub account management.
 """
 import os
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from fastapi.concurrency import run_in_threadpool
 from app.utils.logger import logger
+from app.utils.single_flight import single_flight
 from app.utils.encryption import encrypt_token, decrypt_token
 
 load_dotenv()
@@ -22,6 +25,33 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 # Initialize Supabase client
 supabase: Optional[Client] = None
 
+# Column projections for github_accounts lookups.
+# Only token_only ever selects the encrypted access_token.
+ACCOUNT_SUMMARY_COLUMNS = 'id, user_id, github_id, github_login, scope, created_at, updated_at'
+TOKEN_ONLY_COLUMNS = 'github_id, github_login, access_token'
+EXISTS_COLUMNS = 'id'
+USER_COLUMNS = 'id, email, created_at'
+
+
+@dataclass(frozen=True, slots=True)
+class AccountSummary:
+    """GitHub account row without the encrypted token."""
+    id: str
+    user_id: str
+    github_id: int
+    github_login: str
+    scope: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
+
+@dataclass(frozen=True, slots=True)
+class AccountToken:
+    """Minimal row needed to make outbound GitHub calls for an account."""
+    github_id: int
+    github_login: str
+    access_token: str  # Still encrypted
+
 
 def get_supabase() -> Client:
     """Get Supabase client instance with lazy initialization."""
@@ -39,6 +69,18 @@ def get_supabase() -> Client:
     return supabase
 
 
+def close_supabase() -> None:
+    """Drop this process's Supabase client so its HTTP sessions can be released."""
+    global supabase
+
+    if supabase is not None:
+        try:
+            supabase.postgrest.session.close()
+        except Exception as e:
+            logger.debug(f"Ignoring error while closing Supabase session: {e}")
+        supabase = None
+
+
 def get_or_create_user(email: Optional[str] = None) -> Dict[str, Any]:
     """
     Get existing user by email or create a new one.
@@ -55,7 +97,7 @@ def get_or_create_user(email: Optional[str] = None) -> Dict[str, Any]:
     if email:
         # Try to find existing user by email
         logger.debug(f"Searching for existing user with email: {email}")
-        result = client.table('users').select('*').eq('email', email).execute()
+        result = client.table('users').select(USER_COLUMNS).eq('email', email).execute()
         if result.data:
             logger.info(f"✓ Found existing user by email: {result.data[0]['id']}")
             return result.data[0]
@@ -77,28 +119,69 @@ def get_or_create_user(email: Optional[str] = None) -> Dict[str, Any]:
     raise Exception("Failed to create user")
 
 
-def get_github_account_by_github_id(github_id: int) -> Optional[Dict[str, Any]]:
+def _select_account(columns: str, github_id: int) -> Optional[Dict[str, Any]]:
+    """Run a projected github_accounts lookup and return the first row, if any."""
+    client = get_supabase()
+    result = client.table('github_accounts').select(columns).eq('github_id', github_id).limit(1).execute()
+    return result.data[0] if result.data else None
+
+
+def get_account_summary(github_id: int) -> Optional[AccountSummary]:
     """
-    Get GitHub account by GitHub user ID.
+    Get a GitHub account's public fields by GitHub user ID.
+
+    The encrypted access token is never selected.
 
     Args:
         github_id: The GitHub user ID
 
     Returns:
-        GitHub account record or None if not found
+        AccountSummary or None if not found
     """
-    logger.debug(f"Looking up GitHub account for github_id: {github_id}")
-    client = get_supabase()
-    result = client.table('github_accounts').select('*').eq('github_id', github_id).execute()
+    logger.debug(f"Looking up account summary for github_id: {github_id}")
+    row = _select_account(ACCOUNT_SUMMARY_COLUMNS, github_id)
 
-    if result.data:
+    if row:
         logger.info(f"✓ Found GitHub account for github_id: {github_id}")
-        return result.data[0]
+        return AccountSummary(**row)
 
     logger.debug(f"No GitHub account found for github_id: {github_id}")
     return None
 
 
+def get_account_token(github_id: int) -> Optional[AccountToken]:
+    """
+    Get the login and encrypted access token for a GitHub account.
+
+    Args:
+        github_id: The GitHub user ID
+
+    Returns:
+        AccountToken or None if not found
+    """
+    logger.debug(f"Looking up account token for github_id: {github_id}")
+    row = _select_account(TOKEN_ONLY_COLUMNS, github_id)
+
+    if row and row.get('access_token'):
+        return AccountToken(**row)
+
+    logger.debug(f"No GitHub token found for github_id: {github_id}")
+    return None
+
+
+def github_account_exists(github_id: int) -> bool:
+    """
+    Check whether a GitHub account exists without fetching its fields.
+
+    Args:
+        github_id: The GitHub user ID
+
+    Returns:
+        True if an account row exists
+    """
+    return _select_account(EXISTS_COLUMNS, github_id) is not None
+
+
 def create_github_account(
     user_id: str,
     github_id: int,
@@ -223,9 +306,7 @@ def upsert_github_account(
 
     # Check if GitHub account exists
     logger.debug("Checking for existing GitHub account...")
-    existing_account = get_github_account_by_github_id(github_id)
-
-    if existing_account:
+    if github_account_exists(github_id):
         # Update existing account
         logger.info(f"Found existing account, updating...")
         return update_github_account(
@@ -258,14 +339,50 @@ def get_decrypted_access_token(github_id: int) -> Optional[str]:
         The decrypted access token or None if not found
     """
     logger.debug(f"Retrieving access token for github_id: {github_id}")
-    account = get_github_account_by_github_id(github_id)
+    account = get_account_token(github_id)
 
-    if account and account.get('access_token'):
+    if account:
         logger.debug(f"Decrypting access token for github_id: {github_id}")
-        token = decrypt_token(account['access_token'])
+        token = decrypt_token(account.access_token)
         logger.info(f"✓ Retrieved and decrypted access token for github_id: {github_id}")
         return token
 
     logger.warning(f"No access token found for github_id: {github_id}")
     return None
 
+
+def get_github_credentials(github_id: int) -> Optional[Tuple[str, str]]:
+    """
+    Get the GitHub login and decrypted access token in a single lookup.
+
+    Args:
+        github_id: The GitHub user ID
+
+    Returns:
+        (github_login, access_token) or None if not found
+    """
+    account = get_account_token(github_id)
+
+    if not account:
+        logger.warning(f"No access token found for github_id: {github_id}")
+        return None
+
+    return account.github_login, decrypt_token(account.access_token)
+
+
+# =============================================================================
+# Async lookups for request handlers
+# =============================================================================
+# These run the blocking Supabase client in the threadpool and coalesce
+# identical concurrent lookups (e.g. several dashboard widgets loading at once).
+
+async def get_account_summary_async(github_id: int) -> Optional[AccountSummary]:
+    """Coalesced, non-blocking get_account_summary."""
+    key = ("supabase", "SELECT", "github_accounts", ACCOUNT_SUMMARY_COLUMNS, github_id)
+    return await single_flight.do(key, lambda: run_in_threadpool(get_account_summary, github_id))
+
+
+async def get_github_credentials_async(github_id: int) -> Optional[Tuple[str, str]]:
+    """Coalesced, non-blocking get_github_credentials."""
+    key = ("supabase", "SELECT", "github_accounts", TOKEN_ONLY_COLUMNS, github_id)
+    return await single_flight.do(key, lambda: run_in_threadpool(get_github_credentials, github_id))
@@ -0,0 +1,328 @@
+"""
+Opt-in traffic capture for performance regression testing.
+
+With CAPTURE_ENABLED=true, a sample of HTTP requests (CAPTURE_SAMPLE_RATE)
+is appended as JSON lines to rotating files under DATA_DIR/captures. Each
+record holds the arrival time, method, path, query, an allowlist of
+headers, the body, the response status and the server-side duration.
+replay.py re-drives these files against the app.
+
+Nothing sensitive is kept:
+- credentials headers (Authorization, Cookie, signatures) are never recorded
+- query and JSON fields named like secrets (token, code, password...) are
+  replaced
+- email addresses become stable placeholders and GitHub/bearer tokens are
+  masked anywhere in the body
+- compressed bodies are decoded first so they can be redacted, and are
+  stored uncompressed
+
+Redaction and file writes happen on a background writer thread; the
+request path only queues the raw request, and drops it if the queue is full.
+"""
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import zstandard
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path
+
+load_dotenv()
+
+CAPTURE_ENABLED = os.getenv('CAPTURE_ENABLED', 'false').lower() == 'true'
+CAPTURE_SAMPLE_RATE = float(os.getenv('CAPTURE_SAMPLE_RATE', '1.0'))
+CAPTURE_DIR = os.getenv('CAPTURE_DIR')
+CAPTURE_MAX_BODY = int(os.getenv('CAPTURE_MAX_BODY', '65536'))
+# Compressed bodies that expand past this are not recorded
+CAPTURE_MAX_DECODED = CAPTURE_MAX_BODY * 8
+CAPTURE_FILE_BYTES = int(os.getenv('CAPTURE_FILE_BYTES', str(16 * 1024 * 1024)))
+CAPTURE_MAX_FILES = int(os.getenv('CAPTURE_MAX_FILES', '20'))
+# Requests waiting for the writer thread; more are dropped, not waited on
+CAPTURE_QUEUE_SIZE = int(os.getenv('CAPTURE_QUEUE_SIZE', '1000'))
+
+# Headers worth replaying; everything else (credentials included) is dropped
+KEPT_HEADERS = {"content-type", "content-encoding", "accept", "accept-encoding", "x-github-event"}
+SKIPPED_PREFIXES = ("/admin",)
+SECRET_KEY_RE = re.compile(r"token|secret|password|passwd|authorization|api[_-]?key|^code$|^state$", re.IGNORECASE)
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+TOKEN_RE = re.compile(r"\b(?:gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,}|Bearer\s+[A-Za-z0-9._~+/=-]{10,})")
+REDACTED = "[redacted]"
+
+
+def _email_placeholder(match: re.Match) -> str:
+    digest = hashlib.sha256(match.group(0).lower().encode()).hexdigest()[:10]
+    return f"user-{digest}@example.com"
+
+
+def redact_text(text: str) -> str:
+    """Mask emails (stably) and GitHub/bearer tokens in free text."""
+    return TOKEN_RE.sub(REDACTED, EMAIL_RE.sub(_email_placeholder, text))
+
+
+def redact_value(value: Any) -> Any:
+    """Recursively redact a decoded JSON value."""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if SECRET_KEY_RE.search(k) and isinstance(v, (str, int)) else redact_value(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact_value(v) for v in value]
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+def redact_query(query: str) -> str:
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(k, REDACTED if SECRET_KEY_RE.search(k) else redact_text(v)) for k, v in pairs])
+
+
+def _decode_body(body: bytes, encoding: Optional[str]) -> Optional[bytes]:
+    """Undo gzip/zstd content encoding (bounded), or None if it can't be decoded."""
+    if not encoding or encoding == "identity":
+        return body
+    limit = CAPTURE_MAX_DECODED
+    try:
+        if encoding == "gzip":
+            decoded = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, limit + 1)
+        elif encoding == "zstd":
+            decoded = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)).read(limit + 1)
+        else:
+            return None
+    except (zlib.error, zstandard.ZstdError):
+        return None
+    return decoded if len(decoded) <= limit else None
+
+
+def redact_body(body: bytes, content_type: str, encoding: Optional[str]) -> Tuple[Optional[str], str]:
+    """
+    Redact a request body for storage.
+
+    Returns:
+        (text or None, note) where note explains omissions
+    """
+    decoded = _decode_body(body, encoding)
+    if decoded is None:
+        return None, f"undecodable {encoding} body"
+    try:
+        text = decoded.decode('utf-8')
+    except UnicodeDecodeError:
+        return None, "binary"
+
+    if "ndjson" in content_type or "jsonl" in content_type:
+        lines = []
+        for line in text.splitlines():
+            try:
+                lines.append(json.dumps(redact_value(json.loads(line))))
+            except ValueError:
+                lines.append(redact_text(line))
+        return "\n".join(lines), ""
+    if "json" in content_type:
+        try:
+            return json.dumps(redact_value(json.loads(text))), ""
+        except ValueError:
+            pass
+    return redact_text(text), ""
+
+
+class CaptureWriter:
+    """
+    Appends records to size-rotated JSONL files, keeping the newest few.
+
+    Records are built and written by a background thread, so submit() never
+    touches the disk.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._queue: "queue.Queue[Optional[Callable[[], Dict[str, Any]]]]" = queue.Queue(CAPTURE_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        name = f"capture-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.time_ns() % 10**6:06d}.jsonl"
+        self._file = open(os.path.join(self.directory, name), 'a')
+
+        files = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith('.jsonl')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files[:max(len(files) - CAPTURE_MAX_FILES, 0)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Append one record (blocking; used by the writer thread)."""
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        if self._file is None or self._file.tell() + len(line) > CAPTURE_FILE_BYTES:
+            self._rotate()
+        self._file.write(line)
+        self._file.flush()
+
+    def _run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            build = self._queue.get()
+            if build is None:
+                break
+            try:
+                self.write(build())
+                metrics.inc("requests_captured")
+            except Exception as e:
+                logger.warning(f"⚠ Could not capture request: {e}")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def submit(self, build: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Queue a record for writing without blocking.
+
+        Args:
+            build: Produces the record on the writer thread
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(build)
+        except queue.Full:
+            metrics.inc("requests_capture_dropped")
+
+    def close(self) -> None:
+        """Write what is queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+
+_writers: Dict[str, CaptureWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_capture_writer(directory: Optional[str] = None) -> CaptureWriter:
+    """Get the writer for a capture directory with lazy initialization."""
+    directory = directory or CAPTURE_DIR or data_path('captures')
+    with _writers_lock:
+        if directory not in _writers:
+            _writers[directory] = CaptureWriter(directory)
+        return _writers[directory]
+
+
+def close_capture_writers() -> None:
+    """Flush and stop every capture writer thread."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+class CaptureMiddleware:
+    """ASGI middleware that records sampled requests for later replay."""
+
+    def __init__(self, app, enabled: bool = CAPTURE_ENABLED, sample_rate: float = CAPTURE_SAMPLE_RATE,
+                 directory: Optional[str] = None):
+        self.app = app
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._directory = directory
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["path"].startswith(SKIPPED_PREFIXES)
+            or random.random() >= self.sample_rate
+        ):
+            return await self.app(scope, receive, send)
+
+        arrived = time.time()
+        started = time.perf_counter()
+        chunks: List[bytes] = []
+        size = 0
+        status = None
+
+        async def capture_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                if size < CAPTURE_MAX_BODY:
+                    chunks.append(body[:CAPTURE_MAX_BODY - size])
+                size += len(body)
+            return message
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            request = {
+                "t": arrived,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b""),
+                "headers": scope.get("headers", ()),
+                "status": status,
+                "duration_ms": duration_ms,
+            }
+            body = b"".join(chunks)
+            get_capture_writer(self._directory).submit(lambda: self._record(request, body, size))
+
+    @staticmethod
+    def _record(request: Dict[str, Any], body: bytes, size: int) -> Dict[str, Any]:
+        """Build the redacted record for a request (runs on the writer thread)."""
+        headers = {}
+        for key, value in request["headers"]:
+            name = key.decode('latin-1').lower()
+            if name in KEPT_HEADERS:
+                headers[name] = value.decode('latin-1')
+
+        record: Dict[str, Any] = {
+            "t": request["t"],
+            "method": request["method"],
+            "path": request["path"],
+            "query": redact_query(request["query_string"].decode('latin-1')),
+            "headers": headers,
+            "status": request["status"],
+            "duration_ms": request["duration_ms"],
+            "body_bytes": size,
+        }
+
+        if size:
+            encoding = headers.pop("content-encoding", None)
+            if size > CAPTURE_MAX_BODY:
+                record["body_note"] = "truncated"
+            else:
+                text, note = redact_body(body, headers.get("content-type", ""), encoding)
+                if text is not None:
+                    record["body"] = text
+                else:
+                    record["body_note"] = note
+
+        return record
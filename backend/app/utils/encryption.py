@@ -1,26 +1,67 @@
 """
 Token encryption utilities using Fernet symmetric encryption.
+
+Keys are loaded once into a MultiFernet keyring. The first key encrypts,
+every key can decrypt, so TOKEN_ENCRYPTION_KEY can be rotated by prepending
+a new key to TOKEN_ENCRYPTION_KEYS and running the re-encryption job in
+app.services.key_rotation.
 """
+import hashlib
+import hmac
 import os
-from cryptography.fernet import Fernet
+from typing import List, Optional
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from dotenv import load_dotenv
 from app.utils.logger import logger
 
 load_dotenv()
 
-# Get encryption key from environment
+# Get encryption keys from environment.
+# TOKEN_ENCRYPTION_KEYS is a comma-separated list, newest key first.
+# TOKEN_ENCRYPTION_KEY is still honoured as a single-key keyring.
+TOKEN_ENCRYPTION_KEYS = os.getenv('TOKEN_ENCRYPTION_KEYS')
 TOKEN_ENCRYPTION_KEY = os.getenv('TOKEN_ENCRYPTION_KEY')
 
 # Validate encryption key is set
-if not TOKEN_ENCRYPTION_KEY:
+if not TOKEN_ENCRYPTION_KEYS and not TOKEN_ENCRYPTION_KEY:
     logger.warning("⚠ TOKEN_ENCRYPTION_KEY environment variable is not set!")
     logger.warning("⚠ Generate one using: python -c \"from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())\"")
 
-def get_fernet() -> Fernet:
-    """Get Fernet instance for encryption/decryption."""
-    if not TOKEN_ENCRYPTION_KEY:
-        raise ValueError("TOKEN_ENCRYPTION_KEY is not configured in environment")
-    return Fernet(TOKEN_ENCRYPTION_KEY.encode())
+# Long-lived keyring, built on first use
+_keyring: Optional[MultiFernet] = None
+_primary: Optional[Fernet] = None
+
+
+def _configured_keys() -> List[str]:
+    """Return the configured keys, newest first."""
+    if TOKEN_ENCRYPTION_KEYS:
+        return [key.strip() for key in TOKEN_ENCRYPTION_KEYS.split(',') if key.strip()]
+    if TOKEN_ENCRYPTION_KEY:
+        return [TOKEN_ENCRYPTION_KEY]
+    return []
+
+
+def get_fernet() -> MultiFernet:
+    """Get the shared MultiFernet keyring for encryption/decryption."""
+    global _keyring, _primary
+
+    if _keyring is None:
+        keys = _configured_keys()
+        if not keys:
+            raise ValueError("TOKEN_ENCRYPTION_KEY is not configured in environment")
+
+        fernets = [Fernet(key.encode()) for key in keys]
+        _primary = fernets[0]
+        _keyring = MultiFernet(fernets)
+        logger.debug(f"✓ Loaded token encryption keyring with {len(fernets)} key(s)")
+
+    return _keyring
+
+
+def get_primary_fernet() -> Fernet:
+    """Get the Fernet instance for the newest key."""
+    get_fernet()
+    return _primary
 
 
 def encrypt_token(token: str) -> str:
@@ -60,3 +101,53 @@ def decrypt_token(encrypted_token: str) -> str:
         logger.error(f"Failed to decrypt token: {e}")
         raise
 
+
+def is_current_key(encrypted_token: str) -> bool:
+    """
+    Check whether a token is already encrypted with the newest key.
+
+    Args:
+        encrypted_token: The encrypted token string
+
+    Returns:
+        True if the newest key can decrypt the token
+    """
+    try:
+        get_primary_fernet().decrypt(encrypted_token.encode())
+        return True
+    except InvalidToken:
+        return False
+
+
+def rotate_token(encrypted_token: str) -> str:
+    """
+    Re-encrypt a token with the newest key.
+
+    Args:
+        encrypted_token: Token encrypted with any key in the keyring
+
+    Returns:
+        The token encrypted with the newest key
+    """
+    try:
+        return get_fernet().rotate(encrypted_token.encode()).decode()
+    except Exception as e:
+        logger.error(f"Failed to rotate token: {e}")
+        raise
+
+
+def derive_keys(purpose: str) -> List[bytes]:
+    """
+    Derive a purpose-specific secret from every configured encryption key.
+
+    Args:
+        purpose: Label separating uses, e.g. "session-token-signing"
+
+    Returns:
+        32-byte keys, newest first, so material made with a key that was
+        rotated out of first place still verifies
+    """
+    keys = _configured_keys()
+    if not keys:
+        raise ValueError("TOKEN_ENCRYPTION_KEY is not configured in environment")
+    return [hmac.new(key.encode(), purpose.encode(), hashlib.sha256).digest() for key in keys]
@@ -0,0 +1,158 @@
+"""
+Fast JSON responses for large listing endpoints.
+
+- extractors: a field spec maps output names to key paths in the source
+  dicts; an extractor for a given field selection is generated once and
+  cached, so per-item work is a single dict literal
+- responses are serialized with orjson and compressed (brotli if
+  available, else gzip) when larger than JSON_COMPRESS_MIN_BYTES and the
+  client accepts it
+"""
+import gzip
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import orjson
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+load_dotenv()
+
+JSON_COMPRESS_MIN_BYTES = int(os.getenv('JSON_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+FieldSpec = Dict[str, Tuple[str, ...]]
+
+
+def _path_expr(path: Tuple[str, ...]) -> str:
+    """Python expression reading a (possibly nested) key path from d, None-safe."""
+    expr = "d"
+    for depth, key in enumerate(path):
+        if depth < len(path) - 1:
+            expr = f"({expr}.get({key!r}) or {{}})"
+        else:
+            expr = f"{expr}.get({key!r})"
+    return expr
+
+
+@lru_cache(maxsize=256)
+def _compile(spec_items: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> Callable[[dict], dict]:
+    body = ", ".join(f"{name!r}: {_path_expr(path)}" for name, path in spec_items)
+    namespace: Dict[str, Any] = {}
+    # Names and paths come from fixed field specs, never from the request
+    exec(f"def extract(d):\n    return {{{body}}}", namespace)
+    return namespace["extract"]
+
+
+def compile_extractor(spec: FieldSpec, fields: Optional[Iterable[str]] = None) -> Callable[[dict], dict]:
+    """
+    Get a cached function mapping a source dict to the selected output fields.
+
+    Args:
+        spec: Output field name -> key path in the source dict
+        fields: Subset of spec keys to extract (all when None), in spec order
+
+    Returns:
+        Callable taking one source dict and returning the projected dict
+    """
+    selected = set(fields) if fields is not None else None
+    return _compile(tuple((name, path) for name, path in spec.items() if selected is None or name in selected))
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a ?fields=a,b,c parameter.
+
+    A missing or blank selection (e.g. "?fields=,") means all fields.
+
+    Raises:
+        HTTPException: 400 if an unknown field is requested
+    """
+    if not fields:
+        return None
+    requested = tuple(f.strip() for f in fields.split(',') if f.strip())
+    if not requested:
+        return None
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def project(items: List[dict], spec: FieldSpec, fields: Optional[Tuple[str, ...]]) -> List[dict]:
+    """Apply a field selection to already-shaped items (no-op without fields)."""
+    if fields is None:
+        return items
+    extract = compile_extractor({name: (name,) for name in spec}, fields)
+    return [extract(item) for item in items]
+
+
+def _encoding_qualities(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into coding -> q-value (malformed q-values are skipped)."""
+    qualities = {}
+    for part in header.lower().split(','):
+        coding, *params = (piece.strip() for piece in part.split(';'))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = -1.0
+        if quality >= 0:
+            qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """
+    Pick the response compression for an Accept-Encoding header.
+
+    Returns:
+        "br", "gzip", or None for an uncompressed body; brotli wins ties
+    """
+    qualities = _encoding_qualities(header)
+    wildcard = qualities.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        quality = qualities.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def json_response(request: Request, data: Any, status_code: int = 200) -> Response:
+    """
+    Serialize data with orjson, compressing large bodies the client accepts.
+
+    Args:
+        request: The incoming request (for Accept-Encoding)
+        data: JSON-serializable content
+        status_code: HTTP status code
+
+    Returns:
+        Response with the encoded body
+    """
+    body = orjson.dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+
+    if len(body) >= JSON_COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding == "br":
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,92 @@
+"""
+Local on-disk storage helpers shared by the SQLite-backed services.
+"""
+import os
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Directory for per-host state (SQLite stores, spools, indexes)
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+
+def data_path(*parts: str) -> str:
+    """
+    Build a path under DATA_DIR, creating parent directories as needed.
+
+    Args:
+        *parts: Path components relative to DATA_DIR
+
+    Returns:
+        The absolute path
+    """
+    path = os.path.abspath(os.path.join(DATA_DIR, *parts))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def open_sqlite(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection configured for concurrent use by several processes.
+
+    WAL lets readers proceed while one writer commits, and busy_timeout makes
+    writers queue on the lock instead of failing immediately.
+
+    Args:
+        path: Database file path
+
+    Returns:
+        sqlite3.Connection in autocommit mode
+    """
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class ThreadLocalSQLite:
+    """
+    One SQLite connection per thread (and per process) for a database file.
+
+    Connections are never shared between threads, so each thread's
+    transactions stay separate; close() closes all of them.
+    """
+
+    def __init__(self, path: str, schema: str = ""):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def conn(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Inherited through fork: drop the parent's handles without closing them
+            self._local = threading.local()
+            self._connections = []
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            if self.schema:
+                conn.executescript(self.schema)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,220 @@
+"""
+Event-loop blocking detector.
+
+A heartbeat task sleeps LOOP_WATCHDOG_INTERVAL_MS at a time on the event
+loop and records how late it wakes up (the loop lag) in the
+event_loop_lag_seconds histogram. A watchdog thread checks the heartbeat.
+When the loop has not come back for LOOP_LAG_THRESHOLD_MS, the thread
+captures the loop thread's stack with sys._current_frames. Because blocking
+code runs inside the coroutine that called it, that stack names the
+offending handler.
+
+Stalls are grouped by their innermost app frame into a top-offenders report
+(GET /admin/loop-lag). Stalls spent mostly in the garbage collector are
+reported as such rather than blamed on whatever frame happened to run.
+Benchmarks can call check_budget() to fail when blocking exceeds a budget.
+"""
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.profiler import APP_DIR, frame_label
+
+load_dotenv()
+
+LOOP_WATCHDOG_ENABLED = os.getenv('LOOP_WATCHDOG_ENABLED', 'true').lower() == 'true'
+LOOP_WATCHDOG_INTERVAL_MS = float(os.getenv('LOOP_WATCHDOG_INTERVAL_MS', '20'))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '100'))
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_STACK_FRAMES = 30
+TOP_OFFENDERS = 20
+UNCAPTURED = "(stack not captured)"
+GARBAGE_COLLECTION = "(garbage collection)"
+
+
+class LoopBlockingBudgetExceeded(AssertionError):
+    """Raised by check_budget when the loop was blocked for longer than allowed."""
+
+
+class LoopWatchdog:
+    """Heartbeat task plus watchdog thread for one event loop."""
+
+    def __init__(self, interval_ms: float = LOOP_WATCHDOG_INTERVAL_MS,
+                 threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._beat: Optional[float] = None
+        self._capture: Optional[tuple] = None  # (beat, site, stack) for the current stall
+        self._gc_started = 0.0
+        self._gc_seconds = 0.0  # Cumulative time spent in the collector
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the offenders report."""
+        with self._lock:
+            self.offenders: Dict[str, Dict[str, Any]] = {}
+            self.stalls = 0
+            self.blocked_total = 0.0
+            self.max_lag = 0.0
+
+    # ------------------------------------------------------------------
+    # Measuring
+    # ------------------------------------------------------------------
+
+    async def _heartbeat(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        while True:
+            beat = time.monotonic()
+            gc_before = self._gc_seconds
+            self._beat = beat
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - beat - self.interval, 0.0)
+            metrics.observe("event_loop_lag_seconds", lag, buckets=LAG_BUCKETS)
+            if lag >= self.threshold:
+                self._record_stall(beat, lag, self._gc_seconds - gc_before)
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        else:
+            self._gc_seconds += time.perf_counter() - self._gc_started
+
+    def _record_stall(self, beat: float, lag: float, gc_seconds: float = 0.0) -> None:
+        with self._lock:
+            capture = self._capture
+            site, stack = (capture[1], capture[2]) if capture and capture[0] == beat else (UNCAPTURED, [])
+            self._capture = None
+            if gc_seconds >= lag / 2:
+                site, stack = GARBAGE_COLLECTION, []
+
+            entry = self.offenders.setdefault(site, {"site": site, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "stack": stack})
+            entry["count"] += 1
+            entry["total_ms"] += lag * 1000
+            entry["max_ms"] = max(entry["max_ms"], lag * 1000)
+            if stack:
+                entry["stack"] = stack
+            self.stalls += 1
+            self.blocked_total += lag
+            self.max_lag = max(self.max_lag, lag)
+
+        metrics.inc("event_loop_stalls")
+        logger.warning(f"⚠ Event loop blocked for {lag * 1000:.0f}ms in {site}")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            beat = self._beat
+            if beat is None or time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            if self._capture is not None and self._capture[0] == beat:
+                continue  # Already captured this stall
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = []
+            site = None
+            while frame is not None and len(stack) < MAX_STACK_FRAMES:
+                label = frame_label(frame)
+                stack.append(label)
+                if site is None and frame.f_code.co_filename.startswith(APP_DIR):
+                    site = label
+                frame = frame.f_back
+            stack.reverse()
+            with self._lock:
+                self._capture = (beat, site or (stack[-1] if stack else UNCAPTURED), stack)
+
+    # ------------------------------------------------------------------
+    # Lifecycle and reporting
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start watching the running event loop."""
+        if self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        gc.callbacks.append(self._on_gc)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.debug(f"✓ Event loop watchdog started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        """Stop the heartbeat task and watchdog thread."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._beat = None
+
+    def report(self, top: int = TOP_OFFENDERS) -> Dict[str, Any]:
+        """
+        Summarize stalls since the last reset.
+
+        Args:
+            top: Number of offenders to include
+
+        Returns:
+            dict: Totals and offenders ordered by total blocked time
+        """
+        with self._lock:
+            offenders = sorted(self.offenders.values(), key=lambda o: o["total_ms"], reverse=True)[:top]
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "stalls": self.stalls,
+                "blocked_ms_total": round(self.blocked_total * 1000, 1),
+                "max_lag_ms": round(self.max_lag * 1000, 1),
+                "offenders": [
+                    {**o, "total_ms": round(o["total_ms"], 1), "max_ms": round(o["max_ms"], 1)}
+                    for o in offenders
+                ]
+            }
+
+    def check_budget(self, max_stall_ms: Optional[float] = None, total_ms: Optional[float] = None) -> None:
+        """
+        Raise if blocking since the last reset exceeded the budget.
+
+        Args:
+            max_stall_ms: Longest allowed single stall
+            total_ms: Allowed blocked time summed over all stalls
+
+        Raises:
+            LoopBlockingBudgetExceeded: With the top offenders in the message
+        """
+        report = self.report(top=5)
+        problems = []
+        if max_stall_ms is not None and report["max_lag_ms"] > max_stall_ms:
+            problems.append(f"longest stall {report['max_lag_ms']}ms > {max_stall_ms}ms")
+        if total_ms is not None and report["blocked_ms_total"] > total_ms:
+            problems.append(f"total blocked {report['blocked_ms_total']}ms > {total_ms}ms")
+        if problems:
+            offenders = "; ".join(f"{o['site']} ({o['count']}x, {o['total_ms']}ms)" for o in report["offenders"])
+            raise LoopBlockingBudgetExceeded(f"{', '.join(problems)}. Top offenders: {offenders}")
+
+
+_watchdog: Optional[LoopWatchdog] = None
+
+
+def get_loop_watchdog() -> LoopWatchdog:
+    """Get the process-wide watchdog with lazy initialization."""
+    global _watchdog
+
+    if _watchdog is None:
+        _watchdog = LoopWatchdog()
+
+    return _watchdog
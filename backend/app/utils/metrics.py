@@ -0,0 +1,95 @@
+"""
+Minimal in-process metrics registry.
+
+Counters, gauges and summaries (count/sum/max, optional histogram buckets)
+keyed by name and labels. Values are per worker process; GET /metrics
+reports them with the worker pid.
+"""
+import bisect
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, str]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Summary:
+    __slots__ = ('count', 'total', 'max', 'bounds', 'buckets')
+
+    def __init__(self, bounds: Optional[Sequence[float]]):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bounds = list(bounds) if bounds else None
+        self.buckets = [0] * (len(self.bounds) + 1) if self.bounds else None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if self.bounds is not None:
+            self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and summaries."""
+
+    def __init__(self):
+        self._counters: Dict[LabelKey, float] = {}
+        self._gauges: Dict[LabelKey, float] = {}
+        self._summaries: Dict[LabelKey, _Summary] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels) -> None:
+        """Record a sample; buckets (upper bounds) are fixed by the first observation."""
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary(buckets)
+            summary.observe(value)
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        """Return all metrics as JSON-serializable lists."""
+        with self._lock:
+            summaries = []
+            for (name, labels), s in self._summaries.items():
+                entry = {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": s.count,
+                    "sum": s.total,
+                    "avg": s.total / s.count if s.count else 0,
+                    "max": s.max
+                }
+                if s.bounds is not None:
+                    entry["buckets"] = {
+                        **{f"le_{bound:g}": n for bound, n in zip(s.bounds, s.buckets)},
+                        "inf": s.buckets[-1]
+                    }
+                summaries.append(entry)
+            return {
+                "pid": os.getpid(),
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()],
+                "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._gauges.items()],
+                "summaries": summaries
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,164 @@
+"""
+Incremental decoding of (optionally compressed) NDJSON request bodies.
+
+Chunks are decompressed and split into lines as they arrive, so memory use
+is bounded by the chunk and line size rather than the body size. Each
+decompressor hands back output in pieces of at most about
+MAX_DECOMPRESSED_CHUNK bytes, and the line limit is checked after every
+piece, so a highly compressed body fails before its output accumulates.
+"""
+import zlib
+from typing import AsyncIterator, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd bodies are rejected when the package is missing
+    zstandard = None
+
+# Upper bound on decompressed bytes produced by one decompress step
+MAX_DECOMPRESSED_CHUNK = 1024 * 1024
+
+# zstd emits whole blocks of up to 128 KiB, and a block takes at least 4
+# compressed bytes (RLE), so feeding this many bytes per step keeps one
+# step's output under MAX_DECOMPRESSED_CHUNK
+ZSTD_BLOCK_SIZE = 128 * 1024
+ZSTD_FEED_BYTES = 4 * max(1, MAX_DECOMPRESSED_CHUNK // ZSTD_BLOCK_SIZE - 1)
+# Largest zstd window accepted (the level 1-19 defaults stay within 8 MiB)
+ZSTD_MAX_WINDOW = 8 * 1024 * 1024
+
+
+class UnsupportedEncodingError(ValueError):
+    """Raised for a Content-Encoding the server cannot decode."""
+
+
+class BodyDecodeError(ValueError):
+    """Raised when the body is corrupt or cannot be split into lines."""
+
+
+class LineTooLongError(BodyDecodeError):
+    """Raised when a single NDJSON line exceeds the configured limit."""
+
+
+# Errors raised by the decompressors on corrupt input
+_DECOMPRESS_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class _Identity:
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        if data:
+            yield data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Gzip:
+    def __init__(self):
+        # 16 + MAX_WBITS accepts the gzip header and trailer
+        self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if self._inflater.eof:
+                # Concatenated gzip members are one valid stream
+                self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            piece = self._inflater.decompress(data, MAX_DECOMPRESSED_CHUNK)
+            if piece:
+                yield piece
+            # Input held back by max_length is fed on the next step
+            data = self._inflater.unconsumed_tail or self._inflater.unused_data
+
+    def flush(self) -> bytes:
+        return self._inflater.flush()
+
+
+class _Zstd:
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW)
+        self._inflater = self._decompressor.decompressobj()
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        # decompressobj has no output limit, so bound each step's input instead
+        view = memoryview(data)
+        position = 0
+        while position < len(view):
+            if self._inflater.eof:
+                # Each zstd frame needs a fresh decompression object
+                self._inflater = self._decompressor.decompressobj()
+            step = view[position:position + ZSTD_FEED_BYTES]
+            position += len(step)
+            piece = self._inflater.decompress(step)
+            if piece:
+                yield piece
+            if self._inflater.eof:
+                # Bytes past the end of the frame start the next one
+                position -= len(self._inflater.unused_data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def get_decompressor(content_encoding: Optional[str]):
+    """
+    Pick a streaming decompressor for a Content-Encoding header value.
+
+    Raises:
+        UnsupportedEncodingError: For unknown encodings, or zstd without zstandard
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Identity()
+    if encoding in ("gzip", "x-gzip"):
+        return _Gzip()
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedEncodingError("zstd is not supported on this server")
+        return _Zstd()
+    raise UnsupportedEncodingError(f"Unsupported Content-Encoding: {encoding}")
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    content_encoding: Optional[str],
+    max_line_bytes: int
+) -> AsyncIterator[bytes]:
+    """
+    Yield non-empty lines from a streamed, possibly compressed body.
+
+    Args:
+        chunks: Raw body chunks, e.g. request.stream()
+        content_encoding: The request's Content-Encoding header
+        max_line_bytes: Longest accepted line
+
+    Raises:
+        UnsupportedEncodingError: If the encoding cannot be decoded
+        BodyDecodeError: If the body is corrupt or a line exceeds max_line_bytes
+    """
+    decompressor = get_decompressor(content_encoding)
+    buffer = b""
+
+    async for chunk in chunks:
+        pieces = decompressor.decompress(chunk)
+        while True:
+            try:
+                piece = next(pieces, None)
+            except _DECOMPRESS_ERRORS as e:
+                raise BodyDecodeError(f"Corrupt compressed body: {e}")
+            if piece is None:
+                break
+            *lines, buffer = (buffer + piece).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+            if len(buffer) > max_line_bytes:
+                raise LineTooLongError(f"NDJSON line exceeds {max_line_bytes} bytes")
+
+    try:
+        buffer += decompressor.flush()
+    except _DECOMPRESS_ERRORS as e:
+        raise BodyDecodeError(f"Corrupt compressed body: {e}")
+    for line in buffer.split(b"\n"):
+        if len(line) > max_line_bytes:
+            raise LineTooLongError(f"NDJSON line exceeds {max_line_bytes} bytes")
+        if line.strip():
+            yield line
@@ -0,0 +1,202 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A request is profiled when it is picked by PROFILE_SAMPLE_RATE or carries
+`X-Profile: <ADMIN_TOKEN>`. While it runs, a sampler thread snapshots
+thread stacks every PROFILE_INTERVAL_MS with sys._current_frames and the
+counts are written as a collapsed-stack file (one "a;b;c <count>" line per
+stack), which speedscope and flamegraph.pl open directly.
+
+Sampled threads are the event loop thread plus any thread currently
+executing app code, so sync handlers in the threadpool are covered and
+idle workers are not. Samples are wall-clock: time blocked in I/O shows up
+as socket/ssl frames. Only one request per process is profiled at a time.
+
+Files are kept in a ring of PROFILE_MAX_FILES under DATA_DIR/profiles.
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.local_storage import data_path
+from app.security.admin import is_admin_token
+
+load_dotenv()
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_DIR = os.getenv('PROFILE_DIR')
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.collapsed$")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile_dir() -> str:
+    """Directory holding the profile ring."""
+    directory = PROFILE_DIR or data_path('profiles')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def frame_label(frame) -> str:
+    """Short "function (file:line)" label for a stack frame."""
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = 'app' + filename[len(APP_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class Sampler:
+    """Background thread that counts collapsed stacks until stopped."""
+
+    def __init__(self, loop_thread_id: int, interval: float):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+
+                labels = []
+                in_app = thread_id == self.loop_thread_id
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    in_app = in_app or frame.f_code.co_filename.startswith(APP_DIR)
+                    frame = frame.f_back
+                if not in_app:
+                    continue
+
+                if thread_id not in names:
+                    names[thread_id] = next(
+                        (t.name for t in threading.enumerate() if t.ident == thread_id), str(thread_id)
+                    ).replace(';', ':')
+                labels.append(f"thread {names[thread_id]}")
+                labels.reverse()
+                self.stacks[";".join(labels)] += 1
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _trim_ring(directory: str) -> None:
+    files = sorted(
+        (entry for entry in os.scandir(directory) if PROFILE_NAME_RE.match(entry.name)),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in files[:max(len(files) - PROFILE_MAX_FILES, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles() -> List[Dict]:
+    """
+    List stored profiles, newest first.
+
+    Returns:
+        list: name, size and creation time of each profile
+    """
+    directory = profile_dir()
+    entries = [entry for entry in os.scandir(directory) if PROFILE_NAME_RE.match(entry.name)]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [
+        {"name": entry.name, "bytes": entry.stat().st_size, "created_at": entry.stat().st_mtime}
+        for entry in entries
+    ]
+
+
+def profile_path(name: str) -> Optional[str]:
+    """
+    Resolve a profile name to its file, rejecting anything outside the ring.
+
+    Args:
+        name: File name from list_profiles
+
+    Returns:
+        The path, or None if the name is invalid or missing
+    """
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles sampled or explicitly requested HTTP requests."""
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+
+    def _wants_profile(self, scope) -> bool:
+        for key, value in scope.get("headers", ()):
+            if key == PROFILE_HEADER:
+                return is_admin_token(value.decode('latin-1'))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            return await self.app(scope, receive, send)
+        if not self._busy.acquire(blocking=False):
+            metrics.inc("profiles_skipped_busy")
+            return await self.app(scope, receive, send)
+
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_")[:60] or "root"
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}.{int(now * 1000) % 1000:03d}"
+        name = f"{stamp}-{os.getpid()}-{scope['method']}-{slug}.collapsed"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        sampler = Sampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            try:
+                directory = profile_dir()
+                sampler.write(os.path.join(directory, name))
+                _trim_ring(directory)
+                metrics.inc("profiles_captured")
+                logger.info(f"✓ Profiled {scope['method']} {scope['path']}: {elapsed_ms:.0f}ms, {sampler.samples} samples")
+            except OSError as e:
+                logger.warning(f"⚠ Could not write profile: {e}")
@@ -0,0 +1,206 @@
+"""
+Cross-worker shared state backed by a local SQLite database in WAL mode.
+
+Every worker process opens its own connections, so module-level caches that
+must agree across workers (rate-limit budgets, dedup keys, cache entries)
+go through here instead of living in process memory.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+from dotenv import load_dotenv
+from app.utils.logger import logger
+from app.utils.local_storage import data_path, open_sqlite
+
+load_dotenv()
+
+SHARED_STATE_PATH = os.getenv('SHARED_STATE_PATH')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires_at ON kv(expires_at);
+CREATE TABLE IF NOT EXISTS kv_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+);
+CREATE INDEX IF NOT EXISTS idx_kv_tags_key ON kv_tags(key);
+"""
+
+
+class SharedStore:
+    """Key/value store with TTLs that is safe to use from several processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _conn(self):
+        """Get this thread's connection, opening one if needed (never reused across fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._pid != os.getpid():
+            if self._pid != os.getpid():
+                # Inherited through fork: drop the parent's handles without closing them
+                self._local = threading.local()
+                self._connections = []
+                self._pid = os.getpid()
+            conn = open_sqlite(self.path)
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator:
+        """Hold the write lock for an atomic read-modify-write."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value for key, or None if missing or expired."""
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row['value'] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        """
+        Store value under key, optionally expiring after ttl seconds.
+
+        Tags let callers drop every key related to something at once with
+        invalidate_tag (e.g. all cache entries mentioning one repository).
+        """
+        expires_at = time.time() + ttl if ttl else None
+        tags = list(tags)
+        if not tags:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            return
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            conn.execute("DELETE FROM kv_tags WHERE key = ?", (key,))
+            conn.executemany("INSERT OR IGNORE INTO kv_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+
+    def add(self, key: str, value: str = '1', ttl: Optional[float] = None) -> bool:
+        """
+        Store value only if key is absent or expired.
+
+        Returns:
+            True if this call claimed the key (use for cross-worker dedup)
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add amount to an integer counter and return the new value."""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            value = (int(row['value']) if row else 0) + amount
+            expires_at = now + ttl if ttl and not row else None
+            if row:
+                conn.execute("UPDATE kv SET value = ? WHERE key = ?", (str(value), key))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, str(value), expires_at)
+                )
+            return value
+
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            conn.execute("DELETE FROM kv_tags WHERE key = ?", (key,))
+
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        Remove every key stored with tag.
+
+        Returns:
+            Number of keys removed
+        """
+        with self.transaction() as conn:
+            keys = [row['key'] for row in conn.execute("SELECT key FROM kv_tags WHERE tag = ?", (tag,))]
+            if not keys:
+                return 0
+            placeholders = ','.join('?' * len(keys))
+            conn.execute(f"DELETE FROM kv WHERE key IN ({placeholders})", keys)
+            conn.execute(f"DELETE FROM kv_tags WHERE key IN ({placeholders})", keys)
+            return len(keys)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows and return how many were removed."""
+        with self.transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            conn.execute("DELETE FROM kv_tags WHERE key NOT IN (SELECT key FROM kv)")
+            return removed
+
+    def close(self) -> None:
+        """Close every connection this process opened."""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
+
+shared_store: Optional[SharedStore] = None
+
+
+def get_shared_store() -> SharedStore:
+    """Get the process-wide SharedStore instance with lazy initialization."""
+    global shared_store
+
+    if shared_store is None:
+        path = SHARED_STATE_PATH or data_path('shared_state.db')
+        shared_store = SharedStore(path)
+        logger.debug(f"Shared state store at: {path}")
+
+    return shared_store
+
+
+def close_shared_store() -> None:
+    """Close the shared store connections for this process."""
+    global shared_store
+
+    if shared_store is not None:
+        shared_store.close()
+        shared_store = None
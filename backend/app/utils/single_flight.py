@@ -0,0 +1,50 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one in-flight execution: the
+first caller starts it, later callers await the same result or exception.
+The shared work runs in its own task, so a cancelled caller does not
+cancel it for the others. Results are shared objects; callers must not
+mutate them.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+from app.utils.metrics import metrics
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Coalesces identical concurrent async calls within one event loop."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Tuple[Any, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: (dependency, method, target, params, credential owner, ...)
+            fn: Zero-argument coroutine function doing the actual call
+
+        Returns:
+            fn's result, shared with any coalesced callers
+        """
+        dependency = str(key[0])
+        task = self._inflight.get(key)
+
+        if task is None:
+            metrics.inc("singleflight_calls", dependency=dependency)
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # Retrieve the exception so an error nobody awaits is not logged as unhandled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        else:
+            metrics.inc("singleflight_coalesced", dependency=dependency)
+
+        return await asyncio.shield(task)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,50 @@
+"""
+Microbenchmark for token encryption throughput.
+
+Compares the cached MultiFernet keyring against building a new Fernet per
+call (the previous behaviour).
+
+Run from backend/:
+    python -m benchmarks.bench_encryption [--iterations 20000]
+"""
+import argparse
+import os
+import time
+from cryptography.fernet import Fernet
+
+# Configure a two-key keyring before importing the module under test
+os.environ.setdefault('TOKEN_ENCRYPTION_KEYS', f"{Fernet.generate_key().decode()},{Fernet.generate_key().decode()}")
+
+from app.utils import encryption  # noqa: E402
+
+TOKEN = "gho_" + "x" * 36
+
+
+def bench(label: str, fn, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {iterations / elapsed:>12,.0f} ops/s  {elapsed / iterations * 1e6:>8.2f} µs/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    primary_key = encryption._configured_keys()[0].encode()
+    encrypted = encryption.encrypt_token(TOKEN)
+    old_key_token = Fernet(encryption._configured_keys()[1].encode()).encrypt(TOKEN.encode()).decode()
+
+    bench("encrypt (cached keyring)", lambda: encryption.encrypt_token(TOKEN), n)
+    bench("encrypt (new Fernet per call)", lambda: Fernet(primary_key).encrypt(TOKEN.encode()), n)
+    bench("decrypt (cached keyring)", lambda: encryption.decrypt_token(encrypted), n)
+    bench("decrypt (new Fernet per call)", lambda: Fernet(primary_key).decrypt(encrypted.encode()), n)
+    bench("decrypt (old key in keyring)", lambda: encryption.decrypt_token(old_key_token), n)
+    bench("rotate", lambda: encryption.rotate_token(old_key_token), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for the repo listing response path with 1,000 repositories.
+
+Compares the previous path (dict comprehension of .get() chains, then
+FastAPI's jsonable_encoder + json.dumps) with the precompiled extractor +
+orjson path, with and without ?fields=, and reports bytes on the wire.
+
+Run from backend/:
+    python -m benchmarks.bench_json [--repos 1000] [--rounds 50]
+"""
+import argparse
+import gzip
+import json
+import time
+import orjson
+from fastapi.encoders import jsonable_encoder
+from app.controller.githubLogin import REPO_FIELDS
+from app.utils.fast_json import compile_extractor, project
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def make_repos(count: int) -> list:
+    # Roughly the shape and size of GitHub's /user/repos objects
+    return [
+        {
+            "id": 100000 + i,
+            "node_id": f"R_kgDO{i:08d}",
+            "name": f"project-{i}",
+            "full_name": f"octocat/project-{i}",
+            "private": i % 3 == 0,
+            "owner": {"login": "octocat", "id": 1, "type": "User", "site_admin": False},
+            "html_url": f"https://github.com/octocat/project-{i}",
+            "description": f"Project number {i} with a reasonably descriptive summary line",
+            "fork": False,
+            "url": f"https://api.github.com/repos/octocat/project-{i}",
+            "clone_url": f"https://github.com/octocat/project-{i}.git",
+            "language": ("Python", "TypeScript", "Go", None)[i % 4],
+            "stargazers_count": i * 7 % 500,
+            "watchers_count": i * 7 % 500,
+            "forks_count": i % 13,
+            "topics": ["web", "api", "demo"],
+            "updated_at": "2026-01-%02dT12:00:00Z" % (i % 28 + 1),
+            "pushed_at": "2026-01-%02dT12:00:00Z" % (i % 28 + 1),
+            "permissions": {"admin": True, "push": True, "pull": True},
+        }
+        for i in range(count)
+    ]
+
+
+def legacy(repos: list) -> bytes:
+    simplified = [
+        {
+            "id": repo.get('id'),
+            "name": repo.get('name'),
+            "full_name": repo.get('full_name'),
+            "description": repo.get('description'),
+            "html_url": repo.get('html_url'),
+            "clone_url": repo.get('clone_url'),
+            "private": repo.get('private'),
+            "language": repo.get('language'),
+            "stargazers_count": repo.get('stargazers_count'),
+            "updated_at": repo.get('updated_at')
+        }
+        for repo in repos
+    ]
+    return json.dumps(jsonable_encoder(simplified), separators=(",", ":")).encode()
+
+
+def fast(repos: list) -> bytes:
+    extract = compile_extractor(REPO_FIELDS)
+    return orjson.dumps([extract(r) for r in repos])
+
+
+def cached(simplified: list, fields=None) -> bytes:
+    # Cache hit: listing is already simplified, only projection + encoding remain
+    return orjson.dumps(project(simplified, REPO_FIELDS, fields))
+
+
+def bench(label: str, fn, rounds: int) -> bytes:
+    body = fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    per_call = (time.perf_counter() - start) / rounds * 1000
+    sizes = f"raw {len(body):>7,} B  gzip {len(gzip.compress(body, 5)):>6,} B"
+    if brotli is not None:
+        sizes += f"  br {len(brotli.compress(body, quality=4)):>6,} B"
+    print(f"{label:<34} {per_call:>8.2f} ms   {sizes}")
+    return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    repos = make_repos(args.repos)
+
+    print(f"{args.repos} repos, {args.rounds} rounds")
+    bench("legacy (.get + jsonable_encoder)", lambda: legacy(repos), args.rounds)
+    bench("extractor + orjson", lambda: fast(repos), args.rounds)
+    simplified = orjson.loads(fast(repos))
+    bench("cached listing + orjson", lambda: cached(simplified), args.rounds)
+    bench("cached listing ?fields=3", lambda: cached(simplified, ("id", "full_name", "updated_at")), args.rounds)
+
+
+if __name__ == "__main__":
+    main()
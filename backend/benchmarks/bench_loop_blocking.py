@@ -0,0 +1,92 @@
+"""
+Event-loop blocking budget check for the async GitHub routes.
+
+Drives the real routes in-process through httpx's ASGI transport with
+Supabase, MongoDB and GitHub replaced by the fakes in benchmarks/stubs.py,
+which take --backend-ms per call the way a real network would. The loop watchdog records every stall; the
+script prints the top offenders and exits non-zero if the budget is
+exceeded, so it can gate a benchmark run.
+
+Run from backend/:
+    python -m benchmarks.bench_loop_blocking [--rounds 20] [--concurrency 8]
+        [--backend-ms 30] [--max-stall-ms 50] [--total-ms 250]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench-loop-"))
+os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "kT7aVXpjk0hGm3Aqz8cG6uPzv1oK3aB1l2oQmZQ3p1c=")
+os.environ.setdefault("LOOP_WATCHDOG_ENABLED", "false")  # Started explicitly below
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
+import httpx  # noqa: E402
+from app import app  # noqa: E402
+from app.utils.loop_watchdog import LoopWatchdog, LoopBlockingBudgetExceeded  # noqa: E402
+from benchmarks.stubs import install_stubs  # noqa: E402
+
+
+async def run(args) -> int:
+    stubs = install_stubs(latency_ms=args.backend_ms)
+
+    paths = [
+        "/auth/github/user/1",
+        "/auth/github/user/1/repos?refresh=true",
+        "/auth/github/user/1/repo/repo1/commits?refresh=true",
+        "/auth/github/callback?code=bench",
+    ]
+
+    watchdog = LoopWatchdog(interval_ms=args.interval_ms, threshold_ms=args.threshold_ms)
+    statuses = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # One unmeasured round so lazy imports and client setup are not counted
+        await asyncio.gather(*[client.get(path, follow_redirects=False) for path in paths])
+        if not args.no_gc_freeze:
+            gc.collect()
+            gc.freeze()  # As the app lifespan does with GC_FREEZE_ON_STARTUP
+
+        watchdog.start()
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            responses = await asyncio.gather(*[
+                client.get(paths[i % len(paths)], follow_redirects=False) for i in range(args.concurrency)
+            ])
+            for response in responses:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+    await watchdog.stop()
+    await stubs.close()
+
+    report = watchdog.report(top=args.top)
+    print(f"{args.rounds * args.concurrency} requests in {elapsed:.2f}s, statuses {statuses}")
+    print(f"stalls >= {args.threshold_ms:.0f}ms: {report['stalls']}, "
+          f"total blocked {report['blocked_ms_total']}ms, longest {report['max_lag_ms']}ms")
+    for offender in report["offenders"]:
+        print(f"  {offender['total_ms']:8.1f}ms  {offender['count']:4}x  max {offender['max_ms']:6.1f}ms  {offender['site']}")
+
+    try:
+        watchdog.check_budget(max_stall_ms=args.max_stall_ms, total_ms=args.total_ms)
+    except LoopBlockingBudgetExceeded as e:
+        print(f"FAIL: {e}")
+        return 1
+    print("OK: event-loop blocking within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if async routes block the event loop")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend-ms", type=float, default=30)
+    parser.add_argument("--interval-ms", type=float, default=5)
+    parser.add_argument("--threshold-ms", type=float, default=20)
+    parser.add_argument("--max-stall-ms", type=float, default=50)
+    parser.add_argument("--total-ms", type=float, default=250)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-gc-freeze", action="store_true")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,87 @@
+"""
+Query latency benchmark for the feedback vector index.
+
+Builds throwaway indexes of synthetic sparse rows (about as many non-zero
+buckets as a 30-word message) and times single and batched top-k queries
+against the memory-mapped matrix.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_search [--sizes 100000,1000000] [--k 10] [--batch 32]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.services.feedback_index import FEEDBACK_INDEX_DIM, RepoIndex, embed
+
+QUERIES = [
+    "login button does nothing on mobile safari",
+    "page crashes when uploading a large image",
+    "dark mode text is hard to read",
+    "please add export to csv",
+]
+BUILD_CHUNK = 100_000
+
+
+def build(directory: str, rows: int, dim: int, seed: int = 7) -> RepoIndex:
+    rng = np.random.default_rng(seed)
+    index = RepoIndex(directory, "bench", dim)
+    for start in range(0, rows, BUILD_CHUNK):
+        n = min(BUILD_CHUNK, rows - start)
+        vectors = np.zeros((n, dim), dtype=np.float32)
+        cols = rng.integers(0, dim, size=(n, 50))
+        np.put_along_axis(vectors, cols, rng.choice([-1.0, 1.0], size=(n, 50)).astype(np.float32), axis=1)
+        ids = [int(start + i).to_bytes(12, "big") for i in range(n)]
+        index.add_vectors(ids, vectors, (vectors != 0).sum(axis=0))
+    return index
+
+
+def percentile(samples, pct: float) -> float:
+    return float(np.percentile(samples, pct)) * 1000
+
+
+def bench(rows: int, k: int, batch: int, repeats: int) -> None:
+    dim = FEEDBACK_INDEX_DIM
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        index = build(directory, rows, dim)
+        print(f"{rows:>9,} rows x {dim} dims: built in {time.perf_counter() - started:.1f}s "
+              f"({rows * dim * 4 / 2**20:,.0f} MiB)")
+
+        queries = index.query_vectors(QUERIES)
+        index.search_vectors(queries[:1], k)  # warm the page cache
+
+        single = []
+        for i in range(repeats):
+            started = time.perf_counter()
+            index.search_vectors(queries[i % len(QUERIES)][None, :], k)
+            single.append(time.perf_counter() - started)
+
+        batched = np.resize(queries, (batch, dim))
+        batch_times = []
+        for _ in range(max(repeats // 4, 3)):
+            started = time.perf_counter()
+            index.search_vectors(batched, k)
+            batch_times.append(time.perf_counter() - started)
+
+        embed_started = time.perf_counter()
+        for text in QUERIES * 250:
+            embed(text, dim)
+        embed_us = (time.perf_counter() - embed_started) / (len(QUERIES) * 250) * 1e6
+
+        print(f"  single query  p50 {percentile(single, 50):8.2f} ms   p95 {percentile(single, 95):8.2f} ms")
+        print(f"  batch of {batch:<4} p50 {percentile(batch_times, 50):8.2f} ms   "
+              f"({percentile(batch_times, 50) / batch:.2f} ms/query)")
+        print(f"  query embedding {embed_us:.0f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark feedback vector search")
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=40)
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        bench(int(size), args.k, args.batch, args.repeats)
@@ -0,0 +1,233 @@
+"""
+In-process stand-ins for the app's external services.
+
+Used by the benchmarks and replay.py to drive the real routes without
+network access. Every fake takes a fixed latency per call, so runs are
+deterministic and comparable between builds.
+
+    stubs = install_stubs(latency_ms=20)
+    ...
+    await stubs.close()
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import httpx
+from bson import ObjectId
+from app.controller import githubLogin
+from app.services import db, github_api, supabase_db
+from app.utils.encryption import encrypt_token
+
+
+class FakeSupabaseQuery:
+    """Chainable stand-in for a postgrest query that sleeps like a round trip."""
+
+    def __init__(self, rows, latency: float):
+        self.rows = rows
+        self.latency = latency
+        self.columns = None
+
+    def select(self, columns="*"):
+        self.columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def __getattr__(self, name):
+        # eq, limit, order, gt, insert, update, upsert ... all just chain
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.latency)
+        rows = [{k: row[k] for k in self.columns} if self.columns else row for row in self.rows]
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    """One user with one linked GitHub account."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        token = encrypt_token("gho_benchmark")
+        self.tables = {
+            "github_accounts": [{
+                "id": 1, "user_id": "u1", "github_id": 1, "github_login": "octo", "scope": "repo",
+                "access_token": token, "created_at": "2025-01-01", "updated_at": "2025-01-01"
+            }],
+            "users": [{"id": "u1", "email": "octo@example.com", "created_at": "2025-01-01"}],
+        }
+
+    def table(self, name):
+        return FakeSupabaseQuery(self.tables[name], self.latency)
+
+
+def _matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$exists" and (key in doc) != operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda d: d.get(key), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """The subset of pymongo.Collection the app uses, in memory."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.docs: Dict[Any, Dict[str, Any]] = {}
+
+    def _project(self, doc, projection):
+        if not projection:
+            return dict(doc)
+        return {k: v for k, v in doc.items() if k == "_id" or projection.get(k)}
+
+    def insert_one(self, doc):
+        time.sleep(self.latency)
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs, ordered=True):
+        time.sleep(self.latency)
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self.docs[doc["_id"]] = doc
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    def find(self, query=None, projection=None):
+        time.sleep(self.latency)
+        return FakeCursor([self._project(d, projection) for d in self.docs.values() if _matches(d, query or {})])
+
+    def find_one(self, query=None, projection=None):
+        return next(iter(self.find(query, projection)), None)
+
+    def update_one(self, query, update, upsert=False):
+        time.sleep(self.latency)
+        doc = next((d for d in self.docs.values() if _matches(d, query)), None)
+        upserted_id = None
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            doc = dict(query)
+            doc.update(update.get("$setOnInsert", {}))
+            self.docs[doc["_id"]] = doc
+            upserted_id = doc["_id"]
+        doc.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id)
+
+    def find_one_and_update(self, query, update, projection=None):
+        before = self.find_one(query, projection)
+        if before is not None:
+            self.update_one(query, update)
+        return before
+
+    def count_documents(self, query):
+        return sum(1 for d in self.docs.values() if _matches(d, query))
+
+    def distinct(self, key):
+        return sorted({d[key] for d in self.docs.values() if key in d})
+
+
+def github_handler(latency: float):
+    """MockTransport handler serving a fixed account's repos and commits."""
+    repos = [{"id": i, "name": f"repo{i}", "full_name": f"octo/repo{i}", "private": False,
+              "html_url": "", "description": None, "language": "Python", "updated_at": "2025-01-01T00:00:00Z",
+              "default_branch": "main", "stargazers_count": 0} for i in range(30)]
+    commits = [{"sha": f"{i:040x}", "html_url": "", "commit": {
+        "message": f"commit {i}", "author": {"name": "octo", "date": f"2025-01-{1 + i % 28:02d}T00:00:00Z"}}}
+        for i in range(30)]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        if request.url.path == "/user/repos":
+            return httpx.Response(200, json=repos)
+        if request.url.path.endswith("/commits"):
+            return httpx.Response(200, json=commits if request.url.params.get("page") == "1" else [])
+        if request.url.path == "/graphql":
+            return httpx.Response(200, json={"data": {"viewer": {
+                "login": "octo", "repositories": {"nodes": [], "pageInfo": {"hasNextPage": False}}}}})
+        return httpx.Response(404, json={})
+
+    return handler
+
+
+class Stubs:
+    """Handle for installed stubs."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.supabase = FakeSupabase(latency)
+        self.feedbacks = FakeCollection(latency)
+        self.ai_analyses = FakeCollection(latency)
+        self.verdicts = FakeCollection(latency)
+
+    async def close(self) -> None:
+        await github_api.close_github_client()
+
+
+def install_stubs(latency_ms: float = 20, github_latency_ms: Optional[float] = None) -> Stubs:
+    """
+    Point Supabase, MongoDB, the GitHub API and the OAuth exchange at fakes.
+
+    Args:
+        latency_ms: Per-call latency of the fakes
+        github_latency_ms: Separate latency for GitHub, defaults to latency_ms
+
+    Returns:
+        The installed stubs
+    """
+    latency = latency_ms / 1000
+    github_latency = latency if github_latency_ms is None else github_latency_ms / 1000
+    stubs = Stubs(latency)
+
+    supabase_db.supabase = stubs.supabase
+    db.client = SimpleNamespace(close=lambda: None)
+    db.db = SimpleNamespace(feedbacks=stubs.feedbacks, ai_analyses=stubs.ai_analyses, feedback_verdicts=stubs.verdicts)
+    db.feedback_collection = stubs.feedbacks
+    db.ai_analysis_collection = stubs.ai_analyses
+    db.verdict_collection = stubs.verdicts
+    github_api._client = httpx.AsyncClient(
+        base_url=github_api.GITHUB_API_URL, transport=httpx.MockTransport(github_handler(github_latency))
+    )
+
+    async def fake_exchange(code):
+        await asyncio.sleep(github_latency)
+        return {"access_token": "gho_benchmark", "scope": "repo", "token_type": "bearer"}
+
+    async def fake_user(token):
+        await asyncio.sleep(github_latency)
+        return {"id": 1, "login": "octo", "email": "octo@example.com", "name": "Octo"}
+
+    githubLogin.exchange_code_for_token = fake_exchange
+    githubLogin.fetch_github_user = fake_user
+    githubLogin.GITHUB_CLIENT_ID = githubLogin.GITHUB_CLIENT_ID or "bench"
+    githubLogin.GITHUB_CLIENT_SECRET = githubLogin.GITHUB_CLIENT_SECRET or "bench"
+    return stubs
@@ -0,0 +1,215 @@
+"""
+Replay captured traffic against the app for performance regression testing.
+
+    python replay.py run CAPTURE.jsonl [...] [--speed 1] [--concurrency 32]
+        [--backend-ms 20] [--out results.json]
+    python replay.py compare baseline.json candidate.json [--threshold 10]
+
+`run` drives the app in-process through httpx's ASGI transport with
+Supabase, MongoDB and GitHub replaced by the fixed-latency fakes from
+benchmarks/stubs.py, so two builds replaying the same capture see the same
+backends. Requests keep their recorded spacing divided by --speed
+(0 replays as fast as --concurrency allows). Rate limits are switched off
+and webhook deliveries are re-signed with a replay secret, since captures
+hold neither credentials nor signatures.
+
+Results are per-route latency percentiles, with ids in paths collapsed to
+{id}. `compare` prints the p50/p99 change per route and exits non-zero if
+any route's p99 regressed by more than --threshold percent.
+
+Captures are written by app.utils.capture (CAPTURE_ENABLED=true).
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+REPLAY_WEBHOOK_SECRET = "replay-webhook-secret"
+ID_SEGMENT_RE = re.compile(r"/(?:\d+|[0-9a-f]{24}|[0-9a-f]{40}|[0-9a-f]{64}|[0-9a-f-]{36})(?=/|$)")
+
+
+def load_records(paths: List[str]) -> List[Dict[str, Any]]:
+    """Read capture files and order their records by arrival time."""
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def route_of(record: Dict[str, Any]) -> str:
+    """Group key for a request, e.g. "GET /auth/github/user/{id}/repos"."""
+    return f"{record['method']} {ID_SEGMENT_RE.sub('/{id}', record['path'])}"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int]) -> Dict[str, Dict[str, float]]:
+    routes = {}
+    for route, latencies in sorted(samples.items()):
+        latencies.sort()
+        routes[route] = {
+            "count": len(latencies),
+            "errors": errors.get(route, 0),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p90_ms": round(percentile(latencies, 90), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    return routes
+
+
+async def replay(args) -> Dict[str, Any]:
+    import httpx
+    from app import app
+    from benchmarks.stubs import install_stubs
+    from app.controller import webhooks
+
+    records = load_records(args.captures)
+    if not records:
+        raise SystemExit("No records in capture")
+
+    stubs = install_stubs(latency_ms=args.backend_ms)
+    webhooks.GITHUB_WEBHOOK_SECRET = REPLAY_WEBHOOK_SECRET
+
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    skipped = 0
+    gate = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=60) as client:
+        async def send(record, due):
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            headers = dict(record["headers"])
+            body = record.get("body", "").encode()
+            if record["path"].startswith("/webhooks/") or "x-github-event" in headers:
+                digest = hmac.new(REPLAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+                headers["x-hub-signature-256"] = f"sha256={digest}"
+
+            route = route_of(record)
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(
+                        record["method"], record["path"] + ("?" + record["query"] if record["query"] else ""),
+                        headers=headers, content=body or None, follow_redirects=False
+                    )
+                    failed = response.status_code >= 500 or (
+                        record.get("status") is not None and response.status_code != record["status"]
+                    )
+                except httpx.HTTPError:
+                    failed = True
+                samples.setdefault(route, []).append((time.perf_counter() - started) * 1000)
+            if failed:
+                errors[route] = errors.get(route, 0) + 1
+
+        t0 = records[0]["t"]
+        start = time.perf_counter()
+        tasks = []
+        for record in records:
+            if record.get("body_note"):
+                skipped += 1  # Truncated or undecodable bodies can't be replayed faithfully
+                continue
+            offset = (record["t"] - t0) / args.speed if args.speed > 0 else 0
+            tasks.append(send(record, start + offset))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    await stubs.close()
+    return {
+        "captures": args.captures,
+        "requests": len(records) - skipped,
+        "skipped": skipped,
+        "speed": args.speed,
+        "backend_ms": args.backend_ms,
+        "elapsed_s": round(elapsed, 3),
+        "routes": summarize(samples, errors),
+    }
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(f"{results['requests']} requests in {results['elapsed_s']}s ({results['skipped']} skipped)")
+    print(f"{'route':60} {'count':>6} {'err':>4} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for route, stats in results["routes"].items():
+        print(f"{route[:60]:60} {stats['count']:6} {stats['errors']:4} {stats['p50_ms']:8.1f} "
+              f"{stats['p90_ms']:8.1f} {stats['p99_ms']:8.1f} {stats['max_ms']:8.1f}")
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["routes"]
+    with open(args.candidate) as f:
+        candidate = json.load(f)["routes"]
+
+    def change(old, new):
+        return (new - old) / old * 100 if old else 0.0
+
+    regressed = []
+    print(f"{'route':60} {'p50 ms':>22} {'p99 ms':>22}")
+    for route in sorted(set(baseline) | set(candidate)):
+        if route not in baseline or route not in candidate:
+            print(f"{route[:60]:60} {'only in ' + ('candidate' if route in candidate else 'baseline'):>22}")
+            continue
+        old, new = baseline[route], candidate[route]
+        p50 = change(old["p50_ms"], new["p50_ms"])
+        p99 = change(old["p99_ms"], new["p99_ms"])
+        print(f"{route[:60]:60} {old['p50_ms']:7.1f}→{new['p50_ms']:7.1f} {p50:+5.0f}% "
+              f"{old['p99_ms']:7.1f}→{new['p99_ms']:7.1f} {p99:+5.0f}%")
+        if p99 > args.threshold:
+            regressed.append(route)
+
+    if regressed:
+        print(f"FAIL: p99 regressed more than {args.threshold:.0f}% on {', '.join(regressed)}")
+        return 1
+    print("OK: no p99 regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare latency")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Replay capture files against the app")
+    run_parser.add_argument("captures", nargs="+")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="Time compression, 0 = as fast as possible")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--backend-ms", type=float, default=20, help="Latency of each stubbed backend call")
+    run_parser.add_argument("--out", help="Write results as JSON for `compare`")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="Allowed p99 regression in percent")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(compare(args))
+
+    # Isolated state, no rate limiting and no capture of the replay itself
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="replay-"))
+    os.environ.setdefault("TOKEN_ENCRYPTION_KEY", "kT7aVXpjk0hGm3Aqz8cG6uPzv1oK3aB1l2oQmZQ3p1c=")
+    for name in ("RATE_LIMIT_SITE", "RATE_LIMIT_USER", "RATE_LIMIT_IP"):
+        os.environ[name] = "0"
+    os.environ["RATE_LIMIT_BACKEND"] = "memory"
+    os.environ["CAPTURE_ENABLED"] = "false"
+    os.environ["LOOP_WATCHDOG_ENABLED"] = "false"
+
+    results = asyncio.run(replay(args))
+    print_results(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
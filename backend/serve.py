@@ -0,0 +1,40 @@
+"""
+Production entry point: runs the app in several uvicorn worker processes.
+
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Workers default to WEB_CONCURRENCY, or the CPU count. Each worker imports
+the app itself and creates its own clients in the app lifespan, and state
+that must agree across workers lives in app.utils.shared_state.
+"""
+import argparse
+import os
+import uvicorn
+
+
+def default_workers() -> int:
+    """Worker count from WEB_CONCURRENCY, falling back to the CPU count."""
+    return int(os.getenv('WEB_CONCURRENCY') or os.cpu_count() or 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument("--host", default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(os.getenv('GRACEFUL_SHUTDOWN_TIMEOUT', '30')),
+        help="Seconds to let in-flight requests finish on shutdown"
+    )
+    args = parser.parse_args()
+
+    # The app must be passed as an import string so each worker imports it after spawning
+    uvicorn.run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout
+    )
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep SQLite stores, spools and indexes out of the working tree; set
+# before any app module reads its configuration
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="tests-"))
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
@@ -0,0 +1,35 @@
+import pytest
+from app.security.admission import LoadShedder, MemoryBucketBackend, parse_quota
+
+
+@pytest.mark.parametrize("quota", ["", "0", "off", "0/60"])
+def test_zero_quota_is_unlimited(quota):
+    assert parse_quota(quota) is None
+
+
+def test_quota_with_zero_period_is_rejected():
+    with pytest.raises(ValueError):
+        parse_quota("5/0")
+
+
+def test_cost_is_taken_from_every_bucket_or_none():
+    backend = MemoryBucketBackend()
+    limits = [("user:a", *parse_quota("10/60"), 4), ("ip:b", *parse_quota("5/60"), 4)]
+
+    assert backend.take(limits) is None
+    key, retry_after = backend.take(limits)
+
+    assert key == "ip:b"
+    assert retry_after > 0
+    # The denied call consumed nothing from the user bucket
+    assert backend.take([("user:a", *parse_quota("10/60"), 6)]) is None
+
+
+def test_untimed_exit_does_not_move_latency():
+    shedder = LoadShedder(max_inflight=10, max_latency_ms=100)
+
+    shedder.enter()
+    shedder.exit(None)
+
+    assert shedder.inflight == 0
+    assert shedder.latency_ms == 0
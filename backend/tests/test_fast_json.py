@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+from app.utils import fast_json
+from app.utils.fast_json import choose_encoding, parse_fields
+
+
+@pytest.mark.parametrize("fields", [None, "", ",", " , ,"])
+def test_blank_field_selection_means_all_fields(fields):
+    assert parse_fields(fields, ("sha", "message")) is None
+
+
+def test_field_selection_is_validated():
+    assert parse_fields("message, sha", ("sha", "message")) == ("message", "sha")
+    with pytest.raises(HTTPException) as error:
+        parse_fields("sha,secret", ("sha", "message"))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+    ("identity", None),
+    ("br;q=oops, gzip", "gzip"),
+])
+def test_choose_encoding_honours_q_values(monkeypatch, header, expected):
+    monkeypatch.setattr(fast_json, "brotli", object())
+    assert choose_encoding(header) == expected
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(fast_json, "brotli", None)
+    assert choose_encoding("br, gzip;q=0.5") == "gzip"
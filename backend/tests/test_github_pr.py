@@ -0,0 +1,139 @@
+"""
+Pull request creation against a local fake of the GitHub Git Data API.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+from types import SimpleNamespace
+import httpx
+import pytest
+from app.models.feedback import Feedback
+from app.services import feedback_processor
+from app.services.github_api import GITHUB_API_URL, GitHubAPIError
+from app.services.github_pr import create_fix_pull_request
+
+
+class FakeGitHub:
+    """Just enough of the Git Data API for one repository, octo/app."""
+
+    def __init__(self):
+        self.calls = []
+        self.objects = {}
+        self.refs = {"heads/main": self._store("commit", {"tree": self._store("tree", {"tree": []}), "parents": []})}
+        self.pulls = []
+
+    def _store(self, kind, body):
+        sha = hashlib.sha1(json.dumps([kind, body], sort_keys=True).encode()).hexdigest()
+        self.objects[sha] = (kind, body)
+        return sha
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/repos/octo/app")
+        body = json.loads(request.content) if request.content else None
+        self.calls.append((request.method, path))
+
+        if request.method == "GET" and path == "":
+            return httpx.Response(200, json={"default_branch": "main"})
+        if request.method == "GET" and path.startswith("/git/ref/"):
+            ref = path.removeprefix("/git/ref/")
+            if ref not in self.refs:
+                return httpx.Response(404, json={"message": "Not Found"})
+            return httpx.Response(200, json={"object": {"sha": self.refs[ref]}})
+        if request.method == "GET" and path.startswith("/git/commits/"):
+            kind, commit = self.objects[path.rsplit("/", 1)[1]]
+            return httpx.Response(200, json={"tree": {"sha": commit["tree"]}})
+        if request.method == "POST" and path == "/git/blobs":
+            return httpx.Response(201, json={"sha": self._store("blob", body)})
+        if request.method == "POST" and path == "/git/trees":
+            for entry in body["tree"]:
+                if entry.get("sha") and self.objects.get(entry["sha"], ("",))[0] != "blob":
+                    return httpx.Response(422, json={"message": "tree.sha is not a blob"})
+            return httpx.Response(201, json={"sha": self._store("tree", body)})
+        if request.method == "POST" and path == "/git/commits":
+            return httpx.Response(201, json={"sha": self._store("commit", body)})
+        if request.method == "POST" and path == "/git/refs":
+            ref = body["ref"].removeprefix("refs/")
+            if ref in self.refs:
+                return httpx.Response(422, json={"message": "Reference already exists"})
+            self.refs[ref] = body["sha"]
+            return httpx.Response(201, json={"ref": body["ref"], "object": {"sha": body["sha"]}})
+        if request.method == "POST" and path == "/pulls":
+            if f"heads/{body['head']}" not in self.refs:
+                return httpx.Response(422, json={"message": "head does not exist"})
+            number = len(self.pulls) + 1
+            self.pulls.append(body)
+            return httpx.Response(201, json={"number": number, "html_url": f"https://github.com/octo/app/pull/{number}"})
+        return httpx.Response(404, json={"message": "Not Found"})
+
+    def open_pull(self, **kwargs):
+        async def run():
+            transport = httpx.MockTransport(self.handler)
+            async with httpx.AsyncClient(transport=transport, base_url=GITHUB_API_URL) as client:
+                return await create_fix_pull_request("octo", "app", "token", client=client, **kwargs)
+        return asyncio.run(run())
+
+
+def test_pull_request_takes_a_fixed_number_of_calls():
+    github = FakeGitHub()
+    files = {f"docs/{i}.md": f"fix {i}" for i in range(10)}
+    files["assets/logo.png"] = b"\x89PNG\x00\xff"
+    files["old.txt"] = None
+
+    pull = github.open_pull(files=files, branch="feedback-fix/abc", title="Fix")
+
+    assert pull["number"] == 1
+    assert [call for call in github.calls if call[1] != "/git/blobs"] == [
+        ("GET", ""),
+        ("GET", "/git/ref/heads/main"),
+        ("GET", f"/git/commits/{github.refs['heads/main']}"),
+        ("POST", "/git/trees"),
+        ("POST", "/git/commits"),
+        ("POST", "/git/refs"),
+        ("POST", "/pulls"),
+    ]
+    assert github.calls.count(("POST", "/git/blobs")) == 1
+
+    kind, commit = github.objects[github.refs["heads/feedback-fix/abc"]]
+    assert commit["parents"] == [github.refs["heads/main"]]
+    entries = {entry["path"]: entry for entry in github.objects[commit["tree"]][1]["tree"]}
+    assert entries["docs/3.md"]["content"] == "fix 3"
+    assert entries["old.txt"]["sha"] is None
+    blob = github.objects[entries["assets/logo.png"]["sha"]][1]
+    assert base64.b64decode(blob["content"]) == b"\x89PNG\x00\xff"
+
+
+def test_existing_branch_is_rejected():
+    github = FakeGitHub()
+    github.open_pull(files={"a.md": "a"}, branch="feedback-fix/same", title="One", base="main")
+
+    with pytest.raises(GitHubAPIError) as error:
+        github.open_pull(files={"b.md": "b"}, branch="feedback-fix/same", title="Two", base="main")
+    assert error.value.status_code == 422
+
+
+def test_fix_jobs_in_the_same_second_open_separate_pull_requests(monkeypatch):
+    github = FakeGitHub()
+    repo = SimpleNamespace(
+        full_name="octo/app",
+        default_branch="main",
+        get_contents=lambda path: [SimpleNamespace(path="README.md", type="file", sha="0" * 40)]
+    )
+    monkeypatch.setattr(feedback_processor, "Github", lambda token: SimpleNamespace(get_repo=lambda name: repo))
+    monkeypatch.setattr(feedback_processor.genai, "Client", lambda api_key: None)
+
+    def no_gemini(*args, **kwargs):
+        raise RuntimeError("Gemini unavailable")
+
+    monkeypatch.setattr(feedback_processor, "governed_call", no_gemini)
+    monkeypatch.setattr(feedback_processor, "create_fix_pull_request_sync",
+                        lambda owner, name, token, **kwargs: github.open_pull(**kwargs))
+    monkeypatch.setattr("time.time", lambda: 1_700_000_000.0)
+
+    feedback = Feedback(user_id="u1", repo_url="https://github.com/octo/app", name="n", email="e@x.io",
+                        message="The save button does nothing")
+    results = [feedback_processor.analyze_and_fix_feedback(feedback, feedback_id="f1") for _ in range(2)]
+
+    assert [result["status"] for result in results] == ["PR created", "PR created"]
+    branches = [pull["head"] for pull in github.pulls]
+    assert len(set(branches)) == 2 and all(branch.startswith("feedback-fix/f1-") for branch in branches)
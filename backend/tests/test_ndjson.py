@@ -0,0 +1,57 @@
+import asyncio
+import gzip
+import tracemalloc
+import pytest
+import zstandard
+from app.utils.ndjson import iter_ndjson_lines, LineTooLongError, BodyDecodeError
+
+LINES = [b'{"message": "feedback %d"}' % i for i in range(500)]
+BODY = b"\n".join(LINES) + b"\n"
+
+ENCODED = {
+    None: lambda data: data,
+    # Two gzip members and three zstd frames, as concatenating clients send them
+    "gzip": lambda data: gzip.compress(data[:4000]) + gzip.compress(data[4000:]),
+    "zstd": lambda data: b"".join(
+        zstandard.ZstdCompressor().compress(data[i:i + 5000]) for i in range(0, len(data), 5000)
+    ),
+}
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _collect(data: bytes, encoding, chunk_size: int = 65536, max_line: int = 65536):
+    async def run():
+        return [line async for line in iter_ndjson_lines(_chunks(data, chunk_size), encoding, max_line)]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("encoding", list(ENCODED))
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_lines_survive_any_chunking(encoding, chunk_size):
+    assert _collect(ENCODED[encoding](BODY), encoding, chunk_size) == LINES
+
+
+@pytest.mark.parametrize("encoding,compress", [
+    ("gzip", lambda data: gzip.compress(data, 9)),
+    ("zstd", lambda data: zstandard.ZstdCompressor(level=19).compress(data)),
+])
+def test_compression_bomb_fails_with_bounded_memory(encoding, compress):
+    bomb = compress(b"x" * (300 * 1024 * 1024))
+
+    tracemalloc.start()
+    try:
+        with pytest.raises(LineTooLongError):
+            _collect(bomb, encoding, chunk_size=65536)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 16 * 1024 * 1024
+
+
+def test_corrupt_body_is_a_decode_error():
+    with pytest.raises(BodyDecodeError):
+        _collect(b"not gzip at all", "gzip")
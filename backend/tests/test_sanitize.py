@@ -0,0 +1,32 @@
+import re
+import pytest
+from app.security.sanitize import SanitizeEngine, Rule, MaliciousInputError, DEFAULT_RULES
+
+
+def test_alternation_rule_matches_every_branch():
+    engine = SanitizeEngine([Rule("sql", "drop|truncate")])
+
+    assert engine.first_match("please drop users") == "sql"
+    assert engine.first_match("please truncate users") == "sql"
+    assert engine.first_match("please keep users") is None
+
+
+@pytest.mark.parametrize("pattern,text", [
+    ("(drop|truncate) table", "TRUNCATE TABLE users"),
+    ("[xy]ss", "a yss b"),
+    ("a?bc", "zbc"),
+    (r"\bexec\b", "exec now"),
+])
+def test_regex_rules_agree_with_re_search(pattern, text):
+    engine = SanitizeEngine([Rule("literal", "zzz", literal=True), Rule("rule", pattern)])
+
+    assert engine.first_match(text) == ("rule" if re.search(pattern, text, re.IGNORECASE) else None)
+
+
+def test_default_rules_reject_and_accept():
+    engine = SanitizeEngine(DEFAULT_RULES)
+
+    with pytest.raises(MaliciousInputError) as error:
+        engine.sanitize("hi <script>alert(1)</script>")
+    assert error.value.rule_id == "script_open"
+    assert engine.sanitize("  the button is broken  ") == "the button is broken"
@@ -0,0 +1,33 @@
+from cryptography.fernet import Fernet
+from app.security import session
+from app.utils import encryption
+
+
+def _use_keys(monkeypatch, keys):
+    monkeypatch.setattr(encryption, "TOKEN_ENCRYPTION_KEYS", ",".join(keys))
+    monkeypatch.setattr(session, "SESSION_SECRET", None)
+    monkeypatch.setattr(session, "_signing_keys", None)
+
+
+def test_sessions_survive_encryption_key_rotation(monkeypatch):
+    old_key, new_key = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+    _use_keys(monkeypatch, [old_key])
+    token = session.issue_session(42, "user-1", "octo")
+
+    # Rotation prepends the new key; the old one stays configured until re-encryption finishes
+    _use_keys(monkeypatch, [new_key, old_key])
+    verified = session.verify_session(token)
+    assert verified is not None and verified.github_id == 42
+
+    fresh = session.issue_session(42, "user-1", "octo")
+    _use_keys(monkeypatch, [new_key])
+    assert session.verify_session(fresh) is not None
+    assert session.verify_session(token) is None
+
+
+def test_tampered_session_is_rejected(monkeypatch):
+    _use_keys(monkeypatch, [Fernet.generate_key().decode()])
+    payload, _, signature = session.issue_session(7, "user-2", "hubot").partition(".")
+
+    assert session.verify_session(f"{payload}x.{signature}") is None
+    assert session.verify_session(f"{payload}.{signature[:-2]}AA") is None
@@ -3,6 +3,64 @@
     const USER_ID = 'user123'; // From your auth system
     const REPO_URL = 'https://github.com/user/repo'; // The selected repo
 
+    // Batch mode: queue submissions and send them together as NDJSON
+    const BATCH_MODE = false;
+    const BULK_ENDPOINT = 'http://localhost:8000/api/feedback/bulk';
+    const BATCH_SIZE = 10; // Flush once this many submissions are queued
+    const BATCH_FLUSH_MS = 5000; // ...or this long after the first one
+
+    const queue = [];
+    let flushTimer = null;
+
+    const toNdjson = (items) => items.map((item) => JSON.stringify(item)).join('\n') + '\n';
+
+    async function flushQueue() {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+        if (queue.length === 0) return;
+
+        const items = queue.splice(0, queue.length);
+        let body = new Blob([toNdjson(items)], { type: 'application/x-ndjson' });
+        const headers = { 'Content-Type': 'application/x-ndjson' };
+
+        // Compress when the browser supports it
+        if (typeof CompressionStream !== 'undefined') {
+            body = await new Response(body.stream().pipeThrough(new CompressionStream('gzip'))).blob();
+            headers['Content-Encoding'] = 'gzip';
+        }
+
+        try {
+            const response = await fetch(BULK_ENDPOINT, { method: 'POST', headers, body, keepalive: true });
+            if (!response.ok) throw new Error(`Bulk submit failed: ${response.status}`);
+        } catch (error) {
+            console.error('Error:', error);
+            queue.unshift(...items); // Retry on the next flush
+        }
+    }
+
+    function enqueue(item) {
+        queue.push(item);
+        if (queue.length >= BATCH_SIZE) {
+            flushQueue();
+        } else if (!flushTimer) {
+            flushTimer = setTimeout(flushQueue, BATCH_FLUSH_MS);
+        }
+    }
+
+    // On page unload, hand anything still queued to the browser to deliver
+    function flushOnUnload() {
+        if (queue.length === 0) return;
+        const blob = new Blob([toNdjson(queue.splice(0, queue.length))], { type: 'text/plain' });
+        navigator.sendBeacon(BULK_ENDPOINT, blob);
+    }
+
+    if (BATCH_MODE) {
+        window.addEventListener('pagehide', flushOnUnload);
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') flushOnUnload();
+        });
+    }
+
     const widgetContainer = document.createElement('div');
     widgetContainer.id = 'ape-feedback-widget';
     widgetContainer.innerHTML = `
@@ -53,18 +111,30 @@
             return;
         }
 
+        const submission = {
+            user_id: USER_ID,
+            repo_url: REPO_URL,
+            name,
+            email,
+            message,
+            feedback_type: feedbackType
+        };
+
+        if (BATCH_MODE) {
+            enqueue(submission);
+            alert('Feedback submitted successfully!');
+            modal.style.display = 'none';
+            document.getElementById('ape-name').value = '';
+            document.getElementById('ape-email').value = '';
+            document.getElementById('ape-message').value = '';
+            return;
+        }
+
         try {
             const response = await fetch(API_ENDPOINT, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    user_id: USER_ID,
-                    repo_url: REPO_URL,
-                    name,
-                    email,
-                    message,
-                    feedback_type: feedbackType
-                })
+                body: JSON.stringify(submission)
             });
 
             if (response.ok) {